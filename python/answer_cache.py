@@ -0,0 +1,153 @@
+# answer_cache.py
+"""
+RAG 답변을 재사용하기 위한 의미 기반(semantic) 답변 캐시입니다.
+
+같은 청년 정책에 대해 표현만 조금 다른 질문이 반복되는 경우가 많기 때문에,
+새 질문의 임베딩이 이전 질문의 임베딩과 충분히 유사하고(코사인 유사도 >= 임계값)
+검색된 문서 조각(청크) 구성이 완전히 같다면 LLM을 다시 호출하지 않고 저장해 둔 답변을 반환합니다.
+
+- 캐시 키 : 검색된 청크 ID 목록과 프롬프트에 들어간 대화 기록(요약 포함)의 해시
+  (같은 문맥, 같은 대화 기록에서 만들어진 답변끼리만 비교)
+- 만료 : 저장 후 ttl_seconds가 지난 답변은 사용하지 않음
+- 크기 제한 : max_entries를 넘으면 가장 오래 사용되지 않은 답변부터 제거 (LRU)
+- 무효화 : 데이터 파일이 추가/수정/삭제되어 벡터DB가 바뀌면 RAGPipeline이 clear()를 호출
+- 통계 : 적중/실패 횟수와, 적중으로 절약한 LLM 생성 시간의 합계
+
+"그거 신청 방법은?"처럼 이전 대화에 따라 뜻이 달라지는 질문이 다른 사용자의 대화에서 만든 답변을
+받지 않도록, 대화 기록이 다르면 같은 질문이라도 다른 키가 됩니다. (대화 기록이 없는 첫 질문끼리만 사용자 간에 공유)
+임계값은 높게(기본 0.95) 두어 거의 같은 질문만 재사용합니다.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+# 로거
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# 문서 조각(청크)의 식별자
+# 벡터DB가 부여한 ID(doc.id)를 우선 사용하고, 없으면 파일 경로와 내용으로 만든 해시를 사용
+def get_chunk_id(doc: Document) -> str:
+    chunk_id = getattr(doc, "id", None) or doc.metadata.get("chunk_id")
+    if chunk_id:
+        return str(chunk_id)
+    source = doc.metadata.get("relative_path") or doc.metadata.get("source", "")
+    return hashlib.sha256(f"{source}\x00{doc.page_content}".encode("utf-8")).hexdigest()
+
+
+# 검색된 청크 ID 목록과 프롬프트용 대화 기록 문자열로 문맥 키 생성
+# 검색 순서와 무관하게 같은 청크 구성, 같은 대화 기록이면 같은 키
+def make_context_key(docs: Sequence[Document], chat_history: str = "") -> str:
+    chunk_ids = sorted(get_chunk_id(doc) for doc in docs)
+    history_hash = hashlib.sha256(chat_history.encode("utf-8")).hexdigest()
+    return hashlib.sha256("\n".join([history_hash] + chunk_ids).encode("utf-8")).hexdigest()
+
+
+class SemanticAnswerCache:
+    def __init__(self,
+                 similarity_threshold: float = 0.95,
+                 max_entries: int = 1000,
+                 ttl_seconds: float = 3600):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # (문맥 키, 항목 번호) -> 캐시 항목. 가장 최근에 사용된 항목이 뒤쪽 (LRU)
+        self._entries: "OrderedDict[Tuple[str, int], Dict[str, Any]]" = OrderedDict()
+        # 문맥 키 -> 해당 문맥의 항목 키 목록 (같은 문맥의 항목끼리만 유사도 비교)
+        self._keys_by_context: Dict[str, List[Tuple[str, int]]] = {}
+        self._next_entry_id = 0
+        self._lock = threading.Lock()
+        # 통계
+        self._hits = 0
+        self._misses = 0
+        self._saved_seconds = 0.0
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    # 유사한 질문의 답변 조회. 없으면 None
+    def lookup(self, question_embedding: Sequence[float], context_key: str) -> Optional[str]:
+        query_vector = self._normalize(question_embedding)
+        now = time.monotonic()
+        with self._lock:
+            best_key = None
+            best_similarity = self.similarity_threshold
+            for key in list(self._keys_by_context.get(context_key, [])):
+                entry = self._entries[key]
+                # 만료된 항목은 조회 시점에 제거
+                if now - entry["created_at"] > self.ttl_seconds:
+                    self._remove(key)
+                    continue
+                similarity = float(np.dot(query_vector, entry["embedding"]))
+                if similarity >= best_similarity:
+                    best_key, best_similarity = key, similarity
+
+            if best_key is None:
+                self._misses += 1
+                return None
+
+            entry = self._entries[best_key]
+            self._entries.move_to_end(best_key)
+            self._hits += 1
+            self._saved_seconds += entry["generation_seconds"]
+            logger.info(f"답변 캐시 적중 (유사도: {best_similarity:.4f}, 원래 질문: {entry['question'][:50]})")
+            return entry["answer"]
+
+    # 새로 생성한 답변 저장
+    # generation_seconds : 이 답변을 LLM으로 생성하는 데 걸린 시간 (적중 시 절약 시간으로 집계)
+    def store(self, question: str, question_embedding: Sequence[float], context_key: str,
+              answer: str, generation_seconds: float) -> None:
+        with self._lock:
+            key = (context_key, self._next_entry_id)
+            self._next_entry_id += 1
+            self._entries[key] = {
+                "question": question,
+                "embedding": self._normalize(question_embedding),
+                "answer": answer,
+                "created_at": time.monotonic(),
+                "generation_seconds": generation_seconds,
+            }
+            self._keys_by_context.setdefault(context_key, []).append(key)
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+
+    # 호출 측에서 self._lock을 잡고 있어야 함
+    def _remove(self, key: Tuple[str, int]) -> None:
+        self._entries.pop(key, None)
+        context_keys = self._keys_by_context.get(key[0])
+        if context_keys is not None:
+            if key in context_keys:
+                context_keys.remove(key)
+            if not context_keys:
+                del self._keys_by_context[key[0]]
+
+    # 벡터DB가 바뀌었을 때 전체 무효화 (통계는 유지)
+    def clear(self) -> None:
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._keys_by_context.clear()
+        if removed:
+            logger.info(f"데이터 변경으로 답변 캐시 {removed}건을 무효화했습니다.")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "saved_seconds": round(self._saved_seconds, 3),
+            }
@@ -0,0 +1,125 @@
+# bench_embedding_engines.py
+"""
+임베딩 추론 엔진(embedding_engines.py)별 속도와 원본 모델(PyTorch float32) 대비 결과 차이를 비교합니다.
+- 로드 시간 (ONNX 엔진은 처음 실행 시 내보내기/양자화 시간 포함)
+- 질문 임베딩 지연 시간 : 문장 하나씩 embed_query 했을 때의 중앙값/p95
+- 문서 임베딩 처리량 : 데이터 디렉토리의 청크를 embed_documents로 계산한 청크/초
+- 코사인 유사도 : 같은 청크에 대한 원본 모델 벡터와의 최소/평균 코사인 유사도
+- top-k 일치율 : 질문별로 원본 벡터와 엔진 벡터에서 찾은 상위 k개 청크가 겹치는 비율
+
+python benchmarks/bench_embedding_engines.py --engines torch-int8 onnx onnx-int8 --max-chunks 500
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# python/ 디렉토리의 모듈을 import 하기 위해 경로 추가
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import settings
+from embedding_engines import EMBEDDING_ENGINES, PARITY_SAMPLE_TEXTS, cosine_parity, load_embedding_engine
+from korean_splitter import KoreanSentenceTextSplitter
+from rag_utils import get_embedding_model
+
+DEFAULT_DATA_PATH = Path(__file__).resolve().parent.parent / "my_data_directory"
+
+
+def load_chunks(data_path: Path, max_chunks: int):
+    splitter = KoreanSentenceTextSplitter(chunk_size=settings.CHUNK_SIZE, chunk_overlap=settings.CHUNK_OVERLAP)
+    chunks = [
+        chunk
+        for path in sorted(data_path.rglob("*.txt"))
+        for chunk in splitter.split_text(path.read_text(encoding="utf-8"))
+    ]
+    return chunks[:max_chunks]
+
+
+def load_engine(engine: str, batch_size: int):
+    if engine == "torch":
+        return get_embedding_model(settings.EMBEDDING_MODEL_NAME, engine="torch")
+    # 벤치마크에서는 결과가 달라도 측정하도록 코사인 유사도 기준을 적용하지 않음
+    return load_embedding_engine(engine, settings.EMBEDDING_MODEL_NAME, onnx_dir=settings.EMBEDDING_ONNX_DIR,
+                                 quantization=settings.EMBEDDING_ONNX_QUANTIZATION, batch_size=batch_size,
+                                 min_cosine=-1.0)
+
+
+def measure_engine(engine: str, chunks, queries, batch_size: int, repeat: int):
+    start = time.perf_counter()
+    embeddings = load_engine(engine, batch_size)
+    # 첫 호출(워밍업)까지 로드 시간에 포함
+    embeddings.embed_query(queries[0])
+    load_seconds = time.perf_counter() - start
+
+    latencies = []
+    query_vectors = []
+    for query in queries:
+        start = time.perf_counter()
+        query_vectors.append(embeddings.embed_query(query))
+        latencies.append(time.perf_counter() - start)
+
+    best = float("inf")
+    chunk_vectors = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunk_vectors = embeddings.embed_documents(chunks)
+        best = min(best, time.perf_counter() - start)
+    return load_seconds, latencies, len(chunks) / best, np.asarray(query_vectors), np.asarray(chunk_vectors)
+
+
+def top_k_rows(query_vectors: np.ndarray, chunk_vectors: np.ndarray, k: int):
+    return [set(row) for row in np.argsort(-(query_vectors @ chunk_vectors.T), axis=1)[:, :k]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="임베딩 추론 엔진 벤치마크 (속도, 원본 모델 대비 코사인 유사도)")
+    parser.add_argument("--data-path", type=Path, default=DEFAULT_DATA_PATH)
+    parser.add_argument("--engines", nargs="+", default=[engine for engine in EMBEDDING_ENGINES if engine != "torch"],
+                        choices=EMBEDDING_ENGINES)
+    parser.add_argument("--max-chunks", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=settings.EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.data_path, args.max_chunks)
+    if not chunks:
+        print(f"'{args.data_path}'에 .txt 파일이 없습니다.")
+        return
+    queries = PARITY_SAMPLE_TEXTS
+    print(f"청크 {len(chunks)}개, 질문 {len(queries)}개, 배치 크기 {args.batch_size}")
+
+    reference = None
+    for engine in ["torch"] + [engine for engine in args.engines if engine != "torch"]:
+        try:
+            load_seconds, latencies, throughput, query_vectors, chunk_vectors = measure_engine(
+                engine, chunks, queries, args.batch_size, args.repeat
+            )
+        except ImportError as e:
+            print(f"[{engine}] 건너뜀: {e}")
+            # 원본 모델 없이는 비교할 수 없음
+            if engine == "torch":
+                return
+            continue
+        latencies_ms = sorted(latency * 1000 for latency in latencies)
+        p95_ms = latencies_ms[min(len(latencies_ms) - 1, int(len(latencies_ms) * 0.95))]
+        line = (f"[{engine:<10}] 로드 {load_seconds:6.1f}s | 질문 중앙값 {statistics.median(latencies_ms):6.1f}ms, "
+                f"p95 {p95_ms:6.1f}ms | 문서 {throughput:7.1f} 청크/초")
+        if reference is None:
+            reference = (query_vectors, chunk_vectors, top_k_rows(query_vectors, chunk_vectors, args.k))
+        else:
+            parity = cosine_parity(reference[1], chunk_vectors)
+            overlap = statistics.mean(
+                len(expected & actual) / len(expected)
+                for expected, actual in zip(reference[2], top_k_rows(query_vectors, chunk_vectors, args.k))
+            )
+            line += (f" | 코사인 최소 {parity['min_cosine']:.4f}, 평균 {parity['mean_cosine']:.4f} "
+                     f"| top-{args.k} 일치율 {overlap:.3f}")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench_korean_splitter.py
+"""
+규칙 기반 문장 분할기(korean_splitter.py)와 KonlpyTextSplitter(Kkma)의 처리 속도와 청크 경계를 비교합니다.
+- 분할기 생성 시간 (Kkma는 JVM 시작과 사전 로드 포함)
+- 처리량 (문자/초), 청크 수, 평균 청크 길이
+- 경계 일치율 : 두 분할기가 만든 청크 중 내용이 완전히 같은 청크의 비율
+konlpy가 설치되어 있지 않으면 규칙 기반 분할기만 측정합니다.
+
+python benchmarks/bench_korean_splitter.py --data-path my_data_directory --repeat 3
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# python/ 디렉토리의 모듈을 import 하기 위해 경로 추가
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_text_splitters import KonlpyTextSplitter
+
+from korean_splitter import KoreanSentenceTextSplitter
+
+DEFAULT_DATA_PATH = Path(__file__).resolve().parent.parent / "my_data_directory"
+
+
+def load_texts(data_path: Path):
+    return [path.read_text(encoding="utf-8") for path in sorted(data_path.rglob("*.txt"))]
+
+
+def measure_splitter(name: str, create_splitter, texts, repeat: int):
+    start = time.perf_counter()
+    try:
+        splitter = create_splitter()
+        # 첫 호출(워밍업)까지 생성 시간에 포함
+        splitter.split_text(texts[0])
+    except ImportError as e:
+        print(f"[{name}] 건너뜀: {e}")
+        return None
+    init_seconds = time.perf_counter() - start
+
+    best = float("inf")
+    chunks = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = [chunk for text in texts for chunk in splitter.split_text(text)]
+        best = min(best, time.perf_counter() - start)
+
+    total_chars = sum(len(text) for text in texts)
+    avg_len = sum(len(chunk) for chunk in chunks) / len(chunks) if chunks else 0
+    print(f"[{name}] 생성+워밍업 {init_seconds * 1000:.1f}ms | 분할 {best * 1000:.1f}ms "
+          f"({total_chars / best:,.0f} 문자/초) | 청크 {len(chunks)}개, 평균 {avg_len:.0f}자")
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="한국어 문장 분할기 벤치마크 (rule vs konlpy)")
+    parser.add_argument("--data-path", type=Path, default=DEFAULT_DATA_PATH)
+    parser.add_argument("--chunk-size", type=int, default=700)
+    parser.add_argument("--chunk-overlap", type=int, default=70)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_texts(args.data_path)
+    if not texts:
+        print(f"'{args.data_path}'에 .txt 파일이 없습니다.")
+        return
+    print(f"파일 {len(texts)}개, 총 {sum(len(text) for text in texts):,}자 (chunk_size={args.chunk_size}, "
+          f"chunk_overlap={args.chunk_overlap})")
+
+    rule_chunks = measure_splitter(
+        "rule", lambda: KoreanSentenceTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap),
+        texts, args.repeat
+    )
+    konlpy_chunks = measure_splitter(
+        "konlpy", lambda: KonlpyTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap),
+        texts, args.repeat
+    )
+
+    if rule_chunks and konlpy_chunks:
+        common = set(rule_chunks) & set(konlpy_chunks)
+        print(f"경계 일치율: {len(common) / max(len(rule_chunks), len(konlpy_chunks)):.1%} "
+              f"(같은 청크 {len(common)}개)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# bench_scan_data_directory.py
+"""
+데이터 디렉토리 스캔(scan_data_directory_with_stats)의 시작 시간을 말뭉치 크기별로 측정합니다.
+- cold : 이전 메타데이터 없이 모든 파일의 해시를 계산 (첫 실행, 스레드 1개 / 여러 개 비교)
+- warm : 이전 메타데이터의 크기/수정 시각을 재사용 (변경이 없는 재시작)
+
+python benchmarks/bench_scan_data_directory.py --sizes 100 1000 5000 --file-kb 16
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# python/ 디렉토리의 모듈을 import 하기 위해 경로 추가
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_manager import scan_data_directory_with_stats, update_metadata_after_processing
+
+
+# 하위 디렉토리 여러 개에 나누어 테스트용 텍스트 파일 생성
+def create_corpus(base_dir: Path, file_count: int, file_kb: int):
+    line = "데이터 디렉토리 스캔 벤치마크용 문장입니다. " * 4 + "\n"
+    content = (line * (file_kb * 1024 // len(line.encode("utf-8")) + 1))
+    for i in range(file_count):
+        file_path = base_dir / f"dir_{i % 20:02d}" / f"doc_{i:06d}.txt"
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(f"{i}\n{content}", encoding="utf-8")
+
+
+def measure(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="scan_data_directory 시작 시간 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--file-kb", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'files':>8} {'cold(1 thread)':>16} {'cold(' + str(args.workers) + ' threads)':>18} {'warm(stat cache)':>18}")
+    for file_count in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_path = Path(tmp_dir)
+            create_corpus(data_path, file_count, args.file_kb)
+
+            cold_single = measure(lambda: scan_data_directory_with_stats(data_path, max_workers=1), args.repeat)
+            cold_parallel = measure(lambda: scan_data_directory_with_stats(data_path, max_workers=args.workers), args.repeat)
+
+            current_stats = scan_data_directory_with_stats(data_path, max_workers=args.workers)
+            previous_metadata = update_metadata_after_processing(
+                list(current_stats),
+                {rel_path: stats["hash"] for rel_path, stats in current_stats.items()},
+                {},
+                None,
+                current_stats
+            )
+            warm = measure(lambda: scan_data_directory_with_stats(data_path, previous_metadata), args.repeat)
+
+            print(f"{file_count:>8} {cold_single * 1000:>14.1f}ms {cold_parallel * 1000:>16.1f}ms {warm * 1000:>16.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# bench_vector_compression.py
+"""
+numpy 벡터 색인(vector_index.NumpyVectorIndex)의 압축 표현별 메모리, 검색 지연 시간, recall@k를 비교합니다.
+- 스캔 메모리 : 검색 시 모든 행을 읽는 표현의 크기 (압축하지 않으면 float32 행렬, 압축하면 압축 코드)
+- 지연 시간 : 질문 하나의 검색 시간 중앙값/p95 (float32 원본으로 다시 계산하는 시간 포함)
+- recall@k : 압축하지 않은 정확 검색의 상위 k개 중 같이 찾은 비율
+  (rescore x1은 다시 계산할 후보가 k개뿐이므로 압축 표현만으로 고른 결과의 recall과 같음)
+
+기본값은 실제 임베딩처럼 군집과 저차원 구조를 가진 합성 벡터를 사용합니다.
+실제 데이터로 측정하려면 청크 임베딩을 (행 수, 차원) 모양의 .npy 파일로 저장해 --vectors로 지정하세요.
+
+python benchmarks/bench_vector_compression.py --rows 50000 --dim 1024 --queries 200 --k 5
+"""
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# python/ 디렉토리의 모듈을 import 하기 위해 경로 추가
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from vector_index import NumpyVectorIndex
+
+ADD_BATCH_SIZE = 1000
+
+
+# 문서 내용("행 번호")에 해당하는 미리 계산된 벡터를 반환하는 임베딩 (모델 실행 없이 색인 구성)
+class PrecomputedEmbeddings(Embeddings):
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return self.vectors[[int(text) for text in texts]]
+
+    def embed_query(self, text):
+        return self.vectors[int(text)]
+
+
+# 군집 중심 + 저차원 부분공간 + 작은 잡음으로 구성한 정규화 벡터 (문장 임베딩의 비등방적 분포를 흉내냄)
+def synthetic_vectors(rows: int, dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rank = max(8, dim // 8)
+    basis = rng.standard_normal((rank, dim)).astype(np.float32)
+    centers = rng.standard_normal((64, rank)).astype(np.float32) * 2.0
+    latent = centers[rng.integers(0, len(centers), rows)] + rng.standard_normal((rows, rank)).astype(np.float32)
+    vectors = latent @ basis + 0.5 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build_index(directory: Path, vectors: np.ndarray, compression: str, pca_dims: int, rescore_multiplier: int):
+    index = NumpyVectorIndex(directory, PrecomputedEmbeddings(vectors), compression=compression,
+                             pca_dims=pca_dims, rescore_multiplier=rescore_multiplier)
+    start = time.perf_counter()
+    for batch_start in range(0, len(vectors), ADD_BATCH_SIZE):
+        rows = range(batch_start, min(batch_start + ADD_BATCH_SIZE, len(vectors)))
+        index.add_documents([Document(page_content=str(row)) for row in rows], [f"id_{row}" for row in rows])
+    index.persist()
+    return index, time.perf_counter() - start
+
+
+def search_all(index: NumpyVectorIndex, queries: np.ndarray, k: int):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        docs_and_scores = index.similarity_search_with_scores(query, k)
+        latencies.append(time.perf_counter() - start)
+        results.append([doc.page_content for doc, _ in docs_and_scores])
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="numpy 벡터 색인 압축 표현 벤치마크 (메모리, 지연 시간, recall@k)")
+    parser.add_argument("--vectors", type=Path, default=None, help="(행 수, 차원) 모양의 임베딩 .npy 파일")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--pca-dims", type=int, default=256)
+    parser.add_argument("--rescore-multiplier", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    else:
+        vectors = synthetic_vectors(args.rows + args.queries, args.dim)
+    # 마지막 행들을 질문으로 사용 (색인에는 넣지 않고, 잡음을 더해 색인의 행과 완전히 같지 않도록)
+    rng = np.random.default_rng(1)
+    queries = vectors[-args.queries:] + 0.05 * rng.standard_normal((args.queries, vectors.shape[1])).astype(np.float32)
+    vectors = vectors[:-args.queries]
+    print(f"벡터 {len(vectors):,}개 x {vectors.shape[1]}차원, 질문 {len(queries)}개, k={args.k}")
+
+    configs = [
+        ("float32 (기준)", "none", 0, 1),
+        ("float16", "float16", 0, args.rescore_multiplier),
+        ("int8", "int8", 0, 1),
+        ("int8", "int8", 0, args.rescore_multiplier),
+        (f"PCA {args.pca_dims}", "none", args.pca_dims, args.rescore_multiplier),
+        (f"PCA {args.pca_dims} + int8", "int8", args.pca_dims, 1),
+        (f"PCA {args.pca_dims} + int8", "int8", args.pca_dims, args.rescore_multiplier),
+    ]
+    baseline_results = None
+    temp_root = Path(tempfile.mkdtemp())
+    try:
+        for i, (name, compression, pca_dims, rescore_multiplier) in enumerate(configs):
+            index, build_seconds = build_index(temp_root / str(i), vectors, compression, pca_dims, rescore_multiplier)
+            # 첫 검색(페이지 캐시 적재)은 측정에서 제외
+            index.similarity_search_with_scores(queries[0], args.k)
+            latencies, results = search_all(index, queries, args.k)
+            if baseline_results is None:
+                baseline_results = results
+            recall = statistics.mean(
+                len(set(result) & set(expected)) / len(expected)
+                for result, expected in zip(results, baseline_results)
+            )
+            stats = index.stats()
+            latencies_ms = sorted(latency * 1000 for latency in latencies)
+            p95_ms = latencies_ms[min(len(latencies_ms) - 1, int(len(latencies_ms) * 0.95))]
+            print(f"[{name:<18} rescore x{rescore_multiplier}] 스캔 메모리 {stats['scan_bytes'] / 2 ** 20:8.1f}MB "
+                  f"({stats['scan_bytes'] / stats['float32_bytes']:.0%}) | 색인 {build_seconds:6.1f}s | "
+                  f"검색 중앙값 {statistics.median(latencies_ms):6.2f}ms, p95 {p95_ms:6.2f}ms | "
+                  f"recall@{args.k} {recall:.3f}")
+    finally:
+        shutil.rmtree(temp_root)
+
+
+if __name__ == "__main__":
+    main()
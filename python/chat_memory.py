@@ -1,13 +1,19 @@
 # chat_memory.py
+import hashlib
 import json
 import os
-from typing import List, Dict, Any
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 
 from filelock import FileLock
 from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, message_to_dict, messages_from_dict
 import logging
 from config import settings
+from token_utils import estimate_tokens
 
 from datetime import datetime, timedelta
 
@@ -23,6 +29,8 @@ class CustomChatMessageHistory(BaseChatMessageHistory):
         # 파일 동시 접근 제어
         self.lock_file_path = f"{self.file_path}.lock"  # 잠금 파일 경로 (실제 데이터 파일과 같은 이름의 .lock 파일)
         self.lock = FileLock(self.lock_file_path, timeout=10)  # 10초 타임아웃 설정
+        # 사용자별 누적 대화 요약은 같은 잠금을 사용하는 별도 파일에 저장 (기존 기록 파일 구조 유지)
+        self.summary_file_path = f"{self.file_path}.summaries.json"
         self._ensure_file_exists()
         self._check_and_manage_file()
 
@@ -51,6 +59,9 @@ class CustomChatMessageHistory(BaseChatMessageHistory):
                     logger.warning(
                         f"채팅 기록 파일({self.file_path}) 유효 기간 초과: {file_age.days} 일 (최대 {settings.MAX_CHAT_HISTORY_FILE_AGE_DAYS} 일). 파일을 삭제합니다.")
                     os.remove(self.file_path)
+                    # 기록이 삭제되었으므로 그 기록을 요약한 내용도 함께 삭제
+                    if os.path.exists(self.summary_file_path):
+                        os.remove(self.summary_file_path)
                     file_deleted = True
                 else:
                     logger.debug(f"파일({self.file_path}) 유효 기간 ({file_age.days} 일)이 아직 유효합니다.")
@@ -154,20 +165,31 @@ class CustomChatMessageHistory(BaseChatMessageHistory):
             try:
                 with open(self.file_path, "w", encoding='utf-8') as f:
                     json.dump(all_users_history, f, ensure_ascii=False, indent=2)
+            # 저장 실패를 호출 측(ChatMemoryManager.flush 등)이 알 수 있도록 기록 후 다시 발생시킴
             except IOError as e:
                 logger.error(f"채팅 기록 저장 실패: {self.file_path}, 오류: {e}")
+                raise
             except Exception as e:
                 logger.error(f"채팅 기록 저장 중 예상치 못한 오류: {e}", exc_info=settings.DEBUG_MODE)
+                raise
 
     def add_message(self, message: BaseMessage) -> None:
-        current_user_message: List[BaseMessage] = self.messages
+        self.add_messages([message])
 
-        current_user_message.append(message)
+    # 여러 메시지(예: 질문/답변 한 쌍)를 파일 한 번 읽기/쓰기로 추가
+    # 읽기-수정-쓰기 전체를 하나의 잠금 안에서 수행하여 다른 요청의 기록이 덮어써지지 않도록 함
+    # (FileLock은 같은 스레드에서 재진입이 가능함)
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        with self.lock:
+            current_user_message: List[BaseMessage] = self.messages
 
-        try:
-            self.messages = current_user_message
-        except Exception as e:
-            logger.error(f"사용자 '{self.member_id}'의 메시지 추가 후 저장 중 오류: {e}", exc_info=settings.DEBUG_MODE)
+            current_user_message.extend(messages)
+
+            try:
+                self.messages = current_user_message
+            except Exception as e:
+                logger.error(f"사용자 '{self.member_id}'의 메시지 추가 후 저장 중 오류: {e}", exc_info=settings.DEBUG_MODE)
+                raise
 
     def clear(self) -> None:
         with self.lock:
@@ -184,17 +206,335 @@ class CustomChatMessageHistory(BaseChatMessageHistory):
             else:
                 logger.info(f"사용자 '{self.member_id}'의 삭제할 대화 기록이 존재하지 않습니다.")
 
+            self.save_summary("", 0)
+
+    def _load_all_summaries(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.summary_file_path):
+            return {}
+        try:
+            with open(self.summary_file_path, "r", encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error(f"대화 요약 파일({self.summary_file_path}) 읽기 오류. 요약 없이 진행합니다. 오류: {e}")
+            return {}
+
+    # 누적 대화 요약과, 요약에 반영된 메시지 수(앞에서부터) 반환
+    def load_summary(self) -> Tuple[str, int]:
+        with self.lock:
+            entry = self._load_all_summaries().get(self.member_id, {})
+        return entry.get("summary", ""), int(entry.get("covered_count", 0))
+
+    def save_summary(self, summary: str, covered_count: int) -> None:
+        with self.lock:
+            all_summaries = self._load_all_summaries()
+            if summary:
+                all_summaries[self.member_id] = {"summary": summary, "covered_count": covered_count}
+            elif self.member_id in all_summaries:
+                del all_summaries[self.member_id]
+            else:
+                return
+            try:
+                with open(self.summary_file_path, "w", encoding='utf-8') as f:
+                    json.dump(all_summaries, f, ensure_ascii=False, indent=2)
+            except IOError as e:
+                logger.error(f"대화 요약 저장 실패: {self.summary_file_path}, 오류: {e}")
+
+
+# 스키마 생성과 만료 기록 정리가 끝난 SQLite 파일 경로 (프로세스당 한 번만 수행)
+_initialized_sqlite_paths: set = set()
+
+# SQLite 연결 생성
+# timeout : 다른 프로세스가 쓰기 잠금을 가지고 있을 때 기다리는 최대 시간(초)
+def _connect_sqlite(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=10)
+    # WAL 모드에서는 NORMAL로도 데이터 손상 없이 커밋 비용을 줄일 수 있음
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+# 테이블/인덱스 생성, WAL 모드 설정, 유효 기간이 지난 사용자 기록 삭제
+def _ensure_sqlite_schema(db_path: str) -> None:
+    # 이미 준비된 DB 파일이 그대로 존재하면 건너뜀
+    if db_path in _initialized_sqlite_paths and os.path.exists(db_path):
+        return
+
+    directory = os.path.dirname(db_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+        logger.info(f"디렉토리 생성: {directory}")
+
+    conn = _connect_sqlite(db_path)
+    try:
+        # WAL 모드 : 읽기와 쓰기가 서로를 막지 않음. 설정은 DB 파일에 영구 저장됨
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chat_messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    member_id TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chat_messages_member ON chat_messages (member_id, id)"
+            )
+            # 사용자별 누적 대화 요약 (covered_count : 요약에 반영된 앞쪽 메시지 수)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chat_summaries (
+                    member_id TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    covered_count INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            # 완료된 마이그레이션 기록 (기록과 데이터 INSERT를 같은 트랜잭션으로 커밋하여 중복 마이그레이션 방지)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chat_migrations (
+                    name TEXT PRIMARY KEY,
+                    completed_at REAL NOT NULL
+                )
+                """
+            )
+            # JSON 방식은 파일이 MAX_CHAT_HISTORY_FILE_AGE_DAYS 동안 수정되지 않으면 전체를 삭제했음
+            # SQLite 방식에서는 사용자별로 마지막 대화가 유효 기간을 넘긴 경우 해당 사용자의 기록을 삭제
+            expire_before = time.time() - settings.MAX_CHAT_HISTORY_FILE_AGE_DAYS * 24 * 60 * 60
+            deleted = conn.execute(
+                """
+                DELETE FROM chat_messages WHERE member_id IN (
+                    SELECT member_id FROM chat_messages
+                    GROUP BY member_id HAVING MAX(created_at) < ?
+                )
+                """,
+                (expire_before,)
+            ).rowcount
+            # 기록이 모두 삭제된 사용자의 요약도 정리
+            conn.execute(
+                "DELETE FROM chat_summaries WHERE member_id NOT IN (SELECT DISTINCT member_id FROM chat_messages)"
+            )
+        if deleted:
+            logger.warning(f"유효 기간이 지난 대화 기록 {deleted}건을 삭제했습니다. ({db_path})")
+        _initialized_sqlite_paths.add(db_path)
+        logger.info(f"채팅 기록 DB 준비 완료: {db_path}")
+    finally:
+        conn.close()
+
+
+# 사용자별 메시지를 SQLite 테이블에 한 행씩 저장하는 대화 기록
+# 메시지 추가는 해당 사용자의 행만 INSERT하므로, 전체 사용자 기록을 다시 읽고 쓰지 않음
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    def __init__(self, member_id: str, db_path: str = str(settings.CHAT_HISTORY_DB_FILE)):
+        if not member_id:
+            raise ValueError("member_id는 필수 항목입니다.")
+        self.member_id = member_id
+        self.db_path = db_path
+        _ensure_sqlite_schema(self.db_path)
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        conn = _connect_sqlite(self.db_path)
+        try:
+            rows = conn.execute(
+                "SELECT message FROM chat_messages WHERE member_id = ? ORDER BY id",
+                (self.member_id,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"채팅 기록 DB 읽기 오류: {self.db_path}, 오류: {e}")
+            return []
+        finally:
+            conn.close()
+
+        try:
+            return messages_from_dict([json.loads(row[0]) for row in rows])
+        except (json.JSONDecodeError, KeyError, ValueError) as e:
+            logger.error(f"사용자 '{self.member_id}'의 대화 기록 디코딩 오류. 빈 기록으로 대체합니다. 오류: {e}")
+            return []
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.add_messages([message])
+
+    # 여러 메시지를 하나의 트랜잭션으로 추가
+    # 저장에 실패하면(DB 잠금, 디스크 부족 등) 기록 후 예외를 다시 발생시켜 호출 측이 재시도할 수 있게 함
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        if not messages:
+            return
+        now = time.time()
+        rows = [
+            (self.member_id, json.dumps(message_to_dict(msg), ensure_ascii=False), now)
+            for msg in messages
+        ]
+        conn = _connect_sqlite(self.db_path)
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO chat_messages (member_id, message, created_at) VALUES (?, ?, ?)",
+                    rows
+                )
+        except sqlite3.Error as e:
+            logger.error(f"사용자 '{self.member_id}'의 메시지 저장 중 오류: {e}", exc_info=settings.DEBUG_MODE)
+            raise
+        finally:
+            conn.close()
+
+    def clear(self) -> None:
+        conn = _connect_sqlite(self.db_path)
+        try:
+            with conn:
+                deleted = conn.execute(
+                    "DELETE FROM chat_messages WHERE member_id = ?",
+                    (self.member_id,)
+                ).rowcount
+                conn.execute("DELETE FROM chat_summaries WHERE member_id = ?", (self.member_id,))
+        except sqlite3.Error as e:
+            logger.error(f"사용자 '{self.member_id}'의 대화 기록 삭제 중 오류: {e}", exc_info=settings.DEBUG_MODE)
+            raise
+        finally:
+            conn.close()
+
+        if deleted:
+            logger.info(f"사용자 '{self.member_id}'의 대화 기록이 삭제되었습니다.")
+        else:
+            logger.info(f"사용자 '{self.member_id}'의 삭제할 대화 기록이 존재하지 않습니다.")
+
+    # 누적 대화 요약과, 요약에 반영된 메시지 수(앞에서부터) 반환
+    def load_summary(self) -> Tuple[str, int]:
+        conn = _connect_sqlite(self.db_path)
+        try:
+            row = conn.execute(
+                "SELECT summary, covered_count FROM chat_summaries WHERE member_id = ?",
+                (self.member_id,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"사용자 '{self.member_id}'의 대화 요약 읽기 오류: {e}")
+            return "", 0
+        finally:
+            conn.close()
+        return (row[0], row[1]) if row else ("", 0)
+
+    def save_summary(self, summary: str, covered_count: int) -> None:
+        conn = _connect_sqlite(self.db_path)
+        try:
+            with conn:
+                conn.execute(
+                    """
+                    INSERT INTO chat_summaries (member_id, summary, covered_count, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(member_id) DO UPDATE SET
+                        summary = excluded.summary,
+                        covered_count = excluded.covered_count,
+                        updated_at = excluded.updated_at
+                    """,
+                    (self.member_id, summary, covered_count, time.time())
+                )
+        except sqlite3.Error as e:
+            logger.error(f"사용자 '{self.member_id}'의 대화 요약 저장 중 오류: {e}", exc_info=settings.DEBUG_MODE)
+        finally:
+            conn.close()
+
+
+# 기존 chat_history.json의 모든 사용자 기록을 SQLite로 옮김
+# 옮기기가 끝난 JSON 파일은 '.migrated' 확장자를 붙여 보관하므로 다음 실행 때 다시 옮기지 않음
+# 파일 내용의 해시를 메시지 INSERT와 같은 트랜잭션으로 chat_migrations에 기록하므로,
+# 커밋 후 파일 이름을 바꾸기 전에 종료되더라도 다음 실행에서 같은 기록을 다시 넣지 않고 이름만 바꿈
+# 반환값 : 옮긴 메시지 수
+def migrate_json_history_to_sqlite(
+        json_file_path: str = str(settings.CHAT_HISTORY_FILE),
+        db_path: str = str(settings.CHAT_HISTORY_DB_FILE)
+) -> int:
+    if not os.path.exists(json_file_path):
+        return 0
+
+    _ensure_sqlite_schema(db_path)
+
+    with FileLock(f"{json_file_path}.lock", timeout=10):
+        try:
+            with open(json_file_path, "r", encoding='utf-8') as f:
+                file_content = f.read()
+            all_users_data = json.loads(file_content) if file_content.strip() else {}
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error(f"채팅 기록 마이그레이션 실패, JSON 파일을 읽을 수 없습니다: {json_file_path}, 오류: {e}")
+            return 0
+
+        if not isinstance(all_users_data, dict):
+            logger.error(f"채팅 기록 파일({json_file_path})의 최상위 JSON 구조가 딕셔너리가 아니어서 마이그레이션을 건너뜁니다.")
+            return 0
+
+        # 기존 파일의 수정 시각을 메시지 생성 시각으로 사용 (유효 기간 계산이 이어지도록)
+        created_at = os.path.getmtime(json_file_path)
+        rows = []
+        for member_id, user_messages_json in all_users_data.items():
+            if not isinstance(user_messages_json, list):
+                continue
+            for message_json in user_messages_json:
+                rows.append((member_id, json.dumps(message_json, ensure_ascii=False), created_at))
+
+        migration_name = f"json_history:{hashlib.sha256(file_content.encode('utf-8')).hexdigest()}"
+        conn = _connect_sqlite(db_path)
+        try:
+            with conn:
+                already_migrated = conn.execute(
+                    "SELECT 1 FROM chat_migrations WHERE name = ?", (migration_name,)
+                ).fetchone() is not None
+                if not already_migrated:
+                    conn.executemany(
+                        "INSERT INTO chat_messages (member_id, message, created_at) VALUES (?, ?, ?)",
+                        rows
+                    )
+                    conn.execute(
+                        "INSERT INTO chat_migrations (name, completed_at) VALUES (?, ?)",
+                        (migration_name, time.time())
+                    )
+        finally:
+            conn.close()
+
+        migrated_path = f"{json_file_path}.migrated"
+        os.replace(json_file_path, migrated_path)
+
+    if already_migrated:
+        logger.warning(f"이미 옮긴 채팅 기록 파일이 남아 있어 보관만 합니다: {json_file_path} -> {migrated_path}")
+        return 0
+
+    logger.info(f"채팅 기록 마이그레이션 완료: 사용자 {len(all_users_data)}명, 메시지 {len(rows)}건 ({json_file_path} -> {db_path})")
+    return len(rows)
+
+
+# 설정된 저장소 종류(backend)에 맞는 대화 기록 객체 생성
+# file_path를 생략하면 저장소 종류별 기본 경로(CHAT_HISTORY_DB_FILE / CHAT_HISTORY_FILE)를 사용
+def create_chat_message_history(
+        member_id: str,
+        backend: Optional[str] = None,
+        file_path: Optional[str] = None
+) -> BaseChatMessageHistory:
+    backend = (backend or settings.CHAT_HISTORY_BACKEND).lower()
+    if backend == "sqlite":
+        return SQLiteChatMessageHistory(
+            member_id=member_id,
+            db_path=file_path or str(settings.CHAT_HISTORY_DB_FILE)
+        )
+    if backend == "json":
+        return CustomChatMessageHistory(
+            member_id=member_id,
+            file_path=file_path or str(settings.CHAT_HISTORY_FILE)
+        )
+    raise ValueError(f"지원하지 않는 대화 기록 저장소입니다: '{backend}' (sqlite 또는 json)")
+
 
 class UserChatMemory:
-    def __init__(self, member_id: str, history_file_path: str = "chat_history.json"):
+    def __init__(self, member_id: str, history_file_path: Optional[str] = None, backend: Optional[str] = None):
         if not member_id:
             raise ValueError("UserChatMemory 생성 시 member_id는 필수 항목입니다.")
         self.member_id: str = member_id
-        self.file_path: str = history_file_path
+        self.file_path: Optional[str] = history_file_path
 
         self.chat_message_history: BaseChatMessageHistory = \
-        CustomChatMessageHistory(
+        create_chat_message_history(
             member_id=self.member_id,
+            backend=backend,
             file_path=self.file_path
         )
 
@@ -222,6 +562,13 @@ class UserChatMemory:
 
         self.chat_message_history.add_message(AIMessage(content=answer))
 
+    # 질문과 답변을 한 번의 저장으로 추가
+    def add_exchange(self, question: str, answer: str) -> None:
+        self.chat_message_history.add_messages([
+            HumanMessage(content=str(question)),
+            AIMessage(content=str(answer))
+        ])
+
     def get_chat_messages(self) -> List[BaseMessage]:
         return self.chat_message_history.messages
 
@@ -247,4 +594,235 @@ class UserChatMemory:
         return history_list
 
     def clear_history(self) -> None:
-        self.chat_message_history.clear()
\ No newline at end of file
+        self.chat_message_history.clear()
+
+
+# 프롬프트에 원문으로 넣을 최근 메시지의 시작 위치 계산
+# 최신 메시지부터 거꾸로 토큰 수를 더해 token_budget을 넘기 직전까지 포함하며,
+# 이미 요약에 반영된 앞쪽 메시지(covered_count 이전)는 원문으로 다시 넣지 않음
+# 가장 최근 메시지 하나는 예산을 넘더라도 항상 포함
+def select_history_window(messages: Sequence[BaseMessage], covered_count: int, token_budget: int) -> int:
+    start = len(messages)
+    used_tokens = 0
+    while start > covered_count:
+        message_tokens = estimate_tokens(str(messages[start - 1].content))
+        if start < len(messages) and used_tokens + message_tokens > token_budget:
+            break
+        used_tokens += message_tokens
+        start -= 1
+    return start
+
+
+# 애플리케이션 시작 시 한 번 생성되어 모든 요청이 공유하는 대화 기록 관리자
+# - 최근 사용자들의 메시지 목록을 LRU 방식으로 메모리에 유지하여, 자주 묻는 사용자는 읽기 시 저장소에 접근하지 않음
+# - 새 메시지는 메모리에 먼저 반영하고, 백그라운드 스레드가 일정 주기(write-behind)로 저장소에 모아서 기록
+# - 아직 기록되지 않은 메시지가 있는 사용자는 캐시에서 밀려나지 않으므로, 캐시 미스 시 저장소 내용이 항상 최신임
+# 종료 시 close()를 호출해야 남은 메시지가 저장소에 기록됨
+class ChatMemoryManager:
+    def __init__(self,
+                 max_members: int = settings.CHAT_CACHE_MAX_MEMBERS,
+                 flush_interval_seconds: float = settings.CHAT_FLUSH_INTERVAL_SECONDS,
+                 backend: Optional[str] = None,
+                 file_path: Optional[str] = None):
+        self.max_members = max_members
+        self.flush_interval_seconds = flush_interval_seconds
+        self.backend = backend
+        self.file_path = file_path
+        # member_id -> 메시지 목록 (가장 최근에 사용된 사용자가 뒤쪽)
+        self._cache: "OrderedDict[str, List[BaseMessage]]" = OrderedDict()
+        # member_id -> (누적 대화 요약, 요약에 반영된 메시지 수). _cache와 함께 유지/제거됨
+        self._summaries: Dict[str, Tuple[str, int]] = {}
+        # member_id -> 저장소에 아직 기록되지 않은 메시지 목록
+        self._pending: Dict[str, List[BaseMessage]] = {}
+        # 현재 flush 중인(기록이 끝나지 않은) 사용자
+        self._flushing: set = set()
+        # 캐시/대기열 자료구조 보호용 잠금 (저장소 입출력 중에는 잡지 않음)
+        self._lock = threading.Lock()
+        # flush와 clear가 서로 끼어들지 않도록 순서를 보장하는 잠금
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+
+    def _history(self, member_id: str) -> BaseChatMessageHistory:
+        return create_chat_message_history(member_id=member_id, backend=self.backend, file_path=self.file_path)
+
+    # 백그라운드 flush 스레드 시작
+    def start(self) -> None:
+        if self._flush_thread is not None:
+            return
+        self._stop_event.clear()
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="chat-memory-flush", daemon=True)
+        self._flush_thread.start()
+        logger.info(f"대화 기록 관리자 시작 (최대 캐시 사용자 수: {self.max_members}, flush 주기: {self.flush_interval_seconds}초)")
+
+    def _flush_loop(self) -> None:
+        # wait()는 stop 이벤트가 설정되면 즉시 True를 반환하여 루프를 종료
+        while not self._stop_event.wait(self.flush_interval_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"대화 기록 주기적 저장 중 오류: {e}", exc_info=settings.DEBUG_MODE)
+
+    # flush 스레드를 멈추고 남은 메시지를 모두 기록
+    def close(self) -> None:
+        self._stop_event.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join(timeout=self.flush_interval_seconds + 5)
+            self._flush_thread = None
+        self.flush()
+        logger.info("대화 기록 관리자 종료 (남은 메시지 저장 완료).")
+
+    # 저장소 입출력 없이 캐시에서만 조회. 캐시에 없으면 None
+    def get_cached_messages(self, member_id: str) -> Optional[List[BaseMessage]]:
+        with self._lock:
+            cached = self._cache.get(member_id)
+            if cached is None:
+                return None
+            self._cache.move_to_end(member_id)
+            return list(cached)
+
+    # 사용자 메시지 목록 조회. 캐시 미스일 때만 저장소에서 읽어 캐시에 올림
+    def get_messages(self, member_id: str) -> List[BaseMessage]:
+        cached = self.get_cached_messages(member_id)
+        if cached is not None:
+            return cached
+
+        history = self._history(member_id)
+        loaded = history.messages
+        loaded_summary = history.load_summary()
+
+        with self._lock:
+            # 읽는 동안 다른 요청이 먼저 캐시에 올렸다면 그쪽을 사용
+            if member_id not in self._cache:
+                self._cache[member_id] = loaded
+                self._summaries[member_id] = loaded_summary
+            self._cache.move_to_end(member_id)
+            self._evict_if_needed()
+            return list(self._cache[member_id])
+
+    # 저장소 입출력 없이 캐시에서만 프롬프트용 대화 기록 조회. 캐시에 없으면 None
+    # 반환값 : (누적 대화 요약, 토큰 예산 안의 최근 메시지)
+    def get_cached_prompt_history(self, member_id: str,
+                                  token_budget: int = settings.HISTORY_TOKEN_BUDGET
+                                  ) -> Optional[Tuple[str, List[BaseMessage]]]:
+        with self._lock:
+            cached = self._cache.get(member_id)
+            if cached is None:
+                return None
+            self._cache.move_to_end(member_id)
+            summary, covered_count = self._summaries.get(member_id, ("", 0))
+            start = select_history_window(cached, covered_count, token_budget)
+            return summary, cached[start:]
+
+    # 프롬프트용 대화 기록 조회. 캐시 미스일 때만 저장소에서 읽음
+    def get_prompt_history(self, member_id: str,
+                           token_budget: int = settings.HISTORY_TOKEN_BUDGET) -> Tuple[str, List[BaseMessage]]:
+        prompt_history = self.get_cached_prompt_history(member_id, token_budget)
+        if prompt_history is not None:
+            return prompt_history
+        self.get_messages(member_id)
+        prompt_history = self.get_cached_prompt_history(member_id, token_budget)
+        # 불러온 직후 캐시에서 밀려난 드문 경우에는 요약 없이 전체 기록을 예산으로 자름
+        if prompt_history is None:
+            messages = self.get_messages(member_id)
+            return "", messages[select_history_window(messages, 0, token_budget):]
+        return prompt_history
+
+    # 토큰 예산을 벗어나 새로 요약에 반영해야 할 메시지 조회
+    # 반환값 : (기존 요약, 요약에 반영할 메시지, 반영 후의 covered_count). 반영할 메시지가 없으면 None
+    def get_messages_to_summarize(self, member_id: str,
+                                  token_budget: int = settings.HISTORY_TOKEN_BUDGET
+                                  ) -> Optional[Tuple[str, List[BaseMessage], int]]:
+        self.get_messages(member_id)
+        with self._lock:
+            cached = self._cache.get(member_id)
+            if cached is None:
+                return None
+            summary, covered_count = self._summaries.get(member_id, ("", 0))
+            start = select_history_window(cached, covered_count, token_budget)
+            if start <= covered_count:
+                return None
+            return summary, cached[covered_count:start], start
+
+    # 새 누적 요약을 캐시와 저장소에 반영 (요약 생성 후 한 번만 호출되므로 바로 기록)
+    def set_summary(self, member_id: str, summary: str, covered_count: int) -> None:
+        with self._lock:
+            cached = self._cache.get(member_id)
+            # 요약을 만드는 동안 기록이 삭제되었다면 이전 기록의 요약이므로 버림
+            if cached is not None and covered_count > len(cached):
+                logger.info(f"사용자 '{member_id}'의 대화 기록이 요약 도중 삭제되어 요약을 저장하지 않습니다.")
+                return
+            if cached is not None:
+                self._summaries[member_id] = (summary, covered_count)
+        self._history(member_id).save_summary(summary, covered_count)
+
+    # 질문/답변 한 쌍을 메모리에 반영하고 저장 대기열에 추가
+    def add_exchange(self, member_id: str, question: str, answer: str) -> None:
+        new_messages: List[BaseMessage] = [
+            HumanMessage(content=str(question)),
+            AIMessage(content=str(answer))
+        ]
+        # 캐시에 없으면 먼저 저장소에서 불러옴 (보통 직전 get_messages로 이미 캐시에 있음)
+        loaded = self.get_messages(member_id)
+
+        with self._lock:
+            cached = self._cache.get(member_id)
+            if cached is None:
+                # 불러온 직후 다른 요청들에 의해 캐시에서 밀려난 드문 경우
+                cached = loaded
+                self._cache[member_id] = cached
+                self._summaries.setdefault(member_id, ("", 0))
+            cached.extend(new_messages)
+            self._pending.setdefault(member_id, []).extend(new_messages)
+            self._cache.move_to_end(member_id)
+            self._evict_if_needed()
+
+    # 캐시, 대기열, 저장소에서 사용자 기록 삭제
+    def clear(self, member_id: str) -> None:
+        # 진행 중인 flush가 끝난 뒤에 삭제해야, 삭제 직후 이전 메시지가 다시 기록되지 않음
+        with self._flush_lock:
+            with self._lock:
+                self._pending.pop(member_id, None)
+                self._cache[member_id] = []
+                self._summaries[member_id] = ("", 0)
+                self._cache.move_to_end(member_id)
+                self._evict_if_needed()
+            self._history(member_id).clear()
+
+    # 대기 중인 메시지를 사용자별로 한 번씩(add_messages) 저장소에 기록
+    # 저장소가 예외를 발생시킨 사용자의 메시지는 대기열에 되돌려 다음 flush에서 다시 기록
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                pending = self._pending
+                self._pending = {}
+                self._flushing = set(pending.keys())
+
+            for member_id, messages in pending.items():
+                try:
+                    self._history(member_id).add_messages(messages)
+                except Exception as e:
+                    logger.error(f"사용자 '{member_id}'의 대화 기록 저장 실패, 다음 주기에 재시도합니다: {e}",
+                                 exc_info=settings.DEBUG_MODE)
+                    with self._lock:
+                        # 실패한 메시지를 그 사이 새로 들어온 메시지보다 앞에 다시 넣음
+                        self._pending[member_id] = messages + self._pending.get(member_id, [])
+
+            with self._lock:
+                self._flushing = set()
+            logger.debug(f"대화 기록 flush 완료: 사용자 {len(pending)}명")
+
+    # 최대 사용자 수를 넘으면 가장 오래 사용되지 않은 사용자부터 제거
+    # 저장되지 않은 메시지가 있는 사용자는 제거하지 않음 (호출 측에서 self._lock을 잡고 있어야 함)
+    def _evict_if_needed(self) -> None:
+        if len(self._cache) <= self.max_members:
+            return
+        for member_id in list(self._cache.keys()):
+            if len(self._cache) <= self.max_members:
+                break
+            if member_id in self._pending or member_id in self._flushing:
+                continue
+            del self._cache[member_id]
+            self._summaries.pop(member_id, None)
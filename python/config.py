@@ -39,10 +39,66 @@ class Settings(BaseSettings):
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     EMBEDDING_MODEL_NAME: str = "nlpai-lab/KURE-v1"
+    # 임베딩 추론 엔진 (embedding_engines.py)
+    # "torch" : PyTorch float32 (기본값) | "torch-int8" : PyTorch 동적 int8 양자화
+    # "onnx" : ONNX Runtime float32 | "onnx-int8" : ONNX Runtime 동적 int8 양자화 (optimum[onnxruntime] 필요)
+    # 원본 모델과의 코사인 유사도가 EMBEDDING_PARITY_MIN_COSINE 미만이거나 로드에 실패하면 "torch"로 실행
+    # 기존 벡터DB의 벡터는 원본 모델로 만든 것이므로, 엔진을 바꾼 뒤 전체 재색인하면 검색 결과가 가장 정확함
+    EMBEDDING_ENGINE: str = "torch"
+    EMBEDDING_ONNX_DIR: Path = BASE_DIR / "onnx_models" # 내보낸 ONNX 모델 저장 디렉토리
+    EMBEDDING_ONNX_QUANTIZATION: str = "avx2" # ONNX int8 양자화 설정 ("avx2" | "avx512" | "avx512_vnni" | "arm64")
+    EMBEDDING_BATCH_SIZE: int = 32 # "torch" 이외 엔진의 문서 임베딩 배치 크기
+    EMBEDDING_PARITY_MIN_COSINE: float = 0.99 # 원본 모델과 비교한 최소 코사인 유사도
     LLM_MODEL_NAME: str = "gemini-2.5-flash-preview-05-20"
     CHUNK_SIZE: int = 700 # 조정 가능 수치
     CHUNK_OVERLAP: int = 70 # 조정 가능 수치
+    # 텍스트 분할기 종류 (rag_utils.get_text_splitter)
+    # "konlpy" : Kkma 형태소 분석으로 문장 분할 (JVM 필요, 느림) | "rule" : 규칙 기반 문장 분할 (korean_splitter.py)
+    # 변경하면 청크 경계가 달라지므로 전체 재색인(/admin/reindex, mode="full")이 필요함
+    TEXT_SPLITTER_ENGINE: str = "konlpy"
     SEARCH_K: int = 3 # 검색해올 상위 문서 수
+    # 하이브리드 검색 설정 (lexical_index.py) : 벡터 검색 결과와 BM25 어휘 검색 결과를 RRF로 결합
+    HYBRID_SEARCH_ENABLED: bool = True
+    HYBRID_CANDIDATE_K: int = 20 # 결합 전 각 검색 방식에서 가져올 후보 수
+    HYBRID_RRF_K: int = 60 # RRF 상수 (클수록 순위 간 점수 차이가 작아짐)
+    # 크로스 인코더 재순위화 설정 (reranker.py) : 후보를 더 많이 가져와 (질문, 청크) 관련도로 다시 정렬한 뒤 SEARCH_K개 사용
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL_NAME: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1" # 한국어를 포함한 다국어 소형 모델
+    RERANK_CANDIDATE_K: int = 20 # 재순위화할 후보 수
+    RERANK_BATCH_SIZE: int = 16 # 한 번에 계산할 (질문, 청크) 쌍 수
+    RERANK_MAX_LENGTH: int = 512 # 쌍 하나의 최대 토큰 수 (초과분은 잘림)
+    RERANK_LATENCY_BUDGET_SECONDS: float = 1.0 # 점수 계산이 이 시간을 넘을 것 같으면 원래 검색 순서 사용
+    RERANK_CACHE_MAX_ENTRIES: int = 10000 # (질문, 청크)별 점수 캐시 최대 저장 수 (초과 시 LRU 제거)
+    # 문맥 조립 설정 (context_packer.py) : 같은 파일의 인접 청크 병합, 겹침 제거, 관련도 컷오프, 토큰 예산
+    CONTEXT_PACKING_ENABLED: bool = True
+    CONTEXT_TOKEN_BUDGET: int = 2000 # 프롬프트에 넣을 문맥의 최대 토큰 수 (추정치, 0이면 제한 없음)
+    # 이 점수 미만인 청크는 문맥에서 제외 (가장 관련도가 높은 청크는 항상 유지)
+    # 점수는 재순위화를 사용하면 크로스 인코더 점수(0~1), 아니면 벡터 검색의 코사인 유사도
+    CONTEXT_MIN_RELEVANCE_SCORE: float = 0.3
+    SCAN_HASH_WORKERS: int = 8 # 데이터 디렉토리 스캔 시 파일 해시를 병렬로 계산할 스레드 수
+    # 파일 읽기/청크 분할 병렬 처리 설정 (parallel_ingest.py)
+    INGEST_WORKERS: int = 0 # 분할 프로세스 수 (0이면 CPU 코어 수, 1이면 병렬 처리하지 않음)
+    INGEST_PARALLEL_MIN_FILES: int = 8 # 처리할 파일이 이 수 이상일 때만 프로세스 풀 사용 (워커 시작 비용이 더 큼)
+    INDEX_ADD_BATCH_SIZE: int = 64 # 벡터DB에 한 번에 추가(임베딩)할 청크 수 (재색인 진행 상황/취소 확인 단위)
+    INGEST_CHECKPOINT_SECONDS: float = 10.0 # 처리가 끝난 파일을 메타데이터에 중간 저장하는 최소 간격(초)
+    # 관리자 API(/admin/...) 인증 키. 요청 헤더 X-Admin-Key가 이 값과 같아야 함 (비어있으면 관리자 API를 사용할 수 없음)
+    ADMIN_API_KEY: str = ""
+    # 비동기 질의 처리 설정
+    MAX_CONCURRENT_QUERIES: int = 32 # 워커 하나가 동시에 처리하는 최대 질문 수 (초과분은 대기)
+    QUERY_EXECUTOR_WORKERS: int = 4 # 질문 임베딩/벡터 검색(CPU 작업)을 처리할 스레드 수
+    # 동시에 들어온 질문 임베딩을 모아 한 번의 배치로 계산 (embedding_batcher.py)
+    # 동시에 임베딩하는 질문 수는 QUERY_EXECUTOR_WORKERS를 넘지 않으므로, 배치 크기도 그 이하가 됨
+    EMBEDDING_BATCHING_ENABLED: bool = True
+    EMBEDDING_BATCH_MAX_SIZE: int = 16 # 한 번에 계산할 최대 질문 수
+    EMBEDDING_BATCH_MAX_WAIT_SECONDS: float = 0.005 # 첫 질문이 도착한 뒤 다른 질문을 기다리는 최대 시간(초)
+    # 의미 기반 답변 캐시 설정 (answer_cache.py)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95 # 이 값 이상으로 유사한 질문만 답변 재사용 (코사인 유사도)
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000 # 최대 저장 답변 수 (초과 시 LRU 제거)
+    ANSWER_CACHE_TTL_SECONDS: int = 3600 # 답변 유효 시간(초)
+    # 질문 임베딩/검색 결과 캐시 설정 (query_cache.py)
+    QUERY_CACHE_ENABLED: bool = True
+    QUERY_CACHE_MAX_ENTRIES: int = 2048 # 임베딩, 검색 결과 각각의 최대 저장 수 (초과 시 LRU 제거)
     PROMPT_TEMPLATE: str = """당신은 대한민국 정부에서 주관하는 청년 정책의 정확한 정보를 제공하는 AI 어시스턴트입니다.
 주어진 문맥(context) 정보를 바탕으로 질문에 답변해주세요. 문맥에서 답을 찾을 수 없다면, "제공된 정보만으로는 답변하기 어렵습니다."라고 솔직하게 말해주세요.
 
@@ -59,7 +115,46 @@ class Settings(BaseSettings):
 """
     DATA_PATH: Path = BASE_DIR / "my_data_directory"
     VECTORSTORE_PATH: Path = BASE_DIR / "chroma_db_rag_kure_store"
+    # 벡터 색인 저장소 종류 (vector_index.py), 두 저장소 모두 VECTORSTORE_PATH 디렉토리를 사용
+    # "chroma" : langchain Chroma (SQLite) | "numpy" : 메모리 맵 float32 행렬 + JSON sidecar (정확 검색)
+    # 처음 바꾸면 새 저장소가 비어있으므로 시작 시 모든 파일을 다시 반영함 (이전 저장소로 되돌릴 때는 전체 재색인 필요)
+    VECTOR_INDEX_BACKEND: str = "chroma"
+    # numpy 저장소의 검색용 압축 표현 (vector_compression.py) : 압축 표현으로 후보를 고른 뒤 후보만 float32 원본으로 다시 계산
+    NUMPY_INDEX_COMPRESSION: str = "none" # "none" | "float16" | "int8" (차원별 배율 양자화)
+    NUMPY_INDEX_PCA_DIMS: int = 0 # 0보다 크면 색인 시 학습한 PCA로 이 차원까지 줄여서 압축 (예: 256)
+    NUMPY_INDEX_RESCORE_MULTIPLIER: int = 4 # float32 원본으로 다시 계산할 후보 수 = 검색 수 x 이 값
+    LEXICAL_INDEX_PATH: Path = BASE_DIR / "lexical_index.json" # BM25 어휘 색인 저장 파일
+    # 데이터 디렉토리 변경 감시 설정 (data_watcher.py) : 재시작 없이 변경된 파일을 벡터DB에 반영
+    DATA_WATCHER_ENABLED: bool = True
+    DATA_WATCHER_BACKEND: str = "auto" # "auto" (watchdog 설치 시 사용, 없으면 폴링) | "watchdog" | "polling"
+    DATA_WATCHER_DEBOUNCE_SECONDS: float = 2.0 # 마지막 변경 후 이 시간 동안 추가 변경이 없으면 반영
+    DATA_WATCHER_POLL_INTERVAL_SECONDS: float = 5.0 # 폴링 방식의 확인 주기(초)
+    # 청크 임베딩 디스크 캐시 (embedding_cache.py) : 내용이 같은 청크는 재임베딩하지 않음
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: Path = BASE_DIR / "embedding_cache"
     CHAT_HISTORY_FILE: Path = BASE_DIR / "chat_history.json"
+    # 대화 기록 저장소 종류
+    # "sqlite" : 사용자별 메시지를 SQLite(WAL 모드)에 행 단위로 추가 (기본값)
+    # "json" : 모든 사용자의 기록을 CHAT_HISTORY_FILE 하나에 저장하는 기존 방식
+    CHAT_HISTORY_BACKEND: str = "sqlite"
+    CHAT_HISTORY_DB_FILE: Path = BASE_DIR / "chat_history.db"
+    # 대화 기록 메모리 캐시 설정 (ChatMemoryManager)
+    CHAT_CACHE_MAX_MEMBERS: int = 1000 # 메모리에 유지할 최근 사용자 수 (LRU)
+    CHAT_FLUSH_INTERVAL_SECONDS: float = 1.0 # 새 메시지를 저장소에 모아서 기록하는 주기(초)
+    # 프롬프트에 원문 그대로 넣을 최근 대화의 최대 토큰 수 (추정치)
+    # 이보다 오래된 대화는 사용자별 요약에 누적되어 '이전 대화 요약'으로만 전달됨
+    HISTORY_TOKEN_BUDGET: int = 1500
+    HISTORY_SUMMARY_PROMPT_TEMPLATE: str = """다음은 청년 정책 상담 AI와 사용자의 이전 대화 요약과, 그 이후에 이어진 대화입니다.
+두 내용을 합쳐 이후 대화에 필요한 정보(사용자의 상황, 관심 정책, 이미 안내한 내용)만 남긴 하나의 요약을 500자 이내로 작성해주세요.
+
+기존 요약:
+{previous_summary}
+
+이어진 대화:
+{conversation}
+
+새 요약:
+"""
     CORS_ORIGINS: list[str] = [
         "http://localhost:3000",
         "http://127.0.0.1:3000",
@@ -0,0 +1,129 @@
+# context_packer.py
+"""
+검색된 청크들을 프롬프트의 문맥(context) 문자열로 조립합니다.
+
+청크를 그대로 이어 붙이면 인접한 청크 사이의 겹침(CHUNK_OVERLAP) 구간이 두 번 들어가고,
+관련도가 낮은 하위 결과까지 모두 LLM에 전달되므로 다음 순서로 문맥을 줄입니다.
+1. 관련도 컷오프 : 점수(metadata["relevance_score"])가 min_relevance_score 미만인 청크 제외
+   (점수가 없는 청크(어휘 검색으로만 찾은 청크 등)와 가장 관련도가 높은 청크는 항상 유지)
+2. 인접 청크 병합 : 같은 파일의 청크 중 한 청크의 끝부분과 다른 청크의 시작 부분이 같으면(겹침 구간)
+   겹침을 한 번만 남기고 하나의 구간으로 합침. 다른 청크에 완전히 포함된 청크는 제외
+3. 토큰 예산 : 관련도 순서대로 구간을 담다가 token_budget(추정 토큰 수)을 넘는 구간은 건너뜀
+   (첫 구간 하나가 예산보다 크면 예산에 맞게 잘라서 사용)
+"""
+from typing import List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+from token_utils import estimate_tokens
+
+# 로거
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 문맥에서 구간 사이의 구분자 (청크 분할기의 문장 구분자와 같음)
+PASSAGE_SEPARATOR = "\n\n"
+# 겹침으로 인정할 최소 문자 수 (짧은 우연한 일치로 다른 위치의 청크가 합쳐지지 않도록)
+MIN_OVERLAP_CHARS = 10
+
+
+# first의 끝부분과 second의 시작 부분이 겹치는 길이 (min_chars 미만이면 0)
+def _overlap_length(first: str, second: str, min_chars: int = MIN_OVERLAP_CHARS) -> int:
+    if len(first) < min_chars or len(second) < min_chars:
+        return 0
+    probe = second[:min_chars]
+    # first 안에서 second의 시작 부분이 나오는 위치를 앞에서부터 찾으므로, 처음 맞는 위치가 가장 긴 겹침
+    start = first.find(probe, max(0, len(first) - len(second)))
+    while start != -1:
+        if second.startswith(first[start:]):
+            return len(first) - start
+        start = first.find(probe, start + 1)
+    return 0
+
+
+# 같은 파일의 청크 내용 목록(관련도 순)을 겹침 기준으로 합친 구간 목록으로 반환 (관련도 순서 유지)
+def merge_adjacent_chunks(contents: Sequence[str], min_overlap_chars: int = MIN_OVERLAP_CHARS) -> List[str]:
+    passages: List[str] = []
+    for content in contents:
+        # 이미 담은 구간에 포함된 청크는 제외
+        if any(content in passage for passage in passages):
+            continue
+        passages.append(content)
+        # 새로 합쳐진 구간이 다른 구간과 다시 이어질 수 있으므로, 더 이상 합칠 구간이 없을 때까지 반복
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(passages)):
+                for j in range(len(passages)):
+                    if i == j:
+                        continue
+                    if passages[j] in passages[i]:
+                        del passages[j]
+                        merged = True
+                        break
+                    overlap = _overlap_length(passages[i], passages[j], min_overlap_chars)
+                    if overlap:
+                        # 합친 구간은 두 구간 중 관련도가 높은(앞쪽) 자리에 둠
+                        keep, drop = min(i, j), max(i, j)
+                        passages[keep] = passages[i] + passages[j][overlap:]
+                        del passages[drop]
+                        merged = True
+                        break
+                if merged:
+                    break
+    return passages
+
+
+# text를 토큰 예산에 맞게 앞부분만 남김 (추정 토큰 수 기준 이진 탐색)
+def _truncate_to_budget(text: str, token_budget: int) -> str:
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= token_budget:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low]
+
+
+# 검색된 청크(관련도 순)를 문맥 문자열로 조립
+# token_budget이 0 이하이면 토큰 예산을 적용하지 않음
+def pack_context(docs: Sequence[Document], token_budget: int = 0,
+                 min_relevance_score: Optional[float] = None) -> str:
+    if not docs:
+        return ""
+
+    # 1. 관련도 컷오프 (가장 관련도가 높은 청크는 항상 유지)
+    kept_docs = [docs[0]]
+    for doc in docs[1:]:
+        score = doc.metadata.get("relevance_score")
+        if min_relevance_score is None or score is None or score >= min_relevance_score:
+            kept_docs.append(doc)
+
+    # 2. 파일별로 모아서 인접 청크 병합. 파일 순서는 파일에서 가장 관련도가 높은 청크의 순위를 따름
+    contents_by_file = {}
+    for doc in kept_docs:
+        file_key = doc.metadata.get("relative_path") or doc.metadata.get("source")
+        contents_by_file.setdefault(file_key, []).append(doc.page_content)
+    passages = [
+        passage
+        for contents in contents_by_file.values()
+        for passage in merge_adjacent_chunks(contents)
+    ]
+
+    # 3. 토큰 예산 (구분자는 공백이라 토큰 수에 포함되지 않음)
+    packed: List[str] = []
+    used_tokens = 0
+    for passage in passages:
+        passage_tokens = estimate_tokens(passage)
+        if token_budget <= 0 or used_tokens + passage_tokens <= token_budget:
+            packed.append(passage)
+            used_tokens += passage_tokens
+        elif not packed:
+            packed.append(_truncate_to_budget(passage, token_budget))
+            used_tokens = estimate_tokens(packed[0])
+
+    logger.debug(f"문맥 조립: 청크 {len(docs)}개 -> 관련도 통과 {len(kept_docs)}개 -> 구간 {len(passages)}개 "
+                 f"-> 사용 {len(packed)}개 (추정 토큰: {used_tokens})")
+    return PASSAGE_SEPARATOR.join(packed)
@@ -1,6 +1,6 @@
 # data_manager.py
 """
-{ 파일 상대 경로 : 파일 해시값 }에 대한 목록을 JSON으로 저장하고 관리합니다.
+{ 파일 상대 경로 : 파일 해시값, 크기/수정 시각, 청크 목록 }에 대한 목록(manifest)을 JSON으로 저장하고 관리합니다.
 
 해당 모듈은 새로운 데이터 파일을 추가할 때,
 기존에 존재하던 벡터 DB를 수동 삭제해야하는
@@ -10,6 +10,9 @@
 - 이전 처리 정보(JSON)와 현재 파일 목록/해시값 비교
 - 변경 파일(신규/수정/삭제) 목록 반환
 - 처리 후 최신 파일 정보를 JSON에 업데이트
+- 파일별 청크 목록(고정 청크 ID, 청크 해시)을 기록하여, 수정된 파일은 바뀐 청크만 다시 반영
+  (삭제/비교 시 벡터DB를 조회하지 않고 기록된 청크 ID만 사용)
+- 메타데이터는 임시 파일에 기록한 뒤 교체하는 방식으로 원자적으로 저장
 
 * 일반적인 해시코드: 객체 식별용 정수값. 내용/ID가 같으면 해시코드도 동일.
 * 파일 해시: 파일 내용 기반 고유 식별값 (16진수 문자열). 내용 변경 시 해시값도 변경됨.
@@ -23,7 +26,9 @@ from json import JSONDecodeError
 from pathlib import Path
 # 로거
 import logging
-from typing import List, Dict, Tuple, Set, Any
+from typing import List, Dict, Tuple, Set, Any, Iterator
+# 파일 해시를 병렬로 계산하기 위한 스레드 풀
+from concurrent.futures import ThreadPoolExecutor
 
 # config.py setting load
 import config
@@ -33,6 +38,7 @@ logger = logging.getLogger(__name__)
 # 메타데이터를 저장할 파일의 경로
 METADATA_FILE_PATH = config.BASE_DIR / "data_files_metadata.json"
 ALLOWED_EXTENSIONS = {".txt"} # 허용된 확장자
+HASH_READ_BUFFER_SIZE = 1024 * 1024 # 파일 해시 계산 시 한 번에 읽을 크기 (1MB)
 
 # 파일 내용의 SHA256 해시값을 계산하여 문자열로 반환. 오류 시 빈 문자열.
 def calculate_file_hash(file_path: Path) -> str:
@@ -44,9 +50,10 @@ def calculate_file_hash(file_path: Path) -> str:
             # iter() 함수는 두 개의 인자를 받을 때 특별한 방식으로 동작
             # 첫번째 인자 : 호출 가능한 객체
             # 두번째 인자 : 종료 값
-            # f.read(4096) : 최대 4096byte 만큼 데이터를 읽어옴, 일반적 관례로 4KB를 사용
+            # f.read(HASH_READ_BUFFER_SIZE) : 최대 1MB 만큼 데이터를 읽어옴
+            # (4KB 단위로 읽으면 큰 파일에서 read 호출과 파이썬 반복 횟수가 지나치게 많아짐)
             # b"" : 빈 바이트 문자열, f.read()가 파일의 끝에 도달하면 b""을 반환
-            for byte_block in iter(lambda: f.read(4096), b""):
+            for byte_block in iter(lambda: f.read(HASH_READ_BUFFER_SIZE), b""):
                 # 읽어온 데이터 덩어리(byte_block)를 가져와서 sha256_hash 객체의 내부 상태를 변경
                 sha256_hash.update(byte_block)
         # 최종적으로 계산된 256비트 해시값을 16진수 문자열로 출력
@@ -69,26 +76,37 @@ def load_metadata() -> Dict[str, Dict[str, Any]]:
         logger.error(f"메타 데이터 불러오는 과정에서 오류 발생, 경로: {METADATA_FILE_PATH}", exc_info=True)
         return {}
 
+# 객체를 JSON 파일로 원자적으로 저장 (메타데이터, 어휘 색인 등에서 사용)
+# 같은 디렉토리의 임시 파일에 모두 기록한 뒤 os.replace로 교체하므로,
+# 저장 도중 프로세스가 종료되어도 기존 파일이 깨지지 않고 이전 내용 또는 새 내용 중 하나로 남음
+# 실패하면 임시 파일을 정리한 뒤 예외를 그대로 발생시킴 (기존 파일은 그대로 유지)
+def write_json_atomic(file_path: Path, data: Any, indent: int | None = 4):
+    file_path = Path(file_path)
+    temp_file_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(temp_file_path, "w", encoding='utf-8') as f:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+            # 교체 전에 내용이 디스크에 기록되도록 보장
+            f.flush()
+            os.fsync(f.fileno())
+        # 같은 파일 시스템 안에서의 이름 변경은 원자적으로 수행됨
+        os.replace(temp_file_path, file_path)
+    except BaseException:
+        if temp_file_path.exists():
+            temp_file_path.unlink()
+        raise
+
 # 파일 처리 메타데이터 딕셔너리를 JSON 파일에 저장.
 def save_metadata(metadata: Dict[str, Dict[str, Any]]):
     try:
-        with open(METADATA_FILE_PATH, "w", encoding='utf-8') as f:
-            # 전달받은 metadata를 f에 저장
-            # indent=4 : 4칸 들여쓰기 허용
-            json.dump(metadata, f, indent=4, ensure_ascii=False)
+        # 전달받은 metadata를 4칸 들여쓰기로 저장
+        write_json_atomic(METADATA_FILE_PATH, metadata)
         logger.info(f"메타데이터 저장 완료, 경로: {METADATA_FILE_PATH}")
-    except IOError:
+    except (IOError, TypeError, ValueError):
         logger.error(f"메타데이터 저장 중 오류 발생, 경로: {METADATA_FILE_PATH}", exc_info=True)
 
-# 데이터 디렉토리를 스캔, 파일들의 (상대 경로: 현재 해시값) 딕셔너리 반환.
-def scan_data_directory(data_path: Path) -> Dict[str, str]:
-    # 현재 모든 파일의 정보
-    current_files_hashes: Dict[str, str] = {}
-    if not data_path.is_dir():
-        logger.warning(f"해당 경로에 디렉토리가 존재하지 않거나, 디렉토리가 아닙니다. 입력된 경로: {data_path}")
-        # 초기값을 그대로 반환
-        return current_files_hashes
-
+# 데이터 디렉토리의 하위 디렉토리까지 모두 방문하며, 허용된 확장자의 파일을 (상대 경로 문자열, 전체 경로)로 반환
+def iter_data_files(data_path: Path) -> Iterator[Tuple[str, Path]]:
     # os.work() : 입력 받은 경로의 하위 디렉토리를 전부 방문, 각 디렉토리의 튜플을 반환
     # 해당 튜플의 구조는 dirpath(str), dirnames(list), filenames(list)로 구성됨
     # root : dirpath | files : filenames
@@ -98,25 +116,100 @@ def scan_data_directory(data_path: Path) -> Dict[str, str]:
         for filename in files:
             # suffix : 파일 경로에서 마지막 점(.) 이후의 문자열 부분, 즉 확장자를 반환
             # 파일이 허용된 확장자를 사용하고 있는지 확인
-            if Path(filename).suffix.lower() in ALLOWED_EXTENSIONS:
-                # 현재 디렉토리(root)와 파일명(filename)을 결합하여 파일의 전체 경로 객체 생성
-                file_path_obj = Path(root) / filename
-                try:
-                    # data_path를 기준으로 현재 파일(file_path_obj)의 상대 경로를 계산하여 문자열로 저장
-                    relative_file_path_str = str(file_path_obj.relative_to(data_path))
-                    # 현재 파일의 해시를 생성해서 저장
-                    file_hash = calculate_file_hash(file_path_obj)
-                    if file_hash:
-                        # 스캔된 파일 목록(current_files_hashes)에 현재 파일의 상대 경로와 해시값 키:값 쌍으로 매핑
-                        current_files_hashes[relative_file_path_str] = file_hash
-                except ValueError:
-                    logger.warning(f"{data_path}를 기준으로 {file_path_obj}에 대한 상대 경로를 확인할 수 없습니다. ")
-                except Exception:
-                    logger.error(f"{file_path_obj} 파일을 스캔하는 과정에서 오류 발생", exc_info=True)
-
-        logger.debug(f"{data_path}에서 {len(current_files_hashes)} 파일을 스캔했습니다.")
-        # 업데이트 된 current_files_hashes 반환
-        return current_files_hashes
+            if Path(filename).suffix.lower() not in ALLOWED_EXTENSIONS:
+                continue
+            # 현재 디렉토리(root)와 파일명(filename)을 결합하여 파일의 전체 경로 객체 생성
+            file_path_obj = Path(root) / filename
+            try:
+                # data_path를 기준으로 현재 파일(file_path_obj)의 상대 경로를 계산하여 문자열로 저장
+                yield str(file_path_obj.relative_to(data_path)), file_path_obj
+            except ValueError:
+                logger.warning(f"{data_path}를 기준으로 {file_path_obj}에 대한 상대 경로를 확인할 수 없습니다. ")
+
+# 데이터 디렉토리의 {상대 경로: (크기, 수정 시각)} 스냅샷 반환 (파일 내용은 읽지 않음)
+# 변경 감시(data_watcher.py)의 폴링 방식에서 변경 여부를 빠르게 비교하는 데 사용
+def snapshot_data_directory(data_path: Path) -> Dict[str, Tuple[int, int]]:
+    snapshot: Dict[str, Tuple[int, int]] = {}
+    if not data_path.is_dir():
+        return snapshot
+    for relative_file_path_str, file_path_obj in iter_data_files(data_path):
+        try:
+            file_stat = file_path_obj.stat()
+        except OSError:
+            # 스캔 도중 삭제된 파일
+            continue
+        snapshot[relative_file_path_str] = (file_stat.st_size, file_stat.st_mtime_ns)
+    return snapshot
+
+# 데이터 디렉토리를 스캔, 파일들의 (상대 경로: 현재 해시값) 딕셔너리 반환.
+# previous_metadata가 주어지면 크기/수정 시각이 같은 파일은 해시를 다시 계산하지 않음
+def scan_data_directory(
+    data_path: Path,
+    previous_metadata: Dict[str, Dict[str, Any]] | None = None,
+    max_workers: int | None = None
+) -> Dict[str, str]:
+    current_files_stats = scan_data_directory_with_stats(data_path, previous_metadata, max_workers)
+    return {rel_path_str: file_stats["hash"] for rel_path_str, file_stats in current_files_stats.items()}
+
+# 데이터 디렉토리를 스캔, 파일들의 {상대 경로: {"hash", "size", "mtime_ns"}} 딕셔너리 반환.
+# - 이전 메타데이터에 기록된 크기(size)와 수정 시각(mtime_ns)이 현재 파일과 같으면 이전 해시를 그대로 사용
+# - 해시를 계산해야 하는 파일만 스레드 풀에서 병렬로 처리 (파일 읽기와 hashlib은 GIL을 해제함)
+def scan_data_directory_with_stats(
+    data_path: Path,
+    previous_metadata: Dict[str, Dict[str, Any]] | None = None,
+    max_workers: int | None = None
+) -> Dict[str, Dict[str, Any]]:
+    # 현재 모든 파일의 정보
+    current_files_stats: Dict[str, Dict[str, Any]] = {}
+    if not data_path.is_dir():
+        logger.warning(f"해당 경로에 디렉토리가 존재하지 않거나, 디렉토리가 아닙니다. 입력된 경로: {data_path}")
+        # 초기값을 그대로 반환
+        return current_files_stats
+
+    previous_metadata = previous_metadata or {}
+    # 해시 계산이 필요한 파일 [(상대 경로, 전체 경로)]
+    files_to_hash: List[Tuple[str, Path]] = []
+    reused_count = 0
+
+    for relative_file_path_str, file_path_obj in iter_data_files(data_path):
+        try:
+            file_stat = file_path_obj.stat()
+            file_stats = {"size": file_stat.st_size, "mtime_ns": file_stat.st_mtime_ns}
+
+            previous_file_metadata = previous_metadata.get(relative_file_path_str, {})
+            if previous_file_metadata.get("hash") and \
+                    previous_file_metadata.get("size") == file_stats["size"] and \
+                    previous_file_metadata.get("mtime_ns") == file_stats["mtime_ns"]:
+                # 크기와 수정 시각이 같으면 내용이 바뀌지 않은 것으로 보고 이전 해시 재사용
+                file_stats["hash"] = previous_file_metadata["hash"]
+                current_files_stats[relative_file_path_str] = file_stats
+                reused_count += 1
+            else:
+                current_files_stats[relative_file_path_str] = file_stats
+                files_to_hash.append((relative_file_path_str, file_path_obj))
+        except Exception:
+            logger.error(f"{file_path_obj} 파일을 스캔하는 과정에서 오류 발생", exc_info=True)
+
+    if files_to_hash:
+        workers = max_workers or config.settings.SCAN_HASH_WORKERS
+        if workers > 1 and len(files_to_hash) > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan-hash") as executor:
+                file_hashes = list(executor.map(calculate_file_hash, (path for _, path in files_to_hash)))
+        else:
+            file_hashes = [calculate_file_hash(path) for _, path in files_to_hash]
+
+        for (relative_file_path_str, _), file_hash in zip(files_to_hash, file_hashes):
+            if file_hash:
+                # 스캔된 파일 목록(current_files_stats)에 현재 파일의 해시값을 기록
+                current_files_stats[relative_file_path_str]["hash"] = file_hash
+            else:
+                # 해시 계산에 실패한 파일은 스캔 결과에서 제외
+                del current_files_stats[relative_file_path_str]
+
+    logger.debug(f"{data_path}에서 {len(current_files_stats)} 파일을 스캔했습니다. "
+                 f"(해시 재사용: {reused_count}, 새로 계산: {len(files_to_hash)})")
+    # 업데이트 된 current_files_stats 반환
+    return current_files_stats
 
 # 현재 파일 해시와 이전 메타데이터 비교, 변경된 파일(신규/수정/삭제) 목록 반환.
 def get_changed_files(
@@ -155,11 +248,55 @@ def get_changed_files(
 
     return new_files, modified_files, deleted_files_paths
 
+# 청크(분할된 문서 조각) 내용의 SHA256 해시값 반환
+def calculate_chunk_hash(chunk_text: str) -> str:
+    return hashlib.sha256(chunk_text.encode("utf-8")).hexdigest()
+
+# 벡터DB에 저장할 청크의 고정 ID 생성
+# (파일 상대 경로, 청크 해시, 같은 파일 안에서 같은 내용의 청크 중 몇 번째인지)로 만들기 때문에
+# 파일 앞부분에 내용이 추가/삭제되어 청크 순서가 밀려도, 내용이 그대로인 청크는 같은 ID를 유지함
+def make_chunk_id(relative_path: str, chunk_hash: str, occurrence: int) -> str:
+    return hashlib.sha256(f"{relative_path}\x00{chunk_hash}\x00{occurrence}".encode("utf-8")).hexdigest()
+
+# 한 파일의 청크 텍스트 목록(순서대로)을 [{"id": 청크 ID, "hash": 청크 해시}, ...] 목록으로 변환
+def build_chunk_records(relative_path: str, chunk_texts: List[str]) -> List[Dict[str, str]]:
+    records: List[Dict[str, str]] = []
+    # 청크 해시 -> 지금까지 나온 횟수
+    occurrences: Dict[str, int] = {}
+    for chunk_text in chunk_texts:
+        chunk_hash = calculate_chunk_hash(chunk_text)
+        occurrence = occurrences.get(chunk_hash, 0)
+        occurrences[chunk_hash] = occurrence + 1
+        records.append({
+            "id": make_chunk_id(relative_path, chunk_hash, occurrence),
+            "hash": chunk_hash
+        })
+    return records
+
+# 수정된 파일의 이전/현재 청크 목록 비교
+# 반환값 : (벡터DB에서 삭제할 청크 ID 목록, 새로 추가해야 할 청크의 현재 목록 내 위치(index) 목록)
+def diff_chunk_records(
+    old_records: List[Dict[str, str]],
+    new_records: List[Dict[str, str]]
+) -> Tuple[List[str], List[int]]:
+    old_ids: Set[str] = {record["id"] for record in old_records}
+    new_ids: Set[str] = {record["id"] for record in new_records}
+
+    ids_to_delete = [record["id"] for record in old_records if record["id"] not in new_ids]
+    indices_to_add = [i for i, record in enumerate(new_records) if record["id"] not in old_ids]
+    return ids_to_delete, indices_to_add
+
 # 벡터 DB에 성공적으로 반영된 파일들의 메타데이터를 최신 해시값으로 업데이트
+# chunk_records_by_path가 주어지면 파일별 청크 수와 청크 목록({"id", "hash"})도 함께 기록
+# splitter_engine이 주어지면 파일을 분할한 텍스트 분할기 종류도 기록 (분할기를 바꾸면 다시 분할하기 위해)
+# 파일 하나의 메타데이터 형식 : {"hash", "size", "mtime_ns", "splitter", "chunk_count", "chunks": [{"id", "hash"}, ...]}
 def update_metadata_after_processing(
     processed_relative_paths: List[str], # 처리된 상대 경로들
     current_files_hashes: Dict[str, str], # 현재 모든 파일의 정보
-    existing_metadata: Dict[str, Dict[str, Any]] # 기존 메타데이터(업데이트 전)
+    existing_metadata: Dict[str, Dict[str, Any]], # 기존 메타데이터(업데이트 전)
+    chunk_records_by_path: Dict[str, List[Dict[str, str]]] | None = None, # 파일별 청크 목록
+    current_files_stats: Dict[str, Dict[str, Any]] | None = None, # 파일별 크기/수정 시각
+    splitter_engine: str | None = None # 텍스트 분할기 종류 (settings.TEXT_SPLITTER_ENGINE)
 ) -> Dict[str, Dict[str, Any]]:
 
     updated_metadata = existing_metadata.copy()
@@ -175,8 +312,39 @@ def update_metadata_after_processing(
             updated_metadata[rel_path_str] = {
                 "hash": current_files_hashes[rel_path_str]
             }
+            # 다음 스캔에서 해시 계산을 건너뛸 수 있도록 크기와 수정 시각(나노초)을 함께 기록
+            if current_files_stats and rel_path_str in current_files_stats:
+                updated_metadata[rel_path_str]["size"] = current_files_stats[rel_path_str]["size"]
+                updated_metadata[rel_path_str]["mtime_ns"] = current_files_stats[rel_path_str]["mtime_ns"]
+            if splitter_engine:
+                updated_metadata[rel_path_str]["splitter"] = splitter_engine
+            if chunk_records_by_path and rel_path_str in chunk_records_by_path:
+                updated_metadata[rel_path_str]["chunk_count"] = len(chunk_records_by_path[rel_path_str])
+                updated_metadata[rel_path_str]["chunks"] = chunk_records_by_path[rel_path_str]
     return updated_metadata
 
+# 내용은 바뀌지 않았지만 현재와 다른 텍스트 분할기로 분할된 파일 목록 반환 (다시 분할해야 하는 파일)
+# 분할기가 기록되지 않은 파일도 어떤 분할기로 나뉘었는지 알 수 없으므로 포함
+def get_files_split_with_other_engine(
+    current_file_hashes: Dict[str, str],
+    previous_metadata: Dict[str, Dict[str, Any]],
+    splitter_engine: str
+) -> List[str]:
+    return [
+        rel_path_str for rel_path_str, current_hash in current_file_hashes.items()
+        if rel_path_str in previous_metadata
+        and previous_metadata[rel_path_str].get("hash") == current_hash
+        and previous_metadata[rel_path_str].get("splitter") != splitter_engine
+    ]
+
+# 메타데이터에 기록된 파일의 청크 ID 목록 반환
+# 청크 목록이 없는 이전 형식의 메타데이터라면 None
+def get_chunk_ids(file_metadata: Dict[str, Any]) -> List[str] | None:
+    chunk_records = file_metadata.get("chunks")
+    if chunk_records is None:
+        return None
+    return [record["id"] for record in chunk_records]
+
 # 삭제된 파일들의 경로를 받아, 기존 메타데이터에서 해당 항목들을 제거한 새 딕셔너리 반환.
 def remove_metadata_for_deleted_files(
     deleted_relative_paths: Set[str], # 삭제된 파일의 상대 경로
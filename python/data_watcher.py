@@ -0,0 +1,178 @@
+# data_watcher.py
+"""
+데이터 디렉토리(settings.DATA_PATH)의 변경을 감시하여, 서버를 재시작하지 않고 벡터DB에 반영합니다.
+watchdog 패키지가 설치되어 있으면 OS의 파일 시스템 이벤트(inotify 등)를 사용하고,
+없거나 초기화에 실패하면 파일 크기/수정 시각을 주기적으로 비교하는 폴링 방식으로 동작합니다.
+짧은 시간 안에 연속으로 발생한 변경은 하나로 모아(디바운스) on_change 콜백을 한 번만 호출하며,
+콜백은 전용 스레드에서 실행되므로 요청 처리 경로를 막지 않습니다.
+"""
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+from data_manager import ALLOWED_EXTENSIONS, snapshot_data_directory
+
+# watchdog은 선택 의존성 (pip install watchdog)
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# 로거 객체 생성
+logger = logging.getLogger(__name__)
+
+
+# watchdog 이벤트 중 데이터 파일(허용된 확장자)이나 디렉토리에 대한 이벤트만 전달
+class _DataFileEventHandler(FileSystemEventHandler):
+    def __init__(self, on_event: Callable[[], None]):
+        super().__init__()
+        self._on_event = on_event
+
+    def on_any_event(self, event):
+        # 파일 내용을 읽기만 하는 이벤트(opened, closed_no_write)는 무시
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        # 디렉토리가 삭제/이동되면 그 안의 파일도 함께 바뀌므로 디렉토리 이벤트도 포함
+        if event.is_directory or any(Path(path).suffix.lower() in ALLOWED_EXTENSIONS for path in paths if path):
+            self._on_event()
+
+
+class DataDirectoryWatcher:
+    """
+    data_path를 감시하다가 변경이 멈춘 뒤 debounce_seconds가 지나면 on_change를 호출.
+    on_change 실행 중에 들어온 변경은 실행이 끝난 뒤 다시 한 번 반영됨.
+
+    backend : "auto" (watchdog 사용 가능 시 watchdog, 아니면 폴링) | "watchdog" | "polling"
+    """
+
+    def __init__(self,
+                 data_path: Path,
+                 on_change: Callable[[], None],
+                 debounce_seconds: float = 2.0,
+                 poll_interval_seconds: float = 5.0,
+                 backend: str = "auto"):
+        self.data_path = Path(data_path)
+        self.on_change = on_change
+        self.debounce_seconds = debounce_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.backend = backend.lower()
+        # 실제로 사용 중인 감시 방식 ("watchdog" | "polling"), start() 이후 결정됨
+        self.active_backend: str | None = None
+
+        self._observer = None
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        # 변경 알림 (watchdog 이벤트 스레드 -> 감시 스레드)
+        self._change_event = threading.Event()
+        self._lock = threading.Lock()
+        self._pending = False
+        self._last_change_time = 0.0
+        # 폴링 방식에서 직전에 확인한 {상대 경로: (크기, 수정 시각)}
+        self._snapshot: Dict[str, Tuple[int, int]] = {}
+
+    # 감시 시작
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self.active_backend = "polling"
+        if self.backend in ("auto", "watchdog"):
+            if self._start_observer():
+                self.active_backend = "watchdog"
+            elif self.backend == "watchdog":
+                logger.warning("watchdog을 사용할 수 없어 폴링 방식으로 데이터 디렉토리를 감시합니다.")
+        if self.active_backend == "polling":
+            self._snapshot = snapshot_data_directory(self.data_path)
+
+        self._thread = threading.Thread(target=self._run, name="data-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"데이터 디렉토리 감시 시작: '{self.data_path}' (방식: {self.active_backend}, "
+                    f"디바운스: {self.debounce_seconds}초)")
+
+    # 감시 종료. 실행 중인 on_change가 있으면 끝날 때까지 기다림
+    def stop(self, timeout: float | None = None):
+        self._stop_event.set()
+        self._change_event.set()
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+                self._observer.join(timeout)
+            except Exception as e:
+                logger.warning(f"watchdog 감시 종료 중 오류: {e}")
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info("데이터 디렉토리 감시 종료.")
+
+    # 변경 발생 알림 (watchdog 이벤트 핸들러와 폴링에서 호출)
+    def notify_change(self):
+        with self._lock:
+            self._pending = True
+            self._last_change_time = time.monotonic()
+        self._change_event.set()
+
+    def _start_observer(self) -> bool:
+        if Observer is None:
+            return False
+        try:
+            observer = Observer()
+            observer.schedule(_DataFileEventHandler(self.notify_change), str(self.data_path), recursive=True)
+            observer.daemon = True
+            observer.start()
+        except Exception as e:
+            # inotify 감시 개수 제한 초과, 디렉토리 없음 등
+            logger.warning(f"watchdog 감시 시작 실패 ({e}). 폴링 방식으로 전환합니다.")
+            return False
+        self._observer = observer
+        return True
+
+    # 폴링 방식: 스냅샷을 다시 만들어 이전과 다르면 변경으로 처리
+    def _poll(self):
+        current_snapshot = snapshot_data_directory(self.data_path)
+        if current_snapshot != self._snapshot:
+            self._snapshot = current_snapshot
+            self.notify_change()
+
+    # 다음에 깨어날 때까지 기다릴 시간(초)
+    def _next_wait_seconds(self) -> float:
+        with self._lock:
+            pending = self._pending
+            last_change_time = self._last_change_time
+        waits = []
+        if pending:
+            waits.append(max(0.0, last_change_time + self.debounce_seconds - time.monotonic()))
+        if self.active_backend == "polling":
+            waits.append(self.poll_interval_seconds)
+        return min(waits) if waits else self.poll_interval_seconds
+
+    def _run(self):
+        next_poll_time = time.monotonic() + self.poll_interval_seconds
+        while not self._stop_event.is_set():
+            self._change_event.wait(self._next_wait_seconds())
+            self._change_event.clear()
+            if self._stop_event.is_set():
+                break
+
+            if self.active_backend == "polling" and time.monotonic() >= next_poll_time:
+                self._poll()
+                next_poll_time = time.monotonic() + self.poll_interval_seconds
+
+            with self._lock:
+                # 마지막 변경 이후 debounce_seconds 동안 추가 변경이 없을 때만 반영
+                ready = self._pending and time.monotonic() - self._last_change_time >= self.debounce_seconds
+                if ready:
+                    self._pending = False
+            if not ready:
+                continue
+
+            logger.info("데이터 디렉토리 변경 감지. 벡터DB 증분 갱신을 시작합니다.")
+            try:
+                self.on_change()
+            except Exception as e:
+                logger.error(f"데이터 디렉토리 변경 반영 중 오류 발생: {e}", exc_info=True)
@@ -0,0 +1,158 @@
+# embedding_batcher.py
+"""
+동시에 들어온 질문 임베딩(embed_query) 요청을 모아 한 번의 배치 추론으로 계산하는 디스패처입니다.
+
+질문마다 문장 하나짜리 모델 실행을 따로 하면, 같은 시간에 여러 문장을 묶어 계산할 수 있는 CPU 행렬 연산을 낭비합니다.
+- 요청 스레드는 대기열에 질문을 넣고 결과(Future)를 기다림
+- 디스패처 스레드는 첫 질문이 도착한 뒤 max_wait_seconds 동안(또는 max_batch_size개가 모일 때까지) 더 모아서
+  base_embeddings.embed_documents로 한 번에 계산하고 각 요청에 결과를 돌려줌 (같은 질문은 한 번만 계산)
+- 모델 오류는 해당 배치의 모든 요청에 같은 예외로 전달
+embed_documents(청크 임베딩)는 이미 배치로 호출되므로 모으지 않고 그대로 전달합니다.
+질문과 문서를 같은 방식으로 임베딩하는 모델(KURE-v1 등)에서만 사용합니다. (질문용 접두어를 붙이는 모델은 결과가 달라짐)
+"""
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+# 로거
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingQuery:
+    __slots__ = ("text", "enqueued_at", "future")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.enqueued_at = time.perf_counter()
+        self.future: Future = Future()
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """
+    base_embeddings의 embed_query 호출을 모아서 배치로 계산하는 Embeddings (스레드 안전).
+    start()로 디스패처 스레드를 시작하기 전이나 close() 후에는 base_embeddings.embed_query를 직접 호출합니다.
+    """
+
+    def __init__(self, base_embeddings: Embeddings, max_batch_size: int = 16, max_wait_seconds: float = 0.005,
+                 stats_window: int = 1000):
+        self.base_embeddings = base_embeddings
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max(0.0, max_wait_seconds)
+        self._queue: "queue.Queue[Optional[_PendingQuery]]" = queue.Queue()
+        # 대기열에 넣는 것과 종료를 직렬화 (종료 신호 뒤에 들어온 요청이 처리되지 않고 남지 않도록)
+        self._state_lock = threading.Lock()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        # 통계 (최근 stats_window개 요청의 대기 시간으로 분위수 계산)
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0 # 모델 오류가 발생한 배치 수
+        self._batch_sizes: Counter = Counter()
+        self._queue_delays: deque = deque(maxlen=stats_window)
+        self._forward_seconds = 0.0
+
+    # 디스패처 스레드 시작
+    def start(self) -> None:
+        with self._state_lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._thread.start()
+        logger.info(f"질문 임베딩 배치 처리 시작 (최대 배치: {self.max_batch_size}, "
+                    f"최대 대기: {self.max_wait_seconds * 1000:.1f}ms)")
+
+    # 대기열에 남은 요청을 모두 처리한 뒤 디스패처 스레드 종료
+    def close(self) -> None:
+        with self._state_lock:
+            if not self._running:
+                return
+            self._running = False
+            self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        logger.info("질문 임베딩 배치 처리 종료.")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base_embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        pending = _PendingQuery(text)
+        with self._state_lock:
+            running = self._running
+            if running:
+                self._queue.put(pending)
+        if not running:
+            return self.base_embeddings.embed_query(text)
+        return pending.future.result()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            # 첫 요청이 도착한 시점부터 최대 대기 시간까지 더 모음 (이미 대기열에 있는 요청은 시간이 지나도 포함)
+            deadline = first.enqueued_at + self.max_wait_seconds
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    pending = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[_PendingQuery]) -> None:
+        started = time.perf_counter()
+        # 같은 질문은 한 번만 계산
+        texts = list(dict.fromkeys(pending.text for pending in batch))
+        try:
+            vectors = self.base_embeddings.embed_documents(texts)
+        except Exception as e:
+            logger.error(f"질문 임베딩 배치({len(batch)}개) 계산 중 오류 발생: {e}", exc_info=True)
+            for pending in batch:
+                pending.future.set_exception(e)
+            failed = True
+        else:
+            vector_by_text = dict(zip(texts, vectors))
+            for pending in batch:
+                pending.future.set_result(list(vector_by_text[pending.text]))
+            failed = False
+
+        with self._stats_lock:
+            self.requests += len(batch)
+            self.batches += 1
+            self.errors += int(failed)
+            self._batch_sizes[len(batch)] += 1
+            self._queue_delays.extend(started - pending.enqueued_at for pending in batch)
+            self._forward_seconds += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            delays_ms = sorted(delay * 1000 for delay in self._queue_delays)
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "errors": self.errors,
+                "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "queue_delay_ms": {
+                    "mean": sum(delays_ms) / len(delays_ms) if delays_ms else 0.0,
+                    "p95": delays_ms[min(len(delays_ms) - 1, int(len(delays_ms) * 0.95))] if delays_ms else 0.0,
+                    "max": delays_ms[-1] if delays_ms else 0.0,
+                },
+                "mean_forward_ms": self._forward_seconds * 1000 / self.batches if self.batches else 0.0,
+            }
@@ -0,0 +1,224 @@
+# embedding_cache.py
+"""
+문서 조각(청크) 임베딩을 디스크에 저장해 두고 재사용하는 캐시입니다.
+
+파일이 수정되거나 벡터DB를 새로 만들 때, 내용이 바뀌지 않은 청크까지
+임베딩 모델로 다시 계산하지 않도록 (임베딩 모델 이름, 청크 텍스트 해시)를 키로 벡터를 저장합니다.
+
+저장 구조 (모델별 디렉토리: cache_dir/<모델 이름>/)
+- meta.json : 모델 이름, 벡터 차원
+- hashes.txt : 청크 텍스트의 SHA256 해시, 한 줄에 하나 (행 번호 = 벡터 번호)
+- vectors.f32 : float32 벡터를 행 순서대로 이어 붙인 파일 (numpy 메모리 맵으로 읽음)
+
+두 파일 모두 뒤에 덧붙이기만 하므로 기존 내용을 다시 쓰지 않습니다.
+벡터를 먼저 쓰고 해시를 나중에 쓰며, 로드 시 두 파일 중 짧은 쪽에 맞춰 잘라내므로
+쓰는 도중 프로세스가 종료되어도 해시와 벡터의 순서가 어긋나지 않습니다.
+쓰기에 실패하면(디스크 부족 등) 두 파일을 쓰기 전 길이로 되돌립니다.
+
+여러 워커 프로세스가 같은 캐시 디렉토리를 사용할 수 있도록, 로드(잘라내기 포함)와 덧붙이기는
+cache.lock 파일 잠금 안에서 수행합니다. 덧붙이기 전에는 다른 프로세스가 그 사이 덧붙인 행을 먼저 읽어 들이므로
+행 번호가 어긋나지 않습니다. 이때 해시 없이 남은 벡터(벡터만 쓰고 종료된 프로세스의 흔적)도 잘라냅니다.
+(잘라내기는 어떤 프로세스도 참조하지 않는, 해시가 기록되지 않은 끝부분에만 적용)
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from filelock import FileLock
+from langchain_core.embeddings import Embeddings
+
+# 로거
+import logging
+
+logger = logging.getLogger(__name__)
+
+_FLOAT32_BYTES = 4
+_LOCK_TIMEOUT_SECONDS = 10 # 다른 프로세스가 캐시 파일을 쓰는 동안 기다리는 최대 시간(초)
+
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# 모델 이름을 디렉토리 이름으로 사용할 수 있게 변환 (예: nlpai-lab/KURE-v1 -> nlpai-lab__KURE-v1)
+def model_dir_name(model_name: str) -> str:
+    return re.sub(r"[^0-9A-Za-z._-]", "_", model_name.replace("/", "__"))
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, base_embeddings: Embeddings, model_name: str, cache_dir: Path):
+        self.base_embeddings = base_embeddings
+        self.model_name = model_name
+        self.cache_dir = Path(cache_dir) / model_dir_name(model_name)
+        self.meta_path = self.cache_dir / "meta.json"
+        self.hashes_path = self.cache_dir / "hashes.txt"
+        self.vectors_path = self.cache_dir / "vectors.f32"
+        # 같은 프로세스의 스레드 사이 잠금과, 같은 캐시 디렉토리를 사용하는 프로세스 사이 파일 잠금
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._file_lock = FileLock(str(self.cache_dir / "cache.lock"), timeout=_LOCK_TIMEOUT_SECONDS)
+        # 텍스트 해시 -> 행 번호
+        self._rows: Dict[str, int] = {}
+        # 읽어 들인 행 수와 hashes.txt에서 읽은 위치(바이트). 다른 프로세스가 덧붙인 행은 이 위치부터 읽음
+        # (여러 프로세스가 같은 텍스트를 동시에 계산하면 같은 해시가 두 행에 기록될 수 있어 len(_rows)와 다를 수 있음)
+        self._row_count = 0
+        self._hashes_offset = 0
+        self._dim: int | None = None
+        self._vectors: np.ndarray | None = None
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with self._file_lock:
+                loaded = self._load_locked()
+        except OSError as e:
+            # 잠금 대기 시간 초과(filelock.Timeout) 포함
+            logger.error(f"임베딩 캐시 로드 실패, 캐시 없이 진행합니다: {self.cache_dir}, 오류: {e}")
+            self._dim = None
+            return
+        if loaded:
+            logger.info(f"임베딩 캐시 로드 완료: {self.cache_dir} (벡터 {self._row_count}개, 차원 {self._dim})")
+
+    def _load_locked(self) -> bool:
+        if not self.meta_path.exists():
+            return False
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self._dim = int(json.load(f)["dim"])
+            hashes: List[str] = []
+            if self.hashes_path.exists():
+                with open(self.hashes_path, "r", encoding="utf-8") as f:
+                    content = f.read()
+                # split 결과의 마지막 요소는 빈 문자열이거나, 개행 없이 끊긴 줄(쓰는 도중 종료)이므로 사용하지 않음
+                hashes = content.split("\n")[:-1]
+            vector_bytes = self.vectors_path.stat().st_size if self.vectors_path.exists() else 0
+            row_count = min(len(hashes), vector_bytes // (self._dim * _FLOAT32_BYTES))
+        except (ValueError, KeyError, json.JSONDecodeError) as e:
+            logger.error(f"임베딩 캐시 로드 실패, 캐시 없이 진행합니다: {self.cache_dir}, 오류: {e}")
+            self._dim = None
+            return False
+
+        # 해시와 벡터 개수가 어긋난 경우, 완전히 기록된 행까지만 남기고 잘라냄 (파일 잠금 안에서만 수행)
+        self._row_count = row_count
+        self._hashes_offset = sum(len(text_hash.encode("utf-8")) + 1 for text_hash in hashes[:row_count])
+        self._truncate()
+        self._rows = {text_hash: row for row, text_hash in enumerate(hashes[:row_count])}
+        self._remap()
+        return True
+
+    # 두 파일을 읽어 들인 행 수(_row_count, _hashes_offset)에 맞춰 잘라냄. 길이가 같으면 건드리지 않음
+    def _truncate(self):
+        expected_sizes = ((self.vectors_path, self._row_count * self._dim * _FLOAT32_BYTES),
+                          (self.hashes_path, self._hashes_offset))
+        for path, size in expected_sizes:
+            if path.exists() and path.stat().st_size != size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+    # 벡터 파일을 읽기 전용 메모리 맵으로 다시 연결 (덧붙인 뒤 크기가 바뀌므로)
+    def _remap(self):
+        if self._row_count == 0 or self._dim is None:
+            self._vectors = None
+            return
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self._row_count, self._dim))
+
+    # 다른 프로세스가 덧붙인 행을 읽어 들임 (파일 잠금 안에서 호출하므로 두 파일은 항상 같은 행 수)
+    def _read_new_rows(self):
+        if self._dim is None:
+            if not self.meta_path.exists():
+                return
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self._dim = int(json.load(f)["dim"])
+        if not self.hashes_path.exists():
+            return
+        with open(self.hashes_path, "rb") as f:
+            f.seek(self._hashes_offset)
+            new_hashes = f.read().decode("utf-8").split("\n")[:-1]
+        for text_hash in new_hashes:
+            self._rows[text_hash] = self._row_count
+            self._row_count += 1
+            self._hashes_offset += len(text_hash.encode("utf-8")) + 1
+
+    # 새로 계산한 벡터를 파일 끝에 덧붙임 (벡터 -> 해시 순서)
+    # 실패하면 두 파일을 쓰기 전 길이로 되돌린 뒤 예외를 그대로 발생시킴
+    def _append(self, text_hashes: List[str], vectors: List[List[float]]):
+        try:
+            with self._file_lock:
+                self._read_new_rows()
+                # 다른 프로세스가 벡터만 기록하고 해시를 쓰기 전에 종료되었다면 남은 벡터를 잘라낸 뒤 덧붙임
+                # (그대로 덧붙이면 이후 모든 행이 다른 벡터를 가리킴)
+                if self._dim is not None:
+                    self._truncate()
+                # 그 사이 다른 프로세스가 계산해 둔 텍스트는 다시 기록하지 않음
+                new_rows = [(text_hash, vector) for text_hash, vector in zip(text_hashes, vectors)
+                            if text_hash not in self._rows]
+                if not new_rows:
+                    return
+                array = np.asarray([vector for _, vector in new_rows], dtype=np.float32)
+                if self._dim is None:
+                    self._dim = int(array.shape[1])
+                    with open(self.meta_path, "w", encoding="utf-8") as f:
+                        json.dump({"model_name": self.model_name, "dim": self._dim}, f)
+                try:
+                    with open(self.vectors_path, "ab") as f:
+                        f.write(array.tobytes())
+                        f.flush()
+                        os.fsync(f.fileno())
+                    with open(self.hashes_path, "a", encoding="utf-8") as f:
+                        f.write("".join(f"{text_hash}\n" for text_hash, _ in new_rows))
+                except OSError:
+                    # 일부만 기록된 벡터/해시를 잘라내 마지막으로 일치하던 행 수로 되돌림
+                    # (남겨두면 다음 덧붙이기의 행 번호가 어긋남)
+                    self._rollback()
+                    raise
+                for text_hash, _ in new_rows:
+                    self._rows[text_hash] = self._row_count
+                    self._row_count += 1
+                    self._hashes_offset += len(text_hash.encode("utf-8")) + 1
+        finally:
+            # 다른 프로세스가 덧붙인 행을 읽어 들였을 수 있으므로 실패해도 다시 연결
+            self._remap()
+
+    def _rollback(self):
+        try:
+            self._truncate()
+        except OSError as e:
+            # 되돌리지 못한 끝부분은 다음 로드에서 짧은 쪽에 맞춰 잘라냄
+            logger.error(f"임베딩 캐시 쓰기 실패 후 되돌리기 실패: {self.cache_dir}, 오류: {e}")
+
+    # 캐시에 없는 텍스트만 임베딩 모델로 계산하고, 결과는 입력 순서대로 반환
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        text_hashes = [_hash_text(text) for text in texts]
+        with self._lock:
+            missing: Dict[str, str] = {}
+            for text, text_hash in zip(texts, text_hashes):
+                if text_hash not in self._rows and text_hash not in missing:
+                    missing[text_hash] = text
+
+            if missing:
+                new_vectors = self.base_embeddings.embed_documents(list(missing.values()))
+                try:
+                    self._append(list(missing.keys()), new_vectors)
+                except OSError as e:
+                    # 캐시 저장에 실패해도 임베딩 결과는 그대로 사용
+                    logger.error(f"임베딩 캐시 저장 실패: {self.cache_dir}, 오류: {e}")
+                    computed = dict(zip(missing.keys(), new_vectors))
+                    return [computed[h] if h in computed else self._vectors[self._rows[h]].tolist()
+                            for h in text_hashes]
+
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+            if texts:
+                logger.info(f"임베딩 캐시: 전체 {len(texts)}개 중 {len(texts) - len(missing)}개 재사용, {len(missing)}개 새로 계산")
+            return [self._vectors[self._rows[text_hash]].tolist() for text_hash in text_hashes]
+
+    # 질문 임베딩은 캐시하지 않음 (질문 캐시는 query_cache.py가 담당)
+    def embed_query(self, text: str) -> List[float]:
+        return self.base_embeddings.embed_query(text)
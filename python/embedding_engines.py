@@ -0,0 +1,161 @@
+# embedding_engines.py
+"""
+임베딩 모델(KURE-v1)을 CPU에서 더 빠르게 실행하는 추론 엔진입니다. settings.EMBEDDING_ENGINE으로 선택합니다.
+
+- "torch" : 기존 HuggingFaceEmbeddings (PyTorch float32, 기본값. rag_utils.get_embedding_model에서 생성)
+- "torch-int8" : 같은 PyTorch 모델의 Linear 층을 동적 int8 양자화 (torch.ao.quantization.quantize_dynamic)
+  가중치는 int8로 저장하고 활성값은 실행 중에 양자화하므로 추가 데이터나 내보내기 과정이 필요 없음
+- "onnx" : sentence-transformers의 ONNX 백엔드로 내보낸 모델을 ONNX Runtime으로 실행 (float32)
+- "onnx-int8" : 내보낸 ONNX 모델을 ONNX Runtime 동적 int8 양자화로 변환해 실행
+ONNX 모델은 처음 한 번만 내보내 onnx_dir/<모델 이름>/에 저장하고 이후에는 저장된 파일을 로드합니다.
+(sentence-transformers >= 3.2, optimum[onnxruntime] 필요)
+
+원본 모델과 결과가 달라지는 엔진이므로, 준비할 때 원본(PyTorch float32) 모델과 같은 문장의 임베딩 코사인 유사도를 비교합니다.
+최솟값이 min_cosine 미만이면 ValueError를 발생시킵니다. ONNX 엔진은 내보낼 때 한 번만 비교하고 결과를 parity.json에 저장합니다.
+"""
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from data_manager import write_json_atomic
+from embedding_cache import model_dir_name
+
+# 로거
+import logging
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_ENGINES = ("torch", "torch-int8", "onnx", "onnx-int8")
+PARITY_FILE_NAME = "parity.json"
+
+# 원본 모델과 비교할 문장 (청년 정책 문서의 질문/본문 형태)
+PARITY_SAMPLE_TEXTS = [
+    "청년 월세 지원은 누가 받을 수 있나요?",
+    "만 19세 이상 34세 이하의 무주택 청년에게 월 최대 20만 원을 12개월간 지원합니다.",
+    "신청은 복지로 누리집 또는 주소지 행정복지센터에서 할 수 있습니다.",
+    "청년도약계좌는 5년 동안 매월 70만 원 한도로 납입하면 정부 기여금을 더해 줍니다.",
+    "중위소득 150% 이하 가구의 청년만 신청할 수 있으며, 소득 증빙 서류를 제출해야 합니다.",
+    "취업 준비 중인 청년에게 구직활동 지원금 300만원을 6개월 동안 나누어 지급합니다.",
+    "전세보증금 반환보증 보증료를 최대 40만 원까지 지원합니다.",
+    "국민취업지원제도 1유형 참여자는 구직촉진수당을 받을 수 있다.",
+]
+
+
+# 임베딩 디스크 캐시의 모델 키 (엔진마다 벡터가 조금씩 다르므로 원본 엔진이 아니면 엔진 이름을 붙임)
+def embedding_cache_model_key(model_name: str, engine: str) -> str:
+    return model_name if engine == "torch" else f"{model_name}@{engine}"
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """SentenceTransformer 모델(백엔드 무관)을 langchain Embeddings로 감싼 클래스 (정규화된 벡터 반환)"""
+
+    def __init__(self, model: Any, batch_size: int = 32):
+        self.model = model
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        vectors = self.model.encode(list(texts), batch_size=self.batch_size, normalize_embeddings=True,
+                                    convert_to_numpy=True, show_progress_bar=False)
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+# 같은 문장들의 원본/비교 대상 임베딩 행렬에서 행별 코사인 유사도 통계
+def cosine_parity(expected: Sequence[Sequence[float]], actual: Sequence[Sequence[float]]) -> Dict[str, Any]:
+    expected = np.asarray(expected, dtype=np.float32)
+    actual = np.asarray(actual, dtype=np.float32)
+    cosine = np.sum(expected * actual, axis=1) / (
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+    )
+    return {
+        "samples": len(cosine),
+        "min_cosine": round(float(cosine.min()), 6),
+        "mean_cosine": round(float(cosine.mean()), 6),
+    }
+
+
+# 같은 문장에 대한 두 임베딩 모델의 코사인 유사도 통계
+def check_embedding_parity(reference: Embeddings, candidate: Embeddings,
+                           texts: Sequence[str] = PARITY_SAMPLE_TEXTS) -> Dict[str, Any]:
+    return cosine_parity(reference.embed_documents(list(texts)), candidate.embed_documents(list(texts)))
+
+
+def _require_parity(engine: str, parity: Dict[str, Any], min_cosine: float):
+    logger.info(f"임베딩 엔진 '{engine}' 원본 모델 대비 코사인 유사도: 최소 {parity['min_cosine']:.4f}, "
+                f"평균 {parity['mean_cosine']:.4f} (문장 {parity['samples']}개)")
+    if parity["min_cosine"] < min_cosine:
+        raise ValueError(f"임베딩 엔진 '{engine}'의 결과가 원본 모델과 다릅니다 "
+                         f"(최소 코사인 유사도 {parity['min_cosine']:.4f} < {min_cosine})")
+
+
+# PyTorch 모델을 동적 int8 양자화 (양자화 전 모델의 임베딩과 비교)
+def _load_torch_int8(model_name: str, batch_size: int, min_cosine: float) -> Embeddings:
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    embeddings = SentenceTransformerEmbeddings(SentenceTransformer(model_name, device="cpu"), batch_size=batch_size)
+    reference = embeddings.embed_documents(PARITY_SAMPLE_TEXTS)
+    torch.ao.quantization.quantize_dynamic(embeddings.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    _require_parity("torch-int8", cosine_parity(reference, embeddings.embed_documents(PARITY_SAMPLE_TEXTS)),
+                    min_cosine)
+    return embeddings
+
+
+# ONNX 모델을 처음 한 번만 내보냄 (int8이면 양자화한 파일도 생성)
+def _export_onnx(model_name: str, model_dir: Path, engine: str, file_name: str, quantization: str) -> None:
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    if not (model_dir / "onnx" / "model.onnx").exists():
+        logger.info(f"임베딩 모델 '{model_name}'을 ONNX로 내보내는 중: {model_dir}")
+        SentenceTransformer(model_name, device="cpu", backend="onnx").save_pretrained(str(model_dir))
+    if engine == "onnx-int8" and not (model_dir / file_name).exists():
+        logger.info(f"ONNX 모델 동적 int8 양자화 중 (설정: {quantization})")
+        export_dynamic_quantized_onnx_model(
+            SentenceTransformer(str(model_dir), device="cpu", backend="onnx"),
+            quantization_config=quantization,
+            model_name_or_path=str(model_dir),
+            file_suffix=f"qint8_{quantization}"
+        )
+
+
+def _load_onnx(engine: str, model_name: str, onnx_dir: Path, quantization: str, batch_size: int,
+               min_cosine: float) -> Embeddings:
+    from sentence_transformers import SentenceTransformer
+
+    model_dir = Path(onnx_dir) / model_dir_name(model_name)
+    file_name = f"onnx/model_qint8_{quantization}.onnx" if engine == "onnx-int8" else "onnx/model.onnx"
+    _export_onnx(model_name, model_dir, engine, file_name, quantization)
+    embeddings = SentenceTransformerEmbeddings(
+        SentenceTransformer(str(model_dir), device="cpu", backend="onnx", model_kwargs={"file_name": file_name}),
+        batch_size=batch_size
+    )
+
+    # 원본 모델과의 비교는 파일마다 한 번만 (원본 PyTorch 모델을 매번 로드하지 않도록)
+    parity_path = model_dir / PARITY_FILE_NAME
+    parity_results = {}
+    if parity_path.exists():
+        with open(parity_path, "r", encoding="utf-8") as f:
+            parity_results = json.load(f)
+    if file_name not in parity_results:
+        reference = SentenceTransformerEmbeddings(SentenceTransformer(model_name, device="cpu"))
+        parity_results[file_name] = check_embedding_parity(reference, embeddings)
+        write_json_atomic(parity_path, parity_results)
+    _require_parity(engine, parity_results[file_name], min_cosine)
+    return embeddings
+
+
+# PyTorch float32 이외의 엔진으로 임베딩 모델 로드 ("torch"는 rag_utils.get_embedding_model에서 생성)
+def load_embedding_engine(engine: str, model_name: str, onnx_dir: Path, quantization: str = "avx2",
+                          batch_size: int = 32, min_cosine: float = 0.99) -> Embeddings:
+    if engine == "torch-int8":
+        return _load_torch_int8(model_name, batch_size, min_cosine)
+    if engine in ("onnx", "onnx-int8"):
+        return _load_onnx(engine, model_name, onnx_dir, quantization, batch_size, min_cosine)
+    raise ValueError(f"지원하지 않는 임베딩 엔진입니다: '{engine}' (가능한 값: {', '.join(EMBEDDING_ENGINES)})")
@@ -0,0 +1,63 @@
+# korean_splitter.py
+"""
+JVM 없이 동작하는 규칙 기반 한국어 문장 분할기입니다.
+KonlpyTextSplitter(Kkma 형태소 분석)와 같은 방식으로 문장을 나눈 뒤 CHUNK_SIZE/CHUNK_OVERLAP에 맞춰 묶지만,
+문장 경계는 형태소 분석 대신 다음 규칙으로만 판단하므로 시작이 빠르고 문서당 처리 속도도 훨씬 빠릅니다.
+- 줄바꿈은 항상 문장 경계 (정책 문서의 항목/표 행 단위)
+- 문장 부호(. ! ? … 。 ？ ！) 뒤에 공백이나 줄 끝이 오면 경계 ('다.', '요.' 등의 종결 어미 포함)
+  닫는 따옴표/괄호는 앞 문장에 포함하고, '3.5'처럼 공백 없이 이어지는 마침표는 경계로 보지 않음
+- 줄 맨 앞의 '1.', '가.', '①.' 처럼 항목 번호만 있는 조각은 뒤 문장과 합침
+  (한 글자 항목 번호는 가나다라마바사아자차카타파하만 인정하므로 "네.", "예." 같은 한 음절 문장은 그대로 문장)
+rag_utils.get_text_splitter에서 settings.TEXT_SPLITTER_ENGINE = "rule"일 때 사용됩니다.
+"""
+import re
+from typing import Any, List
+
+from langchain_text_splitters import TextSplitter
+
+# 문장 끝: 문장 부호(연속 가능) + 닫는 따옴표/괄호, 그 뒤에 공백 또는 줄 끝
+_SENTENCE_END_PATTERN = re.compile(r"[.!?…。？！]+[\"'”’)\]」』]*(?=\s|$)")
+# 항목 번호만 있는 조각 (예: "1.", "12.", "가.", "①.", "(3).")
+# 한 글자 항목 번호는 가나다 순서의 열거 음절만 허용 ("네.", "예." 같은 한 음절 문장과 구분)
+_LIST_MARKER_PATTERN = re.compile(r"^\(?(\d{1,3}|[가나다라마바사아자차카타파하]|[①-⑳])\)?\.$")
+
+
+# 텍스트를 문장 리스트로 분할 (빈 문장 제외, 앞뒤 공백 제거)
+def split_korean_sentences(text: str) -> List[str]:
+    sentences: List[str] = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        start = 0
+        pending_marker = ""
+        line_first_index = len(sentences) # 이 줄의 첫 문장이 들어갈 위치
+        for match in _SENTENCE_END_PATTERN.finditer(line):
+            sentence = line[start:match.end()].strip()
+            start = match.end()
+            if not sentence:
+                continue
+            # 항목 번호는 줄 맨 앞(앞의 항목 번호 바로 뒤 포함)에 올 때만 인정하고, 다음 문장 앞에 붙임
+            if len(sentences) == line_first_index and _LIST_MARKER_PATTERN.match(sentence):
+                pending_marker = f"{pending_marker}{sentence} "
+                continue
+            sentences.append(pending_marker + sentence)
+            pending_marker = ""
+        rest = line[start:].strip()
+        if rest or pending_marker:
+            sentences.append((pending_marker + rest).strip())
+    return sentences
+
+
+class KoreanSentenceTextSplitter(TextSplitter):
+    """
+    규칙 기반 문장 분할 후 chunk_size/chunk_overlap에 맞춰 문장을 묶는 분할기.
+    KonlpyTextSplitter와 같은 separator("\\n\\n")로 문장을 이어 붙여, 엔진을 바꿔도 청크 형식이 같음.
+    """
+
+    def __init__(self, separator: str = "\n\n", **kwargs: Any):
+        super().__init__(**kwargs)
+        self._separator = separator
+
+    def split_text(self, text: str) -> List[str]:
+        return self._merge_splits(split_korean_sentences(text), self._separator)
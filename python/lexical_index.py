@@ -0,0 +1,259 @@
+# lexical_index.py
+"""
+청크 단위 어휘(BM25) 색인과, 벡터 검색 결과와의 RRF(Reciprocal Rank Fusion) 결합을 제공합니다.
+
+임베딩 유사도 검색은 정책명, 금액, 날짜("월 30만원", "2025년 3월 1일")처럼
+사용자가 그대로 입력한 표현과 정확히 일치하는 청크를 놓치는 경우가 있어, 어휘 검색 결과와 함께 순위를 결합합니다.
+- 토큰화 : 한글은 글자 2-gram(한 글자 단어는 그대로), 영문/숫자는 단어 단위, 숫자 바로 뒤의 단위 글자는 '30만', '3월'처럼 함께 토큰화
+  (형태소 분석기 없이 조사/어미가 붙은 어절도 부분 일치하며, 질문과 문서에 같은 규칙이 적용됨)
+- 색인은 벡터DB와 같은 청크 ID로 추가(upsert)/삭제되어 재색인 시 증분 갱신되고,
+  파일별 단어 빈도까지 JSON으로 저장하므로 서버 시작 시 문서를 다시 토큰화하지 않음
+"""
+import re
+import math
+import heapq
+import threading
+import unicodedata
+import json
+from json import JSONDecodeError
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from data_manager import write_json_atomic
+
+# 로거
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 저장 형식 버전 (토큰화 규칙이 바뀌면 올려서 이전 파일을 사용하지 않도록 함)
+LEXICAL_INDEX_FORMAT_VERSION = 1
+
+# 한글 음절 연속 | 영문 단어 | 숫자 (1,000 / 3.5 / 2025.03.01 형태 포함)
+_TOKEN_PATTERN = re.compile(r"[가-힣]+|[a-z]+|\d+(?:[.,]\d+)*")
+
+
+def _is_hangul(char: str) -> bool:
+    return "가" <= char <= "힣"
+
+
+# 텍스트를 BM25 토큰 리스트로 변환 (문서와 질문 모두 같은 함수 사용)
+def tokenize_korean(text: str) -> List[str]:
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    tokens: List[str] = []
+    for match in _TOKEN_PATTERN.finditer(normalized):
+        token = match.group()
+        if _is_hangul(token[0]):
+            if len(token) == 1:
+                tokens.append(token)
+            else:
+                tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        elif token[0].isdigit():
+            # 천 단위 구분 기호는 제거 ("300,000" -> "300000")
+            number = token.replace(",", "")
+            tokens.append(number)
+            # 숫자 바로 뒤의 단위 글자를 붙인 토큰 ("30만원" -> "30만", "3월" -> "3월")
+            next_char = normalized[match.end():match.end() + 1]
+            if next_char and _is_hangul(next_char):
+                tokens.append(number + next_char)
+        else:
+            tokens.append(token)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    청크 ID 단위의 BM25 색인 (스레드 안전).
+    검색 결과를 벡터 검색 결과와 같은 Document 형태로 돌려주기 위해 청크 내용과 메타데이터도 함께 보관.
+
+    k1 : 단어 빈도 포화 정도 | b : 문서 길이 정규화 정도
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # {청크 ID: (내용, 메타데이터, {단어: 빈도}, 토큰 수)}
+        self._docs: Dict[str, Tuple[str, Dict[str, Any], Dict[str, int], int]] = {}
+        # {단어: {청크 ID: 빈도}}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        # 마지막 저장 이후 변경 여부
+        self.dirty = False
+        # stage_updates() 시점의 (문서, 역색인, 전체 토큰 수) 복사본. 있으면 검색은 이 상태를 사용
+        self._staged_view: Optional[Tuple[Dict[str, Tuple[str, Dict[str, Any], Dict[str, int], int]],
+                                          Dict[str, Dict[str, int]], int]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def ids(self) -> set:
+        with self._lock:
+            return set(self._docs)
+
+    # 청크 추가. 이미 있는 ID는 새 내용으로 교체
+    def upsert(self, ids: Sequence[str], documents: Sequence[Document]):
+        with self._lock:
+            for chunk_id, doc in zip(ids, documents):
+                term_freqs = dict(Counter(tokenize_korean(doc.page_content)))
+                self._insert(chunk_id, doc.page_content, dict(doc.metadata), term_freqs)
+            self.dirty = True
+
+    def delete(self, ids: Iterable[str]) -> int:
+        with self._lock:
+            removed = sum(1 for chunk_id in ids if self._remove(chunk_id))
+            if removed:
+                self.dirty = True
+            return removed
+
+    # 상대 경로의 청크를 모두 삭제 (청크 목록이 없는 이전 형식의 파일 삭제용)
+    def delete_by_relative_paths(self, relative_paths: Iterable[str]) -> int:
+        paths = set(relative_paths)
+        with self._lock:
+            ids_to_delete = [chunk_id for chunk_id, (_, metadata, _, _) in self._docs.items()
+                             if metadata.get("relative_path") in paths]
+            return self.delete(ids_to_delete)
+
+    # valid_ids에 없는 청크를 모두 삭제 (벡터DB의 고아 벡터 정리와 함께 호출)
+    def retain(self, valid_ids: Iterable[str]) -> int:
+        valid_ids = set(valid_ids)
+        with self._lock:
+            return self.delete([chunk_id for chunk_id in self._docs if chunk_id not in valid_ids])
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._postings.clear()
+            self._total_length = 0
+            self.dirty = True
+
+    # 이후의 추가/삭제를 검색에 바로 반영하지 않고, publish_updates()에서 한 번에 반영 (벡터 색인과 함께 호출)
+    # 추가/삭제는 역색인의 단어별 목록을 제자리에서 수정하므로, 검색용으로 현재 상태를 복사해 둠
+    def stage_updates(self):
+        with self._lock:
+            if self._staged_view is None:
+                self._staged_view = (dict(self._docs),
+                                     {term: dict(postings) for term, postings in self._postings.items()},
+                                     self._total_length)
+
+    def publish_updates(self):
+        with self._lock:
+            self._staged_view = None
+
+    # 질문과 BM25 점수가 높은 순서로 최대 k개의 (Document, 점수) 반환 (일치하는 단어가 없는 청크는 제외)
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        query_terms = set(tokenize_korean(query))
+        with self._lock:
+            docs, all_postings, total_length = self._staged_view or (self._docs, self._postings, self._total_length)
+            doc_count = len(docs)
+            if not doc_count or not query_terms or k <= 0:
+                return []
+            avg_length = total_length / doc_count
+            scores: Dict[str, float] = {}
+            for term in query_terms:
+                postings = all_postings.get(term)
+                if not postings:
+                    continue
+                # 음수가 되지 않는 BM25 idf (Lucene 방식)
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, term_freq in postings.items():
+                    length_norm = self.k1 * (1 - self.b + self.b * docs[chunk_id][3] / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * term_freq * (self.k1 + 1) / (term_freq + length_norm)
+
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [
+                (Document(page_content=docs[chunk_id][0], metadata=dict(docs[chunk_id][1])), score)
+                for chunk_id, score in top
+            ]
+
+    # 색인을 JSON 파일로 저장 (임시 파일에 기록 후 교체)
+    def save(self, file_path: Path):
+        with self._lock:
+            data = {
+                "version": LEXICAL_INDEX_FORMAT_VERSION,
+                "k1": self.k1,
+                "b": self.b,
+                "documents": {
+                    chunk_id: {"content": content, "metadata": metadata, "term_freqs": term_freqs}
+                    for chunk_id, (content, metadata, term_freqs, _) in self._docs.items()
+                },
+            }
+            # 문서 수가 많아 들여쓰기 없이 저장
+            write_json_atomic(file_path, data, indent=None)
+            self.dirty = False
+        logger.info(f"어휘 색인 저장 완료 (청크 {len(data['documents'])}개), 경로: {file_path}")
+
+    # 저장된 색인 로드. 파일이 없거나, 손상되었거나, 형식 버전이 다르면 빈 색인 반환
+    @classmethod
+    def load(cls, file_path: Path) -> "LexicalIndex":
+        file_path = Path(file_path)
+        if not file_path.exists():
+            logger.info(f"어휘 색인 파일이 없습니다. 빈 색인으로 시작합니다: {file_path}")
+            return cls()
+        try:
+            with open(file_path, "r", encoding='utf-8') as f:
+                data = json.load(f)
+        except (IOError, JSONDecodeError):
+            logger.warning(f"어휘 색인 파일을 읽을 수 없습니다. 빈 색인으로 시작합니다: {file_path}", exc_info=True)
+            return cls()
+        if data.get("version") != LEXICAL_INDEX_FORMAT_VERSION:
+            logger.info(f"어휘 색인 형식 버전이 달라 빈 색인으로 시작합니다: {data.get('version')}")
+            return cls()
+
+        index = cls(k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+        # 저장된 단어 빈도로 역색인만 다시 구성 (토큰화하지 않음)
+        for chunk_id, entry in data.get("documents", {}).items():
+            index._insert(chunk_id, entry["content"], entry["metadata"], entry["term_freqs"])
+        logger.info(f"어휘 색인 로드 완료 (청크 {len(index)}개), 경로: {file_path}")
+        return index
+
+    def _insert(self, chunk_id: str, content: str, metadata: Dict[str, Any], term_freqs: Dict[str, int]):
+        self._remove(chunk_id)
+        length = sum(term_freqs.values())
+        self._docs[chunk_id] = (content, metadata, term_freqs, length)
+        self._total_length += length
+        for term, term_freq in term_freqs.items():
+            self._postings.setdefault(term, {})[chunk_id] = term_freq
+
+    def _remove(self, chunk_id: str) -> bool:
+        entry = self._docs.pop(chunk_id, None)
+        if entry is None:
+            return False
+        _, _, term_freqs, length = entry
+        self._total_length -= length
+        for term in term_freqs:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        return True
+
+
+# 검색 결과에서 같은 청크를 식별하는 키 (청크 ID가 없는 이전 형식의 청크는 경로 + 내용)
+def _document_key(doc: Document) -> Hashable:
+    chunk_id = doc.metadata.get("chunk_id")
+    if chunk_id:
+        return chunk_id
+    return doc.metadata.get("relative_path"), doc.page_content
+
+
+# 여러 검색 결과 목록을 RRF로 결합하여 상위 top_n개 반환
+# 각 목록에서 순위 r(1부터)인 문서는 weight / (rrf_k + r)점을 받고, 여러 목록에 나온 문서는 점수가 합산됨
+# 점수가 같으면 앞 목록(벡터 검색)에서의 순서를 유지
+def reciprocal_rank_fusion(result_lists: Sequence[Sequence[Document]], top_n: int, rrf_k: int = 60,
+                           weights: Optional[Sequence[float]] = None) -> List[Document]:
+    weights = weights or [1.0] * len(result_lists)
+    scores: Dict[Hashable, float] = {}
+    docs_by_key: Dict[Hashable, Document] = {}
+    for results, weight in zip(result_lists, weights):
+        for rank, doc in enumerate(results, start=1):
+            key = _document_key(doc)
+            docs_by_key.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + weight / (rrf_k + rank)
+    # sorted는 안정 정렬이므로 동점이면 먼저 나온 순서 유지
+    ranked_keys = sorted(docs_by_key, key=lambda key: scores[key], reverse=True)
+    return [docs_by_key[key] for key in ranked_keys[:top_n]]
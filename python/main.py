@@ -10,16 +10,30 @@ uvicorn main:app --host 0.0.0.0 --port 8000 --log-level info
 # FastAPI - fastapi의 핵심 클래스, 객체 생성을 위한 import
 # HTTPException - 클라이언트에 오류 메시지를 JSON 형식으로 반환
 from fastapi import FastAPI, HTTPException
+# 관리자 API 인증 키를 요청 헤더에서 읽기 위한 import
+from fastapi import Header
+# 응답을 보낸 뒤 실행할 작업(대화 요약 갱신)을 등록하기 위한 import
+from fastapi import BackgroundTasks
+from starlette.background import BackgroundTask
 # react와의 연결을 위해 import
 from fastapi.middleware.cors import CORSMiddleware
+# 파일 잠금을 사용하는 동기 함수(대화 기록 읽기/쓰기)를 이벤트 루프 밖의 스레드에서 실행하기 위한 import
+from fastapi.concurrency import run_in_threadpool
+# 답변 토큰을 생성되는 즉시 전송(Server-Sent Events)하기 위한 import
+from fastapi.responses import StreamingResponse
 # 데이터 타입 유효성 검사와 응답 모델 정의를 위한 import
 # 제미나이 LLM이 text 데이터를 생성하더라도 클라이언트가 이해할 수 있는 형태로(JSON 등) 감싸주고,
 # 해당 타입으로 응답할 것임을 fast api에 알리는 역할
 from pydantic import BaseModel
 # 로그
 import logging
+# SSE 이벤트 데이터 직렬화
+import json
+# 관리자 API 키 비교
+import secrets
+from typing import AsyncIterator
 # 유저별 대화 기록 저장 및
-from chat_memory import UserChatMemory
+from chat_memory import ChatMemoryManager, migrate_json_history_to_sqlite
 
 # config.py에서 설정 가져오기 - 내 파일
 from config import settings, create_initial_directories
@@ -27,6 +41,10 @@ from config import settings, create_initial_directories
 
 # RAG 파이프라인 클래스 가져오기 - 내 파일
 from rag_main_runner import RAGPipeline
+# 데이터 디렉토리 변경 감시
+from data_watcher import DataDirectoryWatcher
+# 백그라운드 재색인 작업
+from reindex_jobs import ReindexJobManager
 
 # 로거 설정(추후에 로거 단독 모듈로 분리 예정)
 # 이해되지 않는 부분이 많아 모듈화 진행하면서 다시 정리하는 게 좋을 듯
@@ -50,13 +68,23 @@ app = FastAPI(title=settings.APP_NAME, debug=settings.DEBUG_MODE)
 # 실제 RAGPipeline 객체가 생성되어 할당될 예정.
 rag_pipeline_instance: RAGPipeline | None = None
 
+# 모든 요청이 공유하는 대화 기록 관리자 (사용자별 메모리 캐시 + 주기적 저장)
+# 애플리케이션 시작 시 생성되고, 종료 시 남은 메시지를 저장한 뒤 정리됨
+chat_memory_manager_instance: ChatMemoryManager | None = None
+
+# 데이터 디렉토리 변경을 감시하여 벡터DB를 증분 갱신하는 감시자 (DATA_WATCHER_ENABLED일 때만 생성)
+data_watcher_instance: DataDirectoryWatcher | None = None
+
+# 관리자 API로 요청된 재색인 작업을 백그라운드 스레드에서 실행하는 관리자
+reindex_job_manager_instance: ReindexJobManager | None = None
+
 # --- FastAPI 시작 시 실행될 이벤트 핸들러 ---
 # FastAPI 애플리케이션의 시작 시점과 종료 시점에 특정 코드를 실행할 수 있도록 해주는 메커니즘
 # lifespan 방식이 더 현대적이기에 파이참 내부에서도 on_event 대신 사용하길 권장하는 warning이 출력됨
 @app.on_event("startup")
 async def startup_event():
     logger.info("--- startup_event 시작 ---")  # startup_event 시작 확인
-    global rag_pipeline_instance # 전역 변수를 사용하겠다고 선언
+    global rag_pipeline_instance, chat_memory_manager_instance, data_watcher_instance, reindex_job_manager_instance # 전역 변수를 사용하겠다고 선언
     logger.info(f"애플리케이션 '{settings.APP_NAME}' 시작...")
     logger.info(f"디버그 모드: {settings.DEBUG_MODE}")
     logger.info(f"데이터 경로: {settings.DATA_PATH}")
@@ -68,6 +96,19 @@ async def startup_event():
         # 디렉토리 존재 여부를 확인하고, 없다면 새로 생성해주는 역할
         create_initial_directories()
 
+        # SQLite 대화 기록 저장소를 사용한다면, 기존 chat_history.json의 기록을 한 번만 옮김
+        if settings.CHAT_HISTORY_BACKEND.lower() == "sqlite":
+            try:
+                migrate_json_history_to_sqlite(
+                    json_file_path=str(settings.CHAT_HISTORY_FILE),
+                    db_path=str(settings.CHAT_HISTORY_DB_FILE)
+                )
+            except Exception as e:
+                logger.error(f"채팅 기록 마이그레이션 중 오류 발생: {e}", exc_info=True)
+
+        chat_memory_manager_instance = ChatMemoryManager()
+        chat_memory_manager_instance.start()
+
         logger.info("RAG 파이프라인 초기화를 시작합니다...")
 
         # RAGPipeline 클래스의 인스턴스를 생성해서 rag_pipeline_instance 변수에 할당
@@ -80,11 +121,41 @@ async def startup_event():
             force_create_db=False
         )
         logger.info("RAG 파이프라인 초기화 성공.")
+
+        reindex_job_manager_instance = ReindexJobManager(rag_pipeline_instance.reindex)
+
+        # 서버 실행 중 추가/수정/삭제된 데이터 파일을 감시 스레드에서 벡터DB에 반영
+        if settings.DATA_WATCHER_ENABLED:
+            data_watcher_instance = DataDirectoryWatcher(
+                data_path=settings.DATA_PATH,
+                on_change=rag_pipeline_instance.refresh_index,
+                debounce_seconds=settings.DATA_WATCHER_DEBOUNCE_SECONDS,
+                poll_interval_seconds=settings.DATA_WATCHER_POLL_INTERVAL_SECONDS,
+                backend=settings.DATA_WATCHER_BACKEND
+            )
+            data_watcher_instance.start()
     except Exception as e:
         # exc_info=True : 자바에서의 e.printStackTrace()와 유사한 역할
         logger.error(f"RAG 파이프라인 초기화 중 심각한 오류 발생: {e}", exc_info=True)
         # rag_pipeline_instance는 초기값인 None으로 유지되어 API 요청이 들어오면 오류 반환
 
+# --- FastAPI 종료 시 실행될 이벤트 핸들러 ---
+@app.on_event("shutdown")
+async def shutdown_event():
+    logger.info("--- shutdown_event 시작 ---")
+    if reindex_job_manager_instance is not None:
+        # 실행 중인 재색인 작업은 취소 요청 후, 현재 배치가 끝날 때까지 기다림
+        # 감시 스레드의 증분 갱신이 재색인의 색인 잠금을 기다리고 있을 수 있으므로 감시 종료보다 먼저 수행
+        await run_in_threadpool(reindex_job_manager_instance.shutdown)
+    if data_watcher_instance is not None:
+        # 진행 중인 증분 갱신이 끝날 때까지 기다림
+        await run_in_threadpool(data_watcher_instance.stop)
+    if rag_pipeline_instance is not None:
+        rag_pipeline_instance.close()
+    if chat_memory_manager_instance is not None:
+        # 아직 저장되지 않은 대화 기록을 모두 기록
+        await run_in_threadpool(chat_memory_manager_instance.close)
+
 
 # --- CORS 미들웨어 설정 ---
 # 실질적인 react와의 연결 설정은 해당 코드에서 이루어짐
@@ -106,18 +177,48 @@ class SearchResponse(BaseModel):
     # 이 API의 응답에는 'answer'라는 key가 존재할 것이고 해당 키 값은 'str'이어야만 한다는 의미
     answer: str
 
+# 프롬프트용 사용자 대화 기록 조회 : (누적 대화 요약, 토큰 예산 안의 최근 메시지)
+# 캐시에 있으면 저장소 접근 없이 바로 반환하고, 캐시 미스일 때만 스레드 풀에서 저장소를 읽음
+async def _load_chat_history(member_id: str):
+    cached = chat_memory_manager_instance.get_cached_prompt_history(member_id)
+    if cached is not None:
+        return cached
+    return await run_in_threadpool(chat_memory_manager_instance.get_prompt_history, member_id)
+
+# 같은 사용자의 요약이 동시에 여러 번 생성되지 않도록, 요약 중인 사용자를 기록
+_summarizing_members: set[str] = set()
+
+# 토큰 예산을 벗어난 오래된 대화를 사용자별 누적 요약에 반영
+# 응답 전송이 끝난 뒤 백그라운드에서 실행되므로 답변 지연에 영향을 주지 않음
+async def _update_history_summary(member_id: str):
+    if member_id in _summarizing_members or rag_pipeline_instance is None or chat_memory_manager_instance is None:
+        return
+    _summarizing_members.add(member_id)
+    try:
+        summary_work = await run_in_threadpool(chat_memory_manager_instance.get_messages_to_summarize, member_id)
+        if summary_work is None:
+            return
+        previous_summary, messages_to_summarize, covered_count = summary_work
+        new_summary = await rag_pipeline_instance.asummarize_history(previous_summary, messages_to_summarize)
+        await run_in_threadpool(chat_memory_manager_instance.set_summary, member_id, new_summary, covered_count)
+        logger.info(f"사용자 ID '{member_id}'의 대화 요약 갱신 완료 (요약된 메시지 수: {covered_count})")
+    except Exception as e:
+        logger.error(f"사용자 ID '{member_id}'의 대화 요약 갱신 중 오류 발생: {e}", exc_info=True)
+    finally:
+        _summarizing_members.discard(member_id)
+
 # --- API 엔드포인트 ---
 @app.post("/ask", response_model=SearchResponse)
 # 비동기 함수의 정의
 # Body(..., media_type="") : ...은 기본값이 없고 필수 항목이라는 의미를 가짐
-async def search_rag_system(request_data: SearchRequest):
+async def search_rag_system(request_data: SearchRequest, background_tasks: BackgroundTasks):
     member_id = request_data.member_id
     question_text = request_data.question
 
     logger.info(f"'/search' 엔드포인트 수신 - 사용자 ID: {member_id}, 질문: {question_text}")
 
     # startup_event에서 rag_pipeline_instance 생성에 실패했으면 (기본값이 None임)
-    if rag_pipeline_instance is None:
+    if rag_pipeline_instance is None or chat_memory_manager_instance is None:
         logger.error("RAG 파이프라인이 초기화되지 않아 요청을 처리할 수 없습니다.")
         # 503 Service Unavailable (서비스를 사용할 수 없음)
         raise HTTPException(status_code=503, detail="RAG 시스템이 현재 사용 불가능합니다. 잠시 후 다시 시도해주세요.")
@@ -145,20 +246,19 @@ async def search_rag_system(request_data: SearchRequest):
     #     logger.error(f"질문 처리 중 예기치 않은 오류 발생: {e}", exc_info=True)
     #     raise HTTPException(status_code=500, detail="답변 생성 중 서버 내부 오류가 발생했습니다.")
 
-        chat_memory_manager = UserChatMemory(
-            member_id=member_id,
-            history_file_path=str(settings.CHAT_HISTORY_FILE)
-        )
-
-        chat_history = chat_memory_manager.get_chat_messages()
+        history_summary, chat_history = await _load_chat_history(member_id)
 
-        answer_str = rag_pipeline_instance.query(
+        # 임베딩/검색은 파이프라인의 스레드 풀에서, LLM 호출은 비동기로 처리됨
+        answer_str = await rag_pipeline_instance.aquery(
             question_text,
-            history=chat_history
+            history=chat_history,
+            history_summary=history_summary
         )
 
-        chat_memory_manager.add_question(question_text)
-        chat_memory_manager.add_answer(answer_str)
+        # 질문/답변 한 쌍을 메모리에 반영 (저장소 기록은 백그라운드에서 주기적으로 수행)
+        # 캐시 미스 시 저장소를 읽을 수 있으므로 이벤트 루프 밖의 스레드에서 실행
+        await run_in_threadpool(chat_memory_manager_instance.add_exchange, member_id, question_text, answer_str)
+        background_tasks.add_task(_update_history_summary, member_id)
 
         logger.info(f"사용자 ID '{member_id}'에게 답변 생성 완료.")
         return SearchResponse(answer=answer_str)
@@ -167,6 +267,73 @@ async def search_rag_system(request_data: SearchRequest):
         logger.error(f"질문 처리 중 예기치 않은 오류 발생: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="답변 생성 중 서버 내부 오류가 발생했습니다.")
 
+# SSE 형식의 이벤트 문자열 생성
+# 각 이벤트는 "event: 이름\ndata: JSON\n\n" 형태로 전송됨
+def _format_sse(data: dict, event: str | None = None) -> str:
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+# 답변 스트리밍 엔드포인트
+# 검색이 끝난 직후부터 LLM이 생성하는 토큰을 {"token": "..."} 이벤트로 하나씩 전송하고,
+# 스트림이 정상적으로 끝나면 완성된 답변을 대화 기록에 저장한 뒤 "done" 이벤트를 전송
+@app.post("/ask/stream")
+async def search_rag_system_stream(request_data: SearchRequest):
+    member_id = request_data.member_id
+    question_text = request_data.question
+
+    logger.info(f"'/ask/stream' 엔드포인트 수신 - 사용자 ID: {member_id}, 질문: {question_text}")
+
+    if rag_pipeline_instance is None or chat_memory_manager_instance is None:
+        logger.error("RAG 파이프라인이 초기화되지 않아 요청을 처리할 수 없습니다.")
+        raise HTTPException(status_code=503, detail="RAG 시스템이 현재 사용 불가능합니다. 잠시 후 다시 시도해주세요.")
+
+    if not member_id or not member_id.strip():
+        logger.warning("member_id가 비어있습니다.")
+        raise HTTPException(status_code=400, detail="member_id가 필요합니다.")
+
+    if not question_text or not question_text.strip():
+        logger.warning("비어있는 질문이 수신되었습니다.")
+        raise HTTPException(status_code=400, detail="질문 내용이 필요합니다.")
+
+    try:
+        history_summary, chat_history = await _load_chat_history(member_id)
+    except Exception as e:
+        logger.error(f"대화 기록 로드 중 예기치 않은 오류 발생: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="답변 생성 중 서버 내부 오류가 발생했습니다.")
+
+    async def event_generator() -> AsyncIterator[str]:
+        answer_parts: list[str] = []
+        try:
+            async for token in rag_pipeline_instance.astream_query(question_text, history=chat_history,
+                                                                   history_summary=history_summary):
+                answer_parts.append(token)
+                yield _format_sse({"token": token})
+        except Exception as e:
+            # 스트림 도중 실패한 경우, 불완전한 답변은 대화 기록에 저장하지 않음
+            logger.error(f"답변 스트리밍 중 예기치 않은 오류 발생: {e}", exc_info=True)
+            yield _format_sse({"detail": "답변 생성 중 서버 내부 오류가 발생했습니다."}, event="error")
+            return
+
+        answer_str = "".join(answer_parts)
+        try:
+            await run_in_threadpool(chat_memory_manager_instance.add_exchange, member_id, question_text, answer_str)
+        except Exception as e:
+            logger.error(f"사용자 ID '{member_id}'의 스트리밍 답변 저장 중 오류 발생: {e}", exc_info=True)
+
+        logger.info(f"사용자 ID '{member_id}'에게 스트리밍 답변 생성 완료.")
+        yield _format_sse({"answer": answer_str}, event="done")
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        # 프록시(nginx 등)가 응답을 버퍼링하지 않도록 설정
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # 스트림 전송이 끝난 뒤 대화 요약 갱신
+        background=BackgroundTask(_update_history_summary, member_id)
+    )
+
 class ClearHistoryRequest(BaseModel):
     member_id: str
 
@@ -179,18 +346,84 @@ async def clear_user_history(request_data: ClearHistoryRequest):
         logger.warning("member_id가 비어있습니다. (clear_history)")
         raise HTTPException(status_code=400, detail="member_id가 필요합니다.")
 
+    if chat_memory_manager_instance is None:
+        logger.error("대화 기록 관리자가 초기화되지 않아 요청을 처리할 수 없습니다.")
+        raise HTTPException(status_code=503, detail="대화 기록 기능이 현재 사용 불가능합니다. 잠시 후 다시 시도해주세요.")
+
     try:
-        chat_memory_manager = UserChatMemory(
-            member_id=member_id,
-            history_file_path=str(settings.CHAT_HISTORY_FILE)
-        )
-        chat_memory_manager.clear_history()
+        await run_in_threadpool(chat_memory_manager_instance.clear, member_id)
         logger.info(f"사용자 '{member_id}'의 대화 기록이 성공적으로 삭제되었습니다.")
         return {"message": f"사용자 '{member_id}'의 대화 기록이 삭제되었습니다."}
     except Exception as e:
         logger.error(f"사용자 '{member_id}'의 대화 기록 삭제 중 오류 발생: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="대화 기록 삭제 중 오류가 발생했습니다.")
 
+# 캐시 통계 조회 (답변 캐시 적중률, 절약한 LLM 생성 시간 등)
+@app.get("/cache/stats")
+async def get_cache_stats():
+    if rag_pipeline_instance is None:
+        raise HTTPException(status_code=503, detail="RAG 시스템이 현재 사용 불가능합니다. 잠시 후 다시 시도해주세요.")
+    return rag_pipeline_instance.get_cache_stats()
+
+class ReindexRequest(BaseModel):
+    # "incremental" : 변경된 파일만 반영 | "full" : 모든 파일을 다시 분할/반영
+    mode: str = "incremental"
+
+# 관리자 API 인증 및 재색인 관리자 준비 여부 확인
+# ADMIN_API_KEY가 비어있으면 관리자 API를 사용할 수 없음 (인증 없이 열리지 않도록)
+def _get_reindex_job_manager(admin_key: str | None) -> ReindexJobManager:
+    if not settings.ADMIN_API_KEY:
+        logger.warning("ADMIN_API_KEY가 설정되지 않아 관리자 API 요청을 거부합니다.")
+        # 403 Forbidden : 관리자 API가 비활성화됨
+        raise HTTPException(status_code=403, detail="관리자 API가 비활성화되어 있습니다.")
+    # 응답 시간으로 키를 추측할 수 없도록 상수 시간 비교
+    if admin_key is None or not secrets.compare_digest(admin_key.encode("utf-8"),
+                                                       settings.ADMIN_API_KEY.encode("utf-8")):
+        logger.warning("관리자 API 인증 실패")
+        raise HTTPException(status_code=401, detail="관리자 인증이 필요합니다.")
+    if rag_pipeline_instance is None or reindex_job_manager_instance is None:
+        raise HTTPException(status_code=503, detail="RAG 시스템이 현재 사용 불가능합니다. 잠시 후 다시 시도해주세요.")
+    return reindex_job_manager_instance
+
+# 재색인 작업 시작. 작업은 백그라운드에서 실행되고, 진행 중에도 /ask는 재색인을 시작하기 전의 색인으로 응답함
+# (끝나면 한 번에 새 색인으로 바뀜. Chroma 저장소는 반영 중간 상태가 검색될 수 있음)
+@app.post("/admin/reindex", status_code=202)
+async def start_reindex(request_data: ReindexRequest, x_admin_key: str | None = Header(default=None)):
+    manager = _get_reindex_job_manager(x_admin_key)
+    logger.info(f"'/admin/reindex' 엔드포인트 수신 - 방식: {request_data.mode}")
+    try:
+        job = manager.start(request_data.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        # 409 Conflict : 이미 실행 중인 작업이 있음
+        raise HTTPException(status_code=409, detail=str(e))
+    return job.to_dict()
+
+# 최근 재색인 작업 목록 (최근 작업부터)
+@app.get("/admin/reindex")
+async def list_reindex_jobs(x_admin_key: str | None = Header(default=None)):
+    manager = _get_reindex_job_manager(x_admin_key)
+    return {"jobs": [job.to_dict() for job in manager.list_jobs()]}
+
+# 재색인 작업 진행 상황 (처리한 파일/청크 수, 예상 남은 시간 등)
+@app.get("/admin/reindex/{job_id}")
+async def get_reindex_status(job_id: str, x_admin_key: str | None = Header(default=None)):
+    manager = _get_reindex_job_manager(x_admin_key)
+    job = manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="재색인 작업을 찾을 수 없습니다.")
+    return job.to_dict()
+
+# 재색인 작업 취소. 현재 처리 중인 배치가 끝나는 시점에 중단됨
+@app.post("/admin/reindex/{job_id}/cancel")
+async def cancel_reindex(job_id: str, x_admin_key: str | None = Header(default=None)):
+    manager = _get_reindex_job_manager(x_admin_key)
+    job = manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="재색인 작업을 찾을 수 없습니다.")
+    return job.to_dict()
+
 @app.get("/")
 # 비동기 함수의 정의
 async def root():
@@ -0,0 +1,161 @@
+# parallel_ingest.py
+"""
+데이터 파일 읽기와 청크 분할을 여러 프로세스에서 나누어 처리합니다.
+KonlpyTextSplitter(Kkma)는 JVM 기반으로 느리고 GIL 때문에 스레드로는 병렬화되지 않으므로,
+파일 단위로 프로세스 풀에 분배하고 각 워커는 시작 시 한 번 만들어 둔(워밍업된) 분할기를 재사용합니다.
+결과는 입력한 파일 순서 그대로, 파일 내 청크 순서도 그대로 반환됩니다.
+iter_load_and_split는 파일 단위로 결과를 하나씩 반환하여, 말뭉치 크기와 관계없이 메모리 사용량을 일정하게 유지합니다.
+"""
+import os
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+# 랭체인 문서의 기본 단위인 Document 클래스 import
+from langchain_core.documents import Document
+
+# 로거 객체 생성
+logger = logging.getLogger(__name__)
+
+# 워커 프로세스마다 하나씩 만들어 두는 분할기
+_worker_splitter = None
+# 분할기 워밍업용 문장 (Kkma는 첫 호출 시 JVM과 사전을 로드함)
+_WARMUP_TEXT = "분할기를 준비합니다. 첫 호출에서 필요한 자원을 미리 불러옵니다."
+
+
+# 파일 하나를 읽어 Document로 반환. 파일이 없거나 읽기에 실패하면 None
+def load_document(base_path: Path, rel_path_str: str) -> Optional[Document]:
+    abs_file_path = Path(base_path) / rel_path_str
+    file_name = abs_file_path.name
+
+    if not abs_file_path.is_file():
+        logger.warning(f"파일을 찾을 수 없거나 파일이 아님 (건너뜀): '{abs_file_path}'")
+        return None
+
+    logger.debug(f"파일 읽기 시도: '{abs_file_path}'")
+    try:
+        with open(abs_file_path, "r", encoding='utf-8') as f:
+            content = f.read()
+    except Exception as e:
+        logger.error(f"오류: '{abs_file_path}' 파일 읽기 중 예외 발생: {e}", exc_info=True)
+        return None
+
+    # .strip() : 문자열의 양쪽 공백을 제거, 공백으로만 이루어져 있었다면 빈 문자열("", False)이 반환됨
+    if not content.strip():
+        logger.warning(f"'{file_name}' 파일 내용이 비어있거나 공백만 있음.")
+
+    logger.debug(f"성공: '{file_name}' 로드 완료 (내용 길이: {len(content)})")
+    return Document(page_content=content, metadata={
+        "source": file_name,
+        "relative_path": rel_path_str
+    })
+
+
+# 기본 분할기 생성 함수 (settings의 분할기 설정을 따름)
+# splitter_factory는 chunk_size, chunk_overlap 키워드 인자로 호출되는 피클 가능한 함수(또는 클래스)여야 함
+# rag_utils는 torch 등 무거운 모듈을 import 하므로 실제로 필요할 때만 import
+def default_splitter_factory(chunk_size: int, chunk_overlap: int):
+    from rag_utils import get_text_splitter
+    return get_text_splitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+# 워커 프로세스 시작 시 한 번 실행: 분할기를 만들고 워밍업
+def _init_worker(splitter_factory: Callable, chunk_size: int, chunk_overlap: int):
+    global _worker_splitter
+    _worker_splitter = splitter_factory(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    try:
+        _worker_splitter.split_text(_WARMUP_TEXT)
+    except Exception as e:
+        logger.warning(f"분할기 워밍업 실패 (pid: {os.getpid()}): {e}")
+
+
+# 파일 하나를 읽고 분할. 읽기에 실패하면 (상대 경로, False, [])
+def _load_and_split(base_path: Path, rel_path_str: str, text_splitter) -> Tuple[str, bool, List[Document]]:
+    doc = load_document(base_path, rel_path_str)
+    if doc is None:
+        return rel_path_str, False, []
+    return rel_path_str, True, text_splitter.split_documents([doc])
+
+
+def _worker_load_and_split(task: Tuple[str, str]) -> Tuple[str, bool, List[Document]]:
+    base_path_str, rel_path_str = task
+    return _load_and_split(Path(base_path_str), rel_path_str, _worker_splitter)
+
+
+# 파일들을 읽고 분할하여 (상대 경로, 청크 리스트)를 relative_paths 순서대로 하나씩 반환 (읽기에 실패한 파일은 제외)
+# workers가 1 이하이거나 파일 수가 min_parallel_files보다 적으면 현재 프로세스에서 순서대로 처리
+# 프로세스 풀에는 최대 max_in_flight개의 파일만 동시에 맡기므로, 소비하는 쪽(임베딩)이 느려도
+# 분할 결과가 메모리에 계속 쌓이지 않음 (기본값: 워커 수의 2배)
+def iter_load_and_split(
+    base_path: Path,
+    relative_paths: List[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    workers: int = 1,
+    min_parallel_files: int = 1,
+    splitter_factory: Callable = default_splitter_factory,
+    max_in_flight: Optional[int] = None
+) -> Iterator[Tuple[str, List[Document]]]:
+    if not relative_paths:
+        return
+    workers = min(workers, len(relative_paths))
+    logger.info(f"문서 로드 및 분할 시작 (기준: '{base_path}'): {len(relative_paths)}개 파일, 프로세스 {max(workers, 1)}개")
+
+    if workers <= 1 or len(relative_paths) < min_parallel_files:
+        text_splitter = splitter_factory(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        for rel_path_str in relative_paths:
+            rel_path_str, loaded, chunks = _load_and_split(Path(base_path), rel_path_str, text_splitter)
+            if loaded:
+                yield rel_path_str, chunks
+        return
+
+    max_in_flight = max_in_flight or workers * 2
+    # JVM(Kkma)은 fork 이후 자식 프로세스에서 정상 동작하지 않으므로 spawn 방식으로 워커 생성
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(splitter_factory, chunk_size, chunk_overlap)
+    ) as executor:
+        tasks = iter([(str(base_path), rel_path_str) for rel_path_str in relative_paths])
+        in_flight: Deque[Future] = deque()
+        try:
+            for task in islice(tasks, max_in_flight):
+                in_flight.append(executor.submit(_worker_load_and_split, task))
+            # 제출한 순서대로 결과를 꺼내므로, 처리 순서와 관계없이 청크 순서가 결정적으로 유지됨
+            while in_flight:
+                rel_path_str, loaded, chunks = in_flight.popleft().result()
+                next_task = next(tasks, None)
+                if next_task is not None:
+                    in_flight.append(executor.submit(_worker_load_and_split, next_task))
+                if loaded:
+                    yield rel_path_str, chunks
+        finally:
+            # 소비하는 쪽이 중간에 멈추면(취소 등) 아직 시작하지 않은 작업은 취소
+            for future in in_flight:
+                future.cancel()
+
+
+# 파일들을 읽고 분할하여 {상대 경로: 청크 리스트}로 반환 (relative_paths 순서 유지, 읽기에 실패한 파일은 제외)
+def load_and_split_documents(
+    base_path: Path,
+    relative_paths: List[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    workers: int = 1,
+    min_parallel_files: int = 1,
+    splitter_factory: Callable = default_splitter_factory
+) -> Dict[str, List[Document]]:
+    chunks_by_path: Dict[str, List[Document]] = dict(iter_load_and_split(
+        base_path, relative_paths, chunk_size, chunk_overlap, workers, min_parallel_files, splitter_factory
+    ))
+    if relative_paths:
+        total_chunks = sum(len(chunks) for chunks in chunks_by_path.values())
+        if not chunks_by_path:
+            logger.warning("요청된 파일 목록에서 유효한 문서를 로드하지 못했습니다.")
+        logger.info(f"문서 분할 완료: 원본 {len(chunks_by_path)}개 -> 청크 {total_chunks}개")
+    return chunks_by_path
@@ -0,0 +1,128 @@
+# query_cache.py
+"""
+질문 임베딩과 벡터 검색 결과를 재사용하기 위한 LRU 캐시입니다.
+
+같은 질문(공백/대소문자/유니코드 표기 차이 무시)이 다시 들어오면
+- 질문 임베딩 : 임베딩 모델(CPU 트랜스포머) 연산 없이 저장된 벡터를 반환
+- 검색 결과 : 벡터DB(Chroma) 조회 없이 저장된 상위 k개 문서 조각을 반환
+합니다.
+
+검색 결과는 인덱스 버전(RAGPipeline.index_version)별로 저장되어,
+데이터 파일이 다시 반영(re-ingest)되어 버전이 바뀌면 이전 결과는 사용되지 않고 제거됩니다.
+버전이 바뀌기 전에 시작한 검색이 이전 버전으로 조회/저장하면 무시하므로, 현재 버전의 결과는 지워지지 않습니다.
+질문 임베딩은 임베딩 모델에만 의존하므로 인덱스 버전과 무관하게 유지됩니다.
+"""
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+from langchain_core.documents import Document
+
+# 로거
+import logging
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+# 캐시 키로 사용할 질문 정규화
+# NFKC : 전각/반각, 호환 문자 등을 같은 문자로 통일
+def normalize_question(question: str) -> str:
+    normalized = unicodedata.normalize("NFKC", question)
+    normalized = _WHITESPACE_PATTERN.sub(" ", normalized).strip()
+    return normalized.lower()
+
+
+# 스레드 안전한 크기 제한 LRU 딕셔너리
+class LRUCache(Generic[V]):
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, V]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class QueryResultCache:
+    def __init__(self, max_entries: int = 2048):
+        # 정규화된 질문 -> 질문 임베딩
+        self._embeddings: LRUCache[List[float]] = LRUCache(max_entries)
+        # (인덱스 버전, 정규화된 질문, k) -> 검색된 문서 조각 목록
+        self._results: LRUCache[List[Document]] = LRUCache(max_entries)
+        self._index_version: Optional[int] = None
+        self._version_lock = threading.Lock()
+
+    def get_embedding(self, normalized_question: str) -> Optional[List[float]]:
+        return self._embeddings.get(normalized_question)
+
+    def put_embedding(self, normalized_question: str, embedding: List[float]) -> None:
+        self._embeddings.put(normalized_question, embedding)
+
+    # 인덱스 버전이 올라갔으면 이전 버전의 검색 결과를 모두 제거 (_version_lock 안에서 호출)
+    # 현재 버전보다 오래된 버전(재색인 전에 시작한 검색)이면 False를 반환하고, 캐시는 그대로 둠
+    def _check_version_locked(self, index_version: int) -> bool:
+        if self._index_version is not None and index_version < self._index_version:
+            return False
+        if self._index_version != index_version:
+            if self._index_version is not None:
+                logger.info(f"인덱스 버전 변경({self._index_version} -> {index_version})으로 검색 결과 캐시를 비웁니다.")
+            self._results.clear()
+            self._index_version = index_version
+        return True
+
+    def get_results(self, normalized_question: str, k: int, index_version: int) -> Optional[List[Document]]:
+        with self._version_lock:
+            if not self._check_version_locked(index_version):
+                return None
+        results = self._results.get((index_version, normalized_question, k))
+        # 호출 측에서 목록을 수정해도 캐시가 바뀌지 않도록 복사본 반환
+        return list(results) if results is not None else None
+
+    # 이전 버전의 검색 결과는 저장하지 않음 (버전 확인과 저장 사이에 버전이 바뀌지 않도록 같은 잠금 안에서 저장)
+    def put_results(self, normalized_question: str, k: int, index_version: int, docs: List[Document]) -> None:
+        with self._version_lock:
+            if not self._check_version_locked(index_version):
+                return
+            self._results.put((index_version, normalized_question, k), list(docs))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "embeddings": self._embeddings.stats(),
+            "results": self._results.stats(),
+        }
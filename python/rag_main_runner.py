@@ -7,7 +7,6 @@ LLM 연동, 체인 구성 등 RAG 시스템의 핵심 단계를 초기화하고,
 
 uvicorn main:app --host 0.0.0.0 --port 8000 --log-level info
 """
-from langchain_community.vectorstores import Chroma
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import BaseMessage
@@ -22,6 +21,8 @@ from rag_utils import (
     get_llm, # LLM 모델
     create_or_load_vectorstore, # 벡터DB 생성 또는 기존 DB 로드
     get_retriever, # 벡터DB 문서 검색기
+    get_vector_index, # 벡터 색인 생성 또는 기존 색인 로드 (settings.VECTOR_INDEX_BACKEND)
+    get_cross_encoder, # 재순위화용 크로스 인코더
     create_rag_chain # RAG 체인 구성
 )
 # 랭체인 문서의 기본 단위인 Document 클래스 import
@@ -29,23 +30,63 @@ from langchain_core.documents import Document
 import os
 # 로거
 import logging
+# 비동기 질의 처리를 위한 import
+import asyncio
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+# 의미 기반 답변 캐시
+from answer_cache import SemanticAnswerCache, make_context_key
+# 질문 임베딩/검색 결과 캐시
+from query_cache import QueryResultCache, normalize_question
+# 청크 임베딩 디스크 캐시
+from embedding_cache import CachedEmbeddings
+from embedding_engines import embedding_cache_model_key
+from embedding_batcher import MicroBatchingEmbeddings
+# 파일 읽기/청크 분할 병렬 처리
+from parallel_ingest import load_document, iter_load_and_split
+# 재색인 작업 진행 상황 기록
+from reindex_jobs import ReindexJob
+# 벡터 색인 인터페이스 (Chroma / numpy 메모리 맵)
+from vector_index import VectorIndex, vector_index_exists
+# 벡터 검색과 함께 사용하는 BM25 어휘 색인, RRF 결합
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+# 검색 후보를 크로스 인코더로 다시 정렬
+from reranker import CrossEncoderReranker
+# 검색된 청크를 토큰 예산에 맞춰 문맥으로 조립
+from context_packer import pack_context
 from data_manager import (
-    scan_data_directory,
+    scan_data_directory_with_stats,
     load_metadata,
     save_metadata,
     get_changed_files,
     update_metadata_after_processing,
-    remove_metadata_for_deleted_files
+    get_files_split_with_other_engine,
+    remove_metadata_for_deleted_files,
+    build_chunk_records,
+    diff_chunk_records,
+    get_chunk_ids
 )
 # 파일 경로를 객체로 다루기 위한 import
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, AsyncIterator
 # 디렉토리 및 파일 트리 삭제 등 고수준 파일/디렉토리 작업을 위한 import
 import shutil
 
 # 로거 객체 생성
 logger = logging.getLogger(__name__)
 
+
+# 벡터DB 동기화 한 번 동안의 진행 상태 (메타데이터 중간 저장용)
+class _IngestState:
+    def __init__(self, metadata: Dict[str, Dict[str, Any]]):
+        self.metadata = metadata # 저장할 메타데이터 (처리하지 않은 파일은 이전 값 유지)
+        self.chunk_records_by_path: Dict[str, List[Dict[str, str]]] = {} # 처리 중인 파일의 청크 목록
+        self.completed_paths: List[str] = [] # 추가/삭제가 끝났지만 아직 메타데이터에 저장하지 않은 파일
+        self.saved_paths: List[str] = [] # 메타데이터에 저장된 파일
+        self.written = False # 벡터DB에 추가/삭제가 한 번이라도 있었는지
+        self.last_checkpoint = time.monotonic()
+
 # 데이터 로드 함수
 # -> list[Document] : 반환 타입 힌트
 def load_docs_from_paths(base_path: Path, relative_paths: List[str]) -> list[Document]:
@@ -58,37 +99,15 @@ def load_docs_from_paths(base_path: Path, relative_paths: List[str]) -> list[Doc
     logger.info(f"지정된 경로에서 문서 로드 시도 (기준: '{base_path}'): {len(relative_paths)}개 파일")
 
     for rel_path_str in relative_paths:
-        abs_file_path  = base_path / rel_path_str
-        file_name = abs_file_path.name
-
-        if not abs_file_path.is_file():
-            logger.warning(f"파일을 찾을 수 없거나 파일이 아님 (건너뜀): '{abs_file_path}'")
-            continue
-
-        logger.debug(f"파일 읽기 시도: '{abs_file_path}'")
-        try:
-            with open(abs_file_path, "r", encoding='utf-8') as f:
-                content = f.read()
-                # .strip() : 문자열의 양쪽 공백을 제거
-                # content가 원래부터 비어있었거나, 공백으로만 이루어져 있었다면, 빈 문자열이 반환됨
-                # 빈 문자열, ""은 파이썬에서 False로 평가됨
-            if not content.strip(): # 내용이 비어있는지 확인 (공백만 있는 경우 포함)
-                logger.warning(f"'{file_name}' 파일 내용이 비어있거나 공백만 있음.")
-
-            doc_metadata = {
-                "source": file_name,
-                "relative_path": rel_path_str
-            }
+        doc = load_document(base_path, rel_path_str)
+        if doc is not None:
             # 앞서 생성한 loaded_documents 리스트에 Document 타입으로 변환된 content와 metadata(파일명, 상대 경로)를 저장
-            loaded_docs.append(Document(page_content=content, doc_metadata=doc_metadata))
-            logger.debug(f"성공: '{file_name}' 로드 완료 (내용 길이: {len(content)})")
-        except Exception as e:
-            logger.error(f"오류: '{abs_file_path}' 파일 읽기 중 예외 발생: {e}", exc_info=True)
+            loaded_docs.append(doc)
 
-        if not loaded_docs and relative_paths:
-            logger.warning("요청된 파일 목록에서 유효한 문서를 로드하지 못했습니다.")
-        elif loaded_docs:
-            logger.info(f"총 {len(loaded_docs)}개의 문서 로드 완료.")
+    if not loaded_docs:
+        logger.warning("요청된 파일 목록에서 유효한 문서를 로드하지 못했습니다.")
+    else:
+        logger.info(f"총 {len(loaded_docs)}개의 문서 로드 완료.")
 
     return loaded_docs
 
@@ -112,240 +131,723 @@ class RAGPipeline:
         # 다른 함수들에서 해당 변수들에 접근할 수 있게 만들기 위함
         # 기존에는 _initialize_pipeline 함수가 끝나면 사라졌었음
         self.embeddings = None
-        self.vectorstore: Chroma | None = None
+        self.vectorstore: VectorIndex | None = None
+        self.retriever = None
+        # 벡터DB와 같은 청크 ID로 갱신되는 BM25 어휘 색인 (HYBRID_SEARCH_ENABLED일 때 첫 동기화에서 로드)
+        self.lexical_index: LexicalIndex | None = None
+        # 검색 후보 재순위화 (RERANK_ENABLED일 때 초기화에서 생성)
+        self.reranker: CrossEncoderReranker | None = None
+        # 동시 질문 임베딩 배치 처리 (EMBEDDING_BATCHING_ENABLED일 때 초기화에서 생성)
+        self.embedding_batcher: MicroBatchingEmbeddings | None = None
+        self.llm = None
+        self.prompt = None
+        self.output_parser = None
+        # aquery에서 CPU 작업(질문 임베딩, 벡터 검색)을 이벤트 루프 밖에서 처리하기 위한 스레드 풀
+        self._query_executor = ThreadPoolExecutor(
+            max_workers=settings.QUERY_EXECUTOR_WORKERS,
+            thread_name_prefix="rag-query"
+        )
+        # 동시에 처리할 질문 수 제한 (초과 요청은 이벤트 루프를 막지 않고 대기)
+        self._query_semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_QUERIES)
+        # 벡터DB 내용이 바뀔 때마다 1씩 증가 (캐시 무효화 기준)
+        self.index_version = 0
+        # 벡터DB 동기화(시작 시 / 데이터 디렉토리 변경 시)를 한 번에 하나씩만 실행하기 위한 잠금
+        self._index_lock = threading.Lock()
+        # 유사한 질문 + 같은 검색 결과에 대해 LLM 답변을 재사용하는 캐시
+        self.answer_cache: SemanticAnswerCache | None = None
+        if settings.ANSWER_CACHE_ENABLED:
+            self.answer_cache = SemanticAnswerCache(
+                similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+                max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS
+            )
+        # 같은 질문의 임베딩과 검색 결과를 재사용하는 캐시 (검색 결과는 index_version별로 유지)
+        self.query_cache: QueryResultCache | None = None
+        if settings.QUERY_CACHE_ENABLED:
+            self.query_cache = QueryResultCache(max_entries=settings.QUERY_CACHE_MAX_ENTRIES)
         self._initialize_pipeline()
 
     # 삭제할 문서 리스트의 상대 경로를 전달받아 문서를 삭제하는 함수
-    def _delete_docs_by_relative_paths(self, relative_paths: List[str]):
+    # 모든 경로를 $in 조건 하나로 조회(get 1회)하고 한 번에 삭제(delete 1회), 삭제한 벡터 수 반환
+    # persist는 호출하지 않음 (동기화가 끝날 때 한 번만 호출)
+    def _delete_docs_by_relative_paths(self, relative_paths: List[str]) -> int:
         if not self.vectorstore or not relative_paths:
             logger.debug("벡터 저장소가 없거나 삭제할 경로 목록이 비어있어 삭제를 건너뜁니다.")
-            return
-
-        logger.info(f"벡터 DB에서 다음 상대 경로의 문서 삭제 시도 (ID 기반): {relative_paths}")
+            return 0
 
-        # ids : 벡터DB에 저장된 문서들의 ID
-        all_ids_to_delete: List[str] = []
+        unique_paths = list(dict.fromkeys(relative_paths))
+        logger.info(f"벡터 DB에서 상대 경로 {len(unique_paths)}개의 문서 삭제 시도 (ID 기반)")
+        logger.debug(f"삭제할 상대 경로: {unique_paths}")
 
-        for rel_path_str in relative_paths:
-            try:
-                # ChromaDB의 get. where문 사용
-                retrieved_docs_info = self.vectorstore.get(
-                    where={"relative_path": rel_path_str}
-                )
+        try:
+            # 모든 경로의 ID를 한 번에 조회 (문서 내용/메타데이터는 가져오지 않음)
+            retrieved_ids = self.vectorstore.get_ids_by_relative_paths(unique_paths)
+        except Exception as e:
+            logger.error(f"경로별 벡터 ID 조회 중 오류 발생: {e}", exc_info=True)
+            return 0
 
-                if retrieved_docs_info and retrieved_docs_info.get("ids"):
-                    ids_for_path = retrieved_docs_info["ids"]
-                    all_ids_to_delete.extend(ids_for_path)
-                    logger.debug(f"경로 '{rel_path_str}'에 대해 삭제할 ID 발견: {ids_for_path}")
-                else:
-                    logger.debug(f"경로 '{rel_path_str}'에 대해 DB에서 해당 문서를 찾지 못함 (이미 삭제되었거나 없음).")
-            except Exception as e:
-                logger.error(f"경로 '{rel_path_str}'의 ID 조회 중 오류 발생: {e}", exc_info=True)
-                continue
-
-            if all_ids_to_delete:
-                unique_ids_to_delete = list(set(all_ids_to_delete))
-                logger.info(f"삭제할 고유 벡터 ID 목록 ({len(unique_ids_to_delete)}개): {unique_ids_to_delete}")
-                try:
-                    self.vectorstore.delete(ids=unique_ids_to_delete)
-                    self.vectorstore.persist()
-                except Exception as e:
-                    logger.error(f"벡터 삭제 API 호출 중 오류 발생 (ID: {unique_ids_to_delete}): {e}", exc_info=True)
-                else:
-                    logger.info("삭제할 벡터 ID가 없습니다.")
+        ids_to_delete = list(dict.fromkeys(retrieved_ids))
+        if not ids_to_delete:
+            logger.info("삭제할 벡터 ID가 없습니다.")
+            return 0
 
+        logger.info(f"삭제할 고유 벡터 ID {len(ids_to_delete)}개")
+        try:
+            self.vectorstore.delete(ids=ids_to_delete)
+        except Exception as e:
+            logger.error(f"벡터 삭제 API 호출 중 오류 발생 ({len(ids_to_delete)}개): {e}", exc_info=True)
+            return 0
+        return len(ids_to_delete)
+
+
+    # 메타데이터에 기록된 청크 ID에 없는 벡터를 모두 삭제하고, 삭제한 벡터 수 반환
+    # 청크 목록이 없는 이전 형식의 파일이 남아 있으면 그 파일의 벡터를 구분할 수 없으므로 삭제하지 않음
+    def _delete_orphan_vectors(self, metadata: Dict[str, Dict[str, Any]]) -> int:
+        valid_ids = set()
+        for rel_path_str, file_metadata in metadata.items():
+            chunk_ids = get_chunk_ids(file_metadata)
+            if chunk_ids is None:
+                logger.warning(f"청크 목록이 없는 파일('{rel_path_str}')이 있어 고아 벡터 정리를 건너뜁니다.")
+                return 0
+            valid_ids.update(chunk_ids)
+
+        # 문서 내용/메타데이터 없이 ID만 조회
+        stored_ids = self.vectorstore.get_ids()
+        orphan_ids = [chunk_id for chunk_id in stored_ids if chunk_id not in valid_ids]
+        if orphan_ids:
+            logger.info(f"메타데이터에 없는 고아 벡터 {len(orphan_ids)}개 삭제")
+            self.vectorstore.delete(ids=orphan_ids)
+        return len(orphan_ids)
 
     # initialize : 초기화
     def _initialize_pipeline(self):
         logger.info("RAG 파이프라인 초기화 시작...")
 
         try:
-            self.embeddings = get_embedding_model(model_name=settings.EMBEDDING_MODEL_NAME)
+            embedding_engine = settings.EMBEDDING_ENGINE.lower()
+            try:
+                self.embeddings = get_embedding_model(model_name=settings.EMBEDDING_MODEL_NAME, engine=embedding_engine)
+            except Exception:
+                # 가속 엔진은 선택 사항이므로, 불러오지 못하거나 원본과 결과가 다르면 원본 모델로 진행
+                if embedding_engine == "torch":
+                    raise
+                logger.warning(f"임베딩 엔진 '{embedding_engine}'을 사용할 수 없어 원본(torch) 모델로 진행합니다.")
+                embedding_engine = "torch"
+                self.embeddings = get_embedding_model(model_name=settings.EMBEDDING_MODEL_NAME, engine=embedding_engine)
+            # 동시에 들어온 질문 임베딩을 모아서 계산
+            # (디스크 캐시 안쪽에 두어 질문 임베딩이 청크 임베딩 캐시에 저장되지 않도록 함)
+            if settings.EMBEDDING_BATCHING_ENABLED:
+                self.embedding_batcher = MicroBatchingEmbeddings(
+                    base_embeddings=self.embeddings,
+                    max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+                    max_wait_seconds=settings.EMBEDDING_BATCH_MAX_WAIT_SECONDS
+                )
+                self.embedding_batcher.start()
+                self.embeddings = self.embedding_batcher
+            # 청크 임베딩은 디스크 캐시를 먼저 확인하고, 처음 보는 청크만 모델로 계산
+            # (엔진마다 벡터가 조금씩 다르므로 엔진별로 따로 저장)
+            if settings.EMBEDDING_CACHE_ENABLED:
+                self.embeddings = CachedEmbeddings(
+                    base_embeddings=self.embeddings,
+                    model_name=embedding_cache_model_key(settings.EMBEDDING_MODEL_NAME, embedding_engine),
+                    cache_dir=settings.EMBEDDING_CACHE_PATH
+                )
         except Exception as e:
             logger.error(f"임베딩 모델 로드 실패: {e}", exc_info=True)
             raise
 
-        # 현재 존재하는 모든 데이터 파일을 읽어오고 {상대 경로: 현재 해시값}으로 저장
-        current_files_hashes = scan_data_directory(self.data_path)
+        # 데이터 디렉토리의 변경 사항을 벡터DB에 반영
+        self._sync_vectorstore(self.force_create_db, self.force_reprocess_all_files)
+        # 어휘 색인 파일이 없거나 벡터DB와 어긋난 경우(색인 파일 손상, DB 재생성, 하이브리드 검색을 새로 켠 경우 등) 맞춤
+        with self._index_lock:
+            self._reconcile_lexical_index(self.vectorstore)
+
+        # try:
+        #     self.rag_chain = create_rag_chain(
+        #         llm = get_llm(model_name=settings.LLM_MODEL_NAME),
+        #         retriever=get_retriever(self.vectorstore, settings.SEARCH_K),
+        #         prompt_template_str=settings.PROMPT_TEMPLATE
+        #     )
+        # except Exception as e:
+        #     logger.error(f"LLM, Retriever 또는 RAG 체인 설정 실패: {e}", exc_info=True)
+        #     raise
+
+        if self.vectorstore is None: # 방어 코드: vectorstore가 초기화되지 않았다면
+            logger.error("Vectorstore is not initialized. Cannot create retriever, prompt, llm.")
+            raise ValueError("Vectorstore initialization failed.")
+
+        try:
+            self.retriever = get_retriever(self.vectorstore, settings.SEARCH_K)
+            self.llm = get_llm(model_name=settings.LLM_MODEL_NAME)
+            self.prompt = ChatPromptTemplate.from_template(settings.PROMPT_TEMPLATE)
+            self.output_parser = StrOutputParser()
+            logger.info("Retriever, LLM, Prompt, OutputParser 초기화 완료.")
+        except Exception as e:
+            logger.error(f"RAG 구성 요소 (Retriever, LLM, Prompt, Parser) 초기화 실패: {e}", exc_info=True)
+            raise
+
+        # 재순위화는 선택 단계이므로, 모델을 불러오지 못하면 재순위화 없이 계속 진행
+        if settings.RERANK_ENABLED:
+            try:
+                self.reranker = CrossEncoderReranker(
+                    model=get_cross_encoder(settings.RERANK_MODEL_NAME, settings.RERANK_MAX_LENGTH),
+                    batch_size=settings.RERANK_BATCH_SIZE,
+                    cache_max_entries=settings.RERANK_CACHE_MAX_ENTRIES,
+                    latency_budget_seconds=settings.RERANK_LATENCY_BUDGET_SECONDS
+                )
+            except Exception:
+                logger.warning("크로스 인코더를 불러오지 못해 재순위화 없이 진행합니다.")
+
+        logger.info("RAG 파이프라인 초기화 완료.")
+
+
+    # 서버 실행 중 데이터 디렉토리의 변경 사항을 벡터DB에 반영 (data_watcher.py에서 호출)
+    # 반영 중에도 질문 처리는 계속되며, 검색은 반영을 시작하기 전의 색인을 사용하다가 끝나면 한 번에 바뀐 색인을 사용
+    # (_sync_vectorstore_locked 참고)
+    def refresh_index(self) -> bool:
+        if self.vectorstore is None:
+            logger.warning("벡터 저장소가 초기화되지 않아 증분 갱신을 건너뜁니다.")
+            return False
+        return self._sync_vectorstore()
+
+    # 재색인 작업 실행 (reindex_jobs.ReindexJobManager에서 호출)
+    # - incremental : 변경된 파일만 반영 (refresh_index와 같음)
+    # - full : 모든 파일을 다시 읽고 분할해서 반영. 같은 내용의 청크는 같은 ID로 upsert 되고
+    #          임베딩 캐시를 재사용하며, 기존 벡터DB를 지우지 않으므로 진행 중에도 질문 처리가 계속됨
+    #          (검색은 재색인이 끝날 때까지 시작 전의 색인을 사용)
+    def reindex(self, mode: str = "incremental", job: Optional[ReindexJob] = None) -> bool:
+        if self.vectorstore is None:
+            raise RuntimeError("벡터 저장소가 초기화되지 않아 재색인할 수 없습니다.")
+        return self._sync_vectorstore(force_reprocess_all_files=(mode == "full"), job=job)
+
+    # 데이터 디렉토리를 스캔해 이전 메타데이터와 비교하고, 변경 사항을 벡터DB에 반영
+    # - 신규 파일 : 모든 청크 추가
+    # - 수정 파일 : 이전/현재 청크 목록을 비교하여 바뀐 청크만 삭제/추가 (청크 목록이 없는 이전 형식은 파일 단위로 교체)
+    # - 삭제 파일 : 메타데이터에 기록된 청크 ID로 삭제
+    # 벡터DB가 바뀌었으면 True 반환
+    # 반영하는 동안의 변경은 검색에 보이지 않도록 모아 두었다가(stage_updates), 끝날 때(정상 종료/취소/오류 모두) 한 번에 반영
+    # - 실행 중인 질문은 같은 파일의 이전/새 청크를 함께 보거나 일부 파일만 반영된 색인을 보지 않음
+    # - 취소/오류로 중단되면 그때까지 반영된 상태가 공개되며, 중단된 파일은 다음 동기화에서 정리됨
+    # - 중간 저장(checkpoint)은 추가/삭제가 끝난 파일까지만 저장하므로, 저장된 색인을 다시 읽는 다른 워커 프로세스는
+    #   한 파일의 이전/새 청크가 섞이지 않은 중간 상태를 볼 수 있음
+    # - Chroma 저장소는 모아 두기를 지원하지 않아 반영 중간 상태가 검색될 수 있음 (미해결)
+    # force_create_db, force_reprocess_all_files : 시작 시 동기화에서만 생성자 인자가 그대로 전달됨
+    # job : 진행 상황을 기록하고 취소 요청을 확인할 재색인 작업 (reindex_jobs.py)
+    def _sync_vectorstore(self, force_create_db: bool = False, force_reprocess_all_files: bool = False,
+                          job: Optional[ReindexJob] = None) -> bool:
+        # 시작 시 동기화, 감시 스레드의 증분 갱신, 재색인 작업이 겹치지 않도록 한 번에 하나씩만 실행
+        with self._index_lock:
+            return self._sync_vectorstore_locked(force_create_db, force_reprocess_all_files, job or ReindexJob())
+
+    def _sync_vectorstore_locked(self, force_create_db: bool, force_reprocess_all_files: bool,
+                                 job: ReindexJob) -> bool:
+        job.update(stage="scanning")
         # 현재 메타데이터
         previous_metadata = load_metadata()
+        # 현재 존재하는 모든 데이터 파일을 스캔, 크기/수정 시각이 이전과 같은 파일은 해시 계산을 건너뜀
+        current_files_stats = scan_data_directory_with_stats(self.data_path, previous_metadata)
+        # {상대 경로: 현재 해시값}
+        current_files_hashes = {rel_path_str: file_stats["hash"] for rel_path_str, file_stats in current_files_stats.items()}
+        job.update(files_total=len(current_files_hashes), files_scanned=len(current_files_hashes))
+        job.raise_if_cancelled()
         # 현재 파일 해시와 이전 메타데이터 비교, 변경된 파일(신규/수정/삭제) 목록 선언
         new_file_paths, modified_file_paths, deleted_file_paths = get_changed_files(
             current_files_hashes, previous_metadata
         )
         # Path 객체인 vectorstor_path를 문자열로 변환해서 저장
         db_path_str = str(self.vectorstore_path)
-        # 벡터DB 초기화
-        self.vectorstore = None
+        # 이미 로드된 벡터DB(서버 실행 중 증분 갱신)는 질문 처리에 계속 사용하면서 그대로 갱신
+        vectorstore = self.vectorstore
 
-        db_action: str = "load_or_create"
         files_to_load_for_db: List[str] = []
+        # 파일 단위로(경로 조건 검색 후) 삭제할 상대 경로 (청크 목록이 없는 이전 형식의 메타데이터)
         paths_to_delete_from_db: List[str] = []
+        # 청크 ID로 바로 삭제할 ID 목록
+        chunk_ids_to_delete: List[str] = []
+        # 이전/현재 청크 목록을 비교할 파일 {상대 경로: 이전 청크 목록}
+        previous_chunks_by_path: Dict[str, List[Dict[str, str]]] = {}
         # 이전 메타데이터 복사해서 저장
         base_metadata_for_update: Dict[str, Any] = previous_metadata.copy()
 
-        if self.force_create_db:
+        # 파일 하나의 벡터를 모두 삭제 대상으로 등록
+        def schedule_file_deletion(rel_path_str: str):
+            chunk_ids = get_chunk_ids(previous_metadata.get(rel_path_str, {}))
+            if chunk_ids is None:
+                paths_to_delete_from_db.append(rel_path_str)
+            else:
+                chunk_ids_to_delete.extend(chunk_ids)
+
+        if force_create_db and vectorstore is None:
             logger.info(f"DB 강제 재생성 요청: 기존 벡터 저장소 '{db_path_str}' 삭제 시도.")
             # 기존 벡터DB가 존재하면 삭제 먼저 진행
             if os.path.exists(self.vectorstore_path):
                 shutil.rmtree(self.vectorstore_path)
-            db_action = "create_new"
             # 현재 해시값을 가지고 있는 모든 파일
             files_to_load_for_db = list(current_files_hashes.keys())
             # 기존 벡터DB를 삭제했기에 저장해둔 이전 메타데이터도 삭제
             base_metadata_for_update = {}
-        elif self.force_reprocess_all_files:
-            logger.info("모든 파일 강제 재처리 요청.")
-            db_action = "load_and_reprocess_all"
-            if previous_metadata:
-                paths_to_delete_from_db.extend(list(previous_metadata.keys()))
-            files_to_load_for_db = list(current_files_hashes.keys())
-            base_metadata_for_update = {}
         else:
-            if deleted_file_paths:
-                paths_to_delete_from_db.extend(list(deleted_file_paths))
-            if modified_file_paths:
-                paths_to_delete_from_db.extend(modified_file_paths)
-
-            files_to_load_for_db.extend(new_file_paths)
-            files_to_load_for_db.extend(modified_file_paths)
+            # 다시 처리할 파일: 강제 재처리면 현재 모든 파일, 아니면 신규/수정 파일
+            if force_reprocess_all_files:
+                logger.info("모든 파일 강제 재처리 요청.")
+                files_to_load_for_db = list(current_files_hashes.keys())
+            else:
+                files_to_load_for_db.extend(new_file_paths)
+                files_to_load_for_db.extend(modified_file_paths)
+                # 청크 목록이 없는 이전 형식의 파일은 벡터DB가 임의로 만든 ID로 저장되어 있어(중복 가능),
+                # 내용이 바뀌지 않았어도 한 번 다시 처리하여 고정 청크 ID로 옮김
+                legacy_file_paths = [
+                    rel_path_str for rel_path_str in current_files_hashes
+                    if rel_path_str in previous_metadata and "chunks" not in previous_metadata[rel_path_str]
+                    and rel_path_str not in modified_file_paths
+                ]
+                if legacy_file_paths:
+                    logger.info(f"이전 형식 메타데이터 파일 {len(legacy_file_paths)}개를 고정 청크 ID로 다시 반영합니다.")
+                    files_to_load_for_db.extend(legacy_file_paths)
+                # 텍스트 분할기(TEXT_SPLITTER_ENGINE)가 바뀌었으면, 내용이 같아도 청크 경계가 달라지므로 다시 분할
+                # (바뀌지 않은 청크는 같은 ID로 유지되고, 임베딩 캐시로 다시 계산하지 않음)
+                resplit_file_paths = [
+                    rel_path_str for rel_path_str in get_files_split_with_other_engine(
+                        current_files_hashes, previous_metadata, self._splitter_engine()
+                    )
+                    if rel_path_str not in legacy_file_paths
+                ]
+                if resplit_file_paths:
+                    logger.info(f"텍스트 분할기가 '{self._splitter_engine()}'(으)로 바뀌어 "
+                                f"파일 {len(resplit_file_paths)}개를 다시 분할합니다.")
+                    files_to_load_for_db.extend(resplit_file_paths)
+
+            for rel_path_str in deleted_file_paths:
+                schedule_file_deletion(rel_path_str)
+            # 이전에 처리된 적 있는 파일은 이전/현재 청크 목록을 비교 (청크 목록이 없는 이전 형식은 경로 기준으로 삭제 후 다시 추가)
+            for rel_path_str in files_to_load_for_db:
+                if rel_path_str not in previous_metadata:
+                    continue
+                previous_chunks = previous_metadata[rel_path_str].get("chunks")
+                if previous_chunks is None:
+                    paths_to_delete_from_db.append(rel_path_str)
+                else:
+                    previous_chunks_by_path[rel_path_str] = previous_chunks
 
+            # 처리하지 않은 파일의 메타데이터는 그대로 유지되므로, 도중에 중단되어도 기존 청크 목록을 잃지 않음
             base_metadata_for_update = remove_metadata_for_deleted_files(
                 deleted_file_paths, base_metadata_for_update
             )
 
-        if db_action != "create new" and os.path.exists(self.vectorstore_path) and \
-            any(Path(self.vectorstore_path).iterdir()):
-                try:
-                    self.vectorstore = Chroma(persist_directory=db_path_str, embedding_function=self.embeddings)
-                    logger.info(f"기존 벡터 저장소 로드 완료 (액션: {db_action}).")
-                except Exception as e:
-                    logger.warning(f"기존 DB 로드 실패 ({e}). DB를 새로 생성합니다.", exc_info=True)
-
-                    if os.path.exists(self.vectorstore_path):
-                        shutil.rmtree(self.vectorstore_path)
-                        self.vectorstore_path = None
-                        db_action = "create_new"
-
-                if paths_to_delete_from_db and self.vectorstore:
-                    self._delete_docs_by_relative_paths(paths_to_delete_from_db)
-                elif paths_to_delete_from_db and not self.vectorstore:
-                    logger.warning(f"삭제할 벡터 경로({paths_to_delete_from_db})가 있으나, DB 객체가 로드되지 않아 삭제를 건너뜁니다 (DB가 새로 생성될 예정).")
-
-        split_docs_for_db: list[Document] = []
-        if files_to_load_for_db:
-            docs_to_process = load_docs_from_paths(
-                self.data_path,
-                files_to_load_for_db
-            )
-            if docs_to_process:
-                # 텍스트를 청크 단위로 분할해주는 분할기 생성
-                text_splitter = get_text_splitter(chunk_size=settings.CHUNK_SIZE, chunk_overlap=settings.CHUNK_OVERLAP)
-                # actual_docs(로드된 Documents 타입의 리스트)를 더 작은 청크 단위의 Document 객체 리스트로 분할해서 저장
-                split_docs_for_db = split_documents(text_splitter, docs_to_process)
-                logger.info(f"{len(split_docs_for_db)}개의 문서 청크를 DB에 반영할 예정입니다.")
-
-            if db_action == "create_new" and self.vectorstore is None:
-                if not split_docs_for_db and db_action == "create_new":
-                    logger.warning("새 DB 생성 요청되었으나 처리할 문서가 없습니다. 빈 DB가 생성될 수 있습니다.")
-
-                self.vectorstore = Chroma.from_documents(
-                    documents=split_docs_for_db if split_docs_for_db else [],
-                    embedding=self.embeddings,
-                    persist_directory=db_path_str
+        if vectorstore is None and vector_index_exists(settings.VECTOR_INDEX_BACKEND, self.vectorstore_path):
+            try:
+                vectorstore = get_vector_index(db_path_str, self.embeddings)
+                logger.info("기존 벡터 저장소 로드 완료.")
+            except Exception as e:
+                logger.warning(f"기존 DB 로드 실패 ({e}). DB를 새로 생성하고 모든 파일을 다시 반영합니다.", exc_info=True)
+                shutil.rmtree(self.vectorstore_path)
+                files_to_load_for_db = list(current_files_hashes.keys())
+                paths_to_delete_from_db = []
+                chunk_ids_to_delete = []
+                previous_chunks_by_path = {}
+                base_metadata_for_update = {}
+
+        if vectorstore is None:
+            # 디렉토리가 없거나 비어있으면 빈 컬렉션으로 새 벡터 저장소 생성
+            vectorstore = get_vector_index(db_path_str, self.embeddings)
+            logger.info(f"새 벡터 저장소 생성 완료: '{db_path_str}'")
+            # 메타데이터에는 처리된 파일이 있는데 저장소가 새로 만들어진 경우(저장소 디렉토리 삭제, 저장소 종류 변경 등)
+            # 모든 파일을 다시 반영
+            if previous_metadata and not force_create_db:
+                logger.info("벡터 저장소가 비어있어 모든 파일을 다시 반영합니다.")
+                files_to_load_for_db = list(current_files_hashes.keys())
+                paths_to_delete_from_db = []
+                chunk_ids_to_delete = []
+                previous_chunks_by_path = {}
+                base_metadata_for_update = {}
+        self.vectorstore = vectorstore
+        if settings.HYBRID_SEARCH_ENABLED and self.lexical_index is None:
+            # 저장된 어휘 색인을 로드 (없으면 빈 색인, 벡터DB와의 차이는 시작 시 동기화 후 맞춤)
+            self.lexical_index = LexicalIndex.load(settings.LEXICAL_INDEX_PATH)
+        lexical_index = self.lexical_index
+        # 반영할 변경이 있으면 끝날 때까지 검색은 지금 상태의 색인을 사용 (어휘 색인은 복사하므로 변경이 없으면 건너뜀)
+        staged = bool(files_to_load_for_db or paths_to_delete_from_db or chunk_ids_to_delete or force_reprocess_all_files)
+        if staged:
+            vectorstore.stage_updates()
+            if lexical_index is not None:
+                lexical_index.stage_updates()
+        index_changed = False
+        try:
+            job.update(stage="splitting", files_to_process=len(files_to_load_for_db))
+            job.raise_if_cancelled()
+
+            # 삭제된 파일의 벡터와, 청크 목록이 없는 이전 형식의 파일(경로로만 찾을 수 있음)은 추가 전에 먼저 삭제
+            # 삭제된 파일은 메타데이터에서도 빠지므로, 중간 저장(checkpoint) 전에 반드시 벡터DB에서 지워야 함
+            if paths_to_delete_from_db:
+                job.advance(vectors_written=self._delete_docs_by_relative_paths(paths_to_delete_from_db))
+                if lexical_index is not None:
+                    lexical_index.delete_by_relative_paths(paths_to_delete_from_db)
+            if chunk_ids_to_delete:
+                logger.info(f"삭제된 파일의 벡터 {len(chunk_ids_to_delete)}개 삭제")
+                vectorstore.delete(ids=chunk_ids_to_delete)
+                if lexical_index is not None:
+                    lexical_index.delete(chunk_ids_to_delete)
+                job.advance(vectors_written=len(chunk_ids_to_delete))
+
+            # 파일 읽기 -> 분할 -> 배치 임베딩/추가 -> 이전 청크 삭제 -> 메타데이터 중간 저장을 파일 단위로 흘려보내며 처리
+            # 메모리에는 분할 중인 파일 몇 개와 추가 대기 중인 청크 한 배치만 유지됨
+            ingest_state = _IngestState(base_metadata_for_update)
+
+            try:
+                self._stream_files_into_vectorstore(
+                    vectorstore, files_to_load_for_db, previous_chunks_by_path,
+                    force_reprocess_all_files, current_files_hashes, current_files_stats, ingest_state, job
                 )
-                logger.info(f"새 벡터 저장소 생성 완료. 저장된 청크 수: {len(split_docs_for_db)}")
-
-            elif split_docs_for_db:
-                logger.info(f"{len(split_docs_for_db)}개의 청크를 기존 벡터 저장소에 추가합니다.")
-                self.vectorstore.add_documents(documents=split_docs_for_db)
-                logger.info("문서 추가 완료.")
-
-                if self.vectorstore is None:
-                    logger.error("벡터 저장소를 초기화할 수 없습니다.")
-                    raise ValueError("벡터 저장소 초기화 실패.")
-                self.vectorstore.persist()
-
-        if files_to_load_for_db or deleted_file_paths:
-            final_metadata_to_save = update_metadata_after_processing(
-                files_to_load_for_db,
-                current_files_hashes,
-                base_metadata_for_update
+                # 전체 재처리가 끝까지 완료되면, 메타데이터에 없는 벡터(이전 실행이 중단되며 남은 청크, 임의 ID 청크 등)를 정리
+                if force_reprocess_all_files:
+                    self._persist_indexes(vectorstore)
+                    self._checkpoint_metadata(ingest_state, current_files_hashes, current_files_stats)
+                    if self._delete_orphan_vectors(ingest_state.metadata):
+                        ingest_state.written = True
+                    # 어휘 색인에도 벡터DB에 없는 청크가 남지 않도록 정리
+                    self._reconcile_lexical_index(vectorstore)
+            finally:
+                # 정상 종료, 취소, 오류 모두 여기까지 완료된 파일은 메타데이터에 저장 (다음 동기화에서 다시 처리하지 않음)
+                job.update(stage="saving")
+                index_changed = bool(ingest_state.written or deleted_file_paths or paths_to_delete_from_db
+                                     or force_create_db or ingest_state.saved_paths or ingest_state.completed_paths)
+                if index_changed:
+                    self._persist_indexes(vectorstore)
+                    self._checkpoint_metadata(ingest_state, current_files_hashes, current_files_stats)
+        finally:
+            if staged:
+                vectorstore.publish_updates()
+                if lexical_index is not None:
+                    lexical_index.publish_updates()
+            # 데이터 파일이 추가/수정/삭제되어 벡터DB가 바뀌었으므로 이전 검색 결과 기반의 캐시를 무효화
+            # (반영한 뒤에 버전을 올려야, 새 버전으로 이전 색인의 검색 결과가 캐시되지 않음)
+            if index_changed:
+                self._on_index_changed()
+        return index_changed
+
+    # 파일을 하나씩 읽고 분할하여 INDEX_ADD_BATCH_SIZE개씩 벡터DB에 추가
+    # - 중간 저장된 색인에서 파일 내용이 잠시 사라지지 않도록, 파일의 새 청크를 모두 추가한 뒤 이전 청크를 삭제
+    # - 추가와 삭제가 모두 끝난 파일은 INGEST_CHECKPOINT_SECONDS마다 메타데이터에 저장 (중단되어도 진행 상황 유지)
+    # - 중간에 취소/중단된 파일은 메타데이터가 바뀌지 않으므로, 다음 동기화에서 같은 ID로 다시 추가(upsert)되고 이전 청크가 정리됨
+    def _stream_files_into_vectorstore(self, vectorstore: VectorIndex, files_to_load: List[str],
+                                       previous_chunks_by_path: Dict[str, List[Dict[str, str]]],
+                                       reprocess_all: bool, current_files_hashes: Dict[str, str],
+                                       current_files_stats: Dict[str, Dict[str, Any]],
+                                       ingest_state: "_IngestState", job: ReindexJob):
+        if not files_to_load:
+            return
+        batch_size = max(1, settings.INDEX_ADD_BATCH_SIZE)
+        # 추가 대기 중인 청크와, 청크가 모두 추가 대기열에 들어간 파일 [(상대 경로, 삭제할 이전 청크 ID)]
+        pending_chunks: List[Document] = []
+        pending_files: List[Tuple[str, List[str]]] = []
+        lexical_index = self.lexical_index
+
+        def flush():
+            for start in range(0, len(pending_chunks), batch_size):
+                job.raise_if_cancelled()
+                batch = pending_chunks[start:start + batch_size]
+                batch_ids = [chunk.metadata["chunk_id"] for chunk in batch]
+                vectorstore.add_documents(documents=batch, ids=batch_ids)
+                if lexical_index is not None:
+                    lexical_index.upsert(batch_ids, batch)
+                ingest_state.written = True
+                job.advance(chunks_embedded=len(batch), vectors_written=len(batch))
+            pending_chunks.clear()
+
+            stale_ids = [chunk_id for _, file_stale_ids in pending_files for chunk_id in file_stale_ids]
+            if stale_ids:
+                vectorstore.delete(ids=stale_ids)
+                if lexical_index is not None:
+                    lexical_index.delete(stale_ids)
+                ingest_state.written = True
+                job.advance(vectors_written=len(stale_ids))
+            ingest_state.completed_paths.extend(rel_path_str for rel_path_str, _ in pending_files)
+            job.advance(files_processed=len(pending_files))
+            pending_files.clear()
+
+            if time.monotonic() - ingest_state.last_checkpoint >= settings.INGEST_CHECKPOINT_SECONDS:
+                self._persist_indexes(vectorstore)
+                self._checkpoint_metadata(ingest_state, current_files_hashes, current_files_stats)
+
+        job.update(stage="embedding")
+        file_chunks_iter = iter_load_and_split(
+            self.data_path,
+            files_to_load,
+            chunk_size=settings.CHUNK_SIZE,
+            chunk_overlap=settings.CHUNK_OVERLAP,
+            workers=settings.INGEST_WORKERS or os.cpu_count() or 1,
+            min_parallel_files=settings.INGEST_PARALLEL_MIN_FILES
+        )
+        try:
+            for rel_path_str, file_chunks in file_chunks_iter:
+                job.raise_if_cancelled()
+                job.advance(chunks_split=len(file_chunks))
+                chunk_records = build_chunk_records(rel_path_str, [chunk.page_content for chunk in file_chunks])
+                for chunk, record in zip(file_chunks, chunk_records):
+                    chunk.metadata["chunk_id"] = record["id"]
+
+                stale_ids: List[str] = []
+                chunks_to_add = file_chunks
+                if rel_path_str in previous_chunks_by_path:
+                    stale_ids, indices_to_add = diff_chunk_records(
+                        previous_chunks_by_path[rel_path_str], chunk_records
+                    )
+                    # 전체 재처리는 내용이 같은 청크도 다시 추가(upsert)하여 임베딩을 갱신
+                    if not reprocess_all:
+                        chunks_to_add = [file_chunks[i] for i in indices_to_add]
+                    logger.info(f"수정 파일 '{rel_path_str}': 청크 {len(chunk_records)}개 중 "
+                                f"{len(chunks_to_add)}개 추가, {len(stale_ids)}개 삭제")
+
+                job.advance(chunks_to_embed=len(chunks_to_add))
+                pending_chunks.extend(chunks_to_add)
+                pending_files.append((rel_path_str, stale_ids))
+                ingest_state.chunk_records_by_path[rel_path_str] = chunk_records
+                if len(pending_chunks) >= batch_size:
+                    flush()
+            flush()
+        finally:
+            file_chunks_iter.close()
+        logger.info(f"{len(files_to_load)}개 파일의 벡터DB 반영 완료.")
+
+    # 벡터DB와 어휘 색인을 디스크에 저장 (어휘 색인은 바뀐 경우에만)
+    # 메타데이터보다 먼저 저장하므로, 그 사이에 중단되어도 다음 동기화에서 같은 청크 ID로 다시 반영됨
+    def _persist_indexes(self, vectorstore: VectorIndex):
+        vectorstore.persist()
+        if self.lexical_index is not None and self.lexical_index.dirty:
+            try:
+                self.lexical_index.save(settings.LEXICAL_INDEX_PATH)
+            except (IOError, TypeError, ValueError):
+                logger.error(f"어휘 색인 저장 중 오류 발생, 경로: {settings.LEXICAL_INDEX_PATH}", exc_info=True)
+
+    # 어휘 색인을 벡터DB의 청크 ID 목록에 맞춤 (ID만 조회해서 비교하고, 빠진 청크만 내용을 가져와 추가)
+    # 청크 ID는 내용으로 결정되므로 ID가 같으면 내용도 같음
+    def _reconcile_lexical_index(self, vectorstore: VectorIndex):
+        lexical_index = self.lexical_index
+        if lexical_index is None or vectorstore is None:
+            return
+        stored_ids = vectorstore.get_ids()
+        indexed_ids = lexical_index.ids()
+        missing_ids = [chunk_id for chunk_id in stored_ids if chunk_id not in indexed_ids]
+        removed = lexical_index.retain(stored_ids)
+        if missing_ids:
+            stored = vectorstore.get_documents(missing_ids)
+            lexical_index.upsert([chunk_id for chunk_id, _ in stored], [doc for _, doc in stored])
+        if missing_ids or removed:
+            logger.info(f"어휘 색인을 벡터DB에 맞춤: 청크 {len(missing_ids)}개 추가, {removed}개 삭제")
+            self._persist_indexes(vectorstore)
+
+    # 추가/삭제가 끝난 파일을 메타데이터에 반영하여 저장
+    @staticmethod
+    def _checkpoint_metadata(ingest_state: "_IngestState", current_files_hashes: Dict[str, str],
+                             current_files_stats: Dict[str, Dict[str, Any]]):
+        completed_paths = ingest_state.completed_paths
+        ingest_state.metadata = update_metadata_after_processing(
+            completed_paths,
+            current_files_hashes,
+            ingest_state.metadata,
+            {rel_path_str: ingest_state.chunk_records_by_path.pop(rel_path_str) for rel_path_str in completed_paths},
+            current_files_stats,
+            RAGPipeline._splitter_engine()
+        )
+        save_metadata(ingest_state.metadata)
+        ingest_state.saved_paths.extend(completed_paths)
+        ingest_state.completed_paths = []
+        ingest_state.last_checkpoint = time.monotonic()
+
+    # 메타데이터에 기록하는 텍스트 분할기 종류 (rag_utils.get_text_splitter와 같은 기준)
+    @staticmethod
+    def _splitter_engine() -> str:
+        return settings.TEXT_SPLITTER_ENGINE.lower()
+
+    # 벡터DB 내용이 바뀌었을 때 호출. 인덱스 버전을 올리고 캐시를 비움
+    def _on_index_changed(self):
+        self.index_version += 1
+        if self.answer_cache is not None:
+            self.answer_cache.clear()
+        logger.info(f"벡터 인덱스 버전 갱신: {self.index_version}")
+
+    # 질문 임베딩으로 벡터 검색하여 상위 k개 반환
+    # 각 문서의 metadata["relevance_score"]에 질문과의 코사인 유사도를 기록 (문맥 조립의 관련도 컷오프에 사용)
+    @staticmethod
+    def _dense_search(vectorstore: VectorIndex, question_embedding: List[float], k: int) -> List[Document]:
+        docs = []
+        for doc, score in vectorstore.similarity_search_with_scores(question_embedding, k=k):
+            doc.metadata["relevance_score"] = round(score, 4)
+            docs.append(doc)
+        return docs
+
+    # 질문에 대한 검색
+    # 하이브리드 검색을 사용하면 벡터 검색과 BM25 어휘 검색에서 각각 HYBRID_CANDIDATE_K개를 가져와 RRF로 결합
+    # 재순위화를 사용하면 RERANK_CANDIDATE_K개의 후보를 크로스 인코더로 다시 정렬한 뒤 상위 SEARCH_K개를 사용
+    def _search(self, vectorstore: VectorIndex, question: str, question_embedding: List[float]) -> List[Document]:
+        reranker = self.reranker
+        result_k = max(settings.SEARCH_K, settings.RERANK_CANDIDATE_K) if reranker is not None else settings.SEARCH_K
+
+        lexical_index = self.lexical_index
+        if lexical_index is None:
+            candidates = self._dense_search(vectorstore, question_embedding, result_k)
+        else:
+            candidate_k = max(result_k, settings.HYBRID_CANDIDATE_K)
+            dense_docs = self._dense_search(vectorstore, question_embedding, candidate_k)
+            lexical_docs = [doc for doc, _ in lexical_index.search(question, candidate_k)]
+            candidates = reciprocal_rank_fusion([dense_docs, lexical_docs], top_n=result_k, rrf_k=settings.HYBRID_RRF_K)
+
+        if reranker is None:
+            return candidates
+        return reranker.rerank(question, candidates, settings.SEARCH_K)
+
+    # 질문 임베딩 후, 그 임베딩으로 검색
+    # 임베딩을 답변 캐시 조회에도 재사용하기 위해 retriever.invoke 대신 두 단계를 직접 수행
+    # 같은 질문이 반복되면 query_cache로 임베딩 연산과 벡터DB 조회를 모두 건너뜀
+    def _retrieve(self, question: str) -> Tuple[List[float], List[Document]]:
+        # 검색 도중 벡터DB 객체가 교체되어도 한 질문은 같은 객체로 검색
+        vectorstore = self.vectorstore
+        if self.query_cache is None:
+            question_embedding = self.embeddings.embed_query(question)
+            return question_embedding, self._search(vectorstore, question, question_embedding)
+
+        normalized_question = normalize_question(question)
+        # 검색 도중 인덱스가 바뀌어도 검색을 시작한 시점의 버전으로 저장
+        index_version = self.index_version
+
+        question_embedding = self.query_cache.get_embedding(normalized_question)
+        if question_embedding is None:
+            question_embedding = self.embeddings.embed_query(question)
+            self.query_cache.put_embedding(normalized_question, question_embedding)
+
+        retrieved_docs = self.query_cache.get_results(normalized_question, settings.SEARCH_K, index_version)
+        if retrieved_docs is None:
+            retrieved_docs = self._search(vectorstore, question, question_embedding)
+            self.query_cache.put_results(normalized_question, settings.SEARCH_K, index_version, retrieved_docs)
+        return question_embedding, retrieved_docs
+
+    # 답변 캐시 조회. 캐시를 사용하지 않거나 적중하지 않으면 None
+    def _lookup_cached_answer(self, question_embedding: List[float], context_key: str) -> Optional[str]:
+        if self.answer_cache is None:
+            return None
+        return self.answer_cache.lookup(question_embedding, context_key)
+
+    # LLM이 정상적으로 생성한 답변만 캐시에 저장
+    def _store_answer(self, question: str, question_embedding: List[float], context_key: str,
+                      answer: str, generation_seconds: float):
+        if self.answer_cache is None or not answer:
+            return
+        self.answer_cache.store(question, question_embedding, context_key, answer, generation_seconds)
+
+    # 캐시 통계 (적중률, 절약 시간 등)
+    def get_cache_stats(self) -> Dict[str, Any]:
+        return {
+            "index_version": self.index_version,
+            "answer_cache": self.answer_cache.stats() if self.answer_cache is not None else None,
+            "query_cache": self.query_cache.stats() if self.query_cache is not None else None,
+            "reranker": self.reranker.stats() if self.reranker is not None else None,
+            "embedding_batcher": self.embedding_batcher.stats() if self.embedding_batcher is not None else None,
+        }
+
+    # 파이프라인 구성요소가 모두 준비되었는지 확인
+    def _is_ready(self) -> bool:
+        return all([self.retriever, self.prompt, self.llm, self.output_parser])
+
+    # 검색된 문서들의 내용을 하나의 문맥 문자열로 결합
+    @staticmethod
+    def _build_context(retrieved_docs: List[Document]) -> str:
+        logger.debug(f"검색된 문서 개수: {len(retrieved_docs)}")
+        for i, doc in enumerate(retrieved_docs):
+            logger.debug(f"문서 {i + 1} 소스: {doc.metadata.get('source', 'N/A')}, 내용 일부: {doc.page_content[:100]}...")
+
+        if settings.CONTEXT_PACKING_ENABLED:
+            return pack_context(
+                retrieved_docs,
+                token_budget=settings.CONTEXT_TOKEN_BUDGET,
+                min_relevance_score=settings.CONTEXT_MIN_RELEVANCE_SCORE
             )
-            save_metadata(final_metadata_to_save)
-
-        # try:
-        #     self.rag_chain = create_rag_chain(
-        #         llm = get_llm(model_name=settings.LLM_MODEL_NAME),
-        #         retriever=get_retriever(self.vectorstore, settings.SEARCH_K),
-        #         prompt_template_str=settings.PROMPT_TEMPLATE
-        #     )
-        # except Exception as e:
-        #     logger.error(f"LLM, Retriever 또는 RAG 체인 설정 실패: {e}", exc_info=True)
-        #     raise
-
-        if self.vectorstore is None: # 방어 코드: vectorstore가 초기화되지 않았다면
-            logger.error("Vectorstore is not initialized. Cannot create retriever, prompt, llm.")
-            raise ValueError("Vectorstore initialization failed.")
 
-        try:
-            self.retriever = get_retriever(self.vectorstore, settings.SEARCH_K)
-            self.llm = get_llm(model_name=settings.LLM_MODEL_NAME)
-            self.prompt = ChatPromptTemplate.from_template(settings.PROMPT_TEMPLATE)
-            self.output_parser = StrOutputParser()
-            logger.info("Retriever, LLM, Prompt, OutputParser 초기화 완료.")
-        except Exception as e:
-            logger.error(f"RAG 구성 요소 (Retriever, LLM, Prompt, Parser) 초기화 실패: {e}", exc_info=True)
-            raise
+        context_parts = []
+        for doc in retrieved_docs:
+            context_parts.append(doc.page_content)
+
+        return "\n\n".join(context_parts)
+
+    # 대화 기록(BaseMessage 리스트)을 프롬프트에 넣을 문자열로 변환
+    # history_summary가 있으면 최근 대화 앞에 '이전 대화 요약'으로 붙임
+    @staticmethod
+    def _build_chat_history(history: Optional[List[BaseMessage]],
+                            history_summary: Optional[str] = None) -> str:
+        if not history and not history_summary:
+            return "이전 대화 기록이 존재하지 않습니다."
+
+        history_lines = []
+        if history_summary:
+            history_lines.append(f"이전 대화 요약: {history_summary}")
+        for msg in history or []:
+            if msg.type == "human":
+                history_lines.append(f"사용자: {msg.content}")
+            elif msg.type == "ai":
+                history_lines.append(f"AI: {msg.content}")
+        return "\n".join(history_lines)
+
+    # 기존 누적 요약에 새 메시지들을 합친 요약 생성
+    def summarize_history(self, previous_summary: str, messages: List[BaseMessage]) -> str:
+        return self._build_summary_chain().invoke(
+            self._build_summary_inputs(previous_summary, messages)
+        ).strip()
+
+    async def asummarize_history(self, previous_summary: str, messages: List[BaseMessage]) -> str:
+        summary = await self._build_summary_chain().ainvoke(
+            self._build_summary_inputs(previous_summary, messages)
+        )
+        return summary.strip()
 
-        logger.info("RAG 파이프라인 초기화 완료.")
+    def _build_summary_chain(self):
+        return (
+                ChatPromptTemplate.from_template(settings.HISTORY_SUMMARY_PROMPT_TEMPLATE)
+                | self.llm
+                | self.output_parser
+        )
 
+    def _build_summary_inputs(self, previous_summary: str, messages: List[BaseMessage]) -> Dict[str, str]:
+        return {
+            "previous_summary": previous_summary or "없음",
+            # 요약 대상 메시지만 대화 형식으로 변환 (요약 문구는 previous_summary로 따로 전달)
+            "conversation": self._build_chat_history(messages)
+        }
+
+    # 프롬프트 -> LLM -> 문자열 파서로 이어지는 체인
+    def _build_chain(self):
+        return (
+                self.prompt
+                | self.llm
+                | self.output_parser
+        )
 
     # 사용자 질문을 전달해 LLM 답변을 반환
-    def query(self, question: str, history: Optional[List[BaseMessage]] = None) -> str:
+    def query(self, question: str, history: Optional[List[BaseMessage]] = None,
+               history_summary: Optional[str] = None) -> str:
 
-        if not all([self.retriever, self.prompt, self.llm, self.output_parser]):
+        if not self._is_ready():
             logger.error("RAG 파이프라인의 일부 구성요소가 초기화되지 않았습니다.")
             return "오류: RAG 시스템이 준비되지 않았습니다."
 
         try:
             logger.info(f"RAG 파이프라인으로 질문 처리 중: {question}")
 
-            retrieved_docs: List[Document] = self.retriever.invoke(question)
-
-            logger.debug(f"검색된 문서 개수: {len(retrieved_docs)}")
-            for i, doc in enumerate(retrieved_docs):
-                logger.debug(f"문서 {i + 1} 소스: {doc.metadata.get('source', 'N/A')}, 내용 일부: {doc.page_content[:100]}...")
-
-            context_parts = []
-            for doc in retrieved_docs:
-                context_parts.append(doc.page_content)
+            question_embedding, retrieved_docs = self._retrieve(question)
 
-            context_str = "\n\n".join(context_parts)
+            # 대화 기록이 다르면 같은 질문이라도 답변이 달라지므로 캐시 키에 포함
+            chat_history = self._build_chat_history(history, history_summary)
+            context_key = make_context_key(retrieved_docs, chat_history)
+            cached_answer = self._lookup_cached_answer(question_embedding, context_key)
+            if cached_answer is not None:
+                return cached_answer
 
-            chat_history_str = ""
-            if history:
-                history_lines = []
-                for msg in history:
-                    if msg.type == "human":
-                        history_lines.append(f"사용자: {msg.content}")
-                    elif msg.type == "ai":
-                        history_lines.append(f"AI: {msg.content}")
-                chat_history_str = "\n".join(history_lines)
-            else:
-                chat_history_str = "이전 대화 기록이 존재하지 않습니다."
-
-            chain = (
-                    self.prompt
-                    | self.llm
-                    | self.output_parser
-            )
-
-            answer = chain.invoke({
-                "chat_history": chat_history_str,
-                "context": context_str,
+            generation_started = time.perf_counter()
+            answer = self._build_chain().invoke({
+                "chat_history": chat_history,
+                "context": self._build_context(retrieved_docs),
                 "question": question
             })
+            self._store_answer(question, question_embedding, context_key, answer,
+                               time.perf_counter() - generation_started)
 
             logger.info(f"RAG 파이프라인 답변 생성 완료.")
             return answer  # 답변과 소스 문서 내용 리스트 반환
@@ -354,6 +856,104 @@ class RAGPipeline:
             logger.error(f"질문 처리 중 오류 발생: {e}", exc_info=True)
             return "답변 생성 중 오류가 발생했습니다."
 
+    # query의 비동기 버전
+    # 질문 임베딩/벡터 검색(CPU 작업)은 전용 스레드 풀에서, LLM 호출은 체인의 ainvoke로 처리하여
+    # 이벤트 루프를 막지 않음. 동시에 처리되는 질문 수는 MAX_CONCURRENT_QUERIES로 제한
+    async def aquery(self, question: str, history: Optional[List[BaseMessage]] = None,
+                     history_summary: Optional[str] = None) -> str:
+
+        if not self._is_ready():
+            logger.error("RAG 파이프라인의 일부 구성요소가 초기화되지 않았습니다.")
+            return "오류: RAG 시스템이 준비되지 않았습니다."
+
+        async with self._query_semaphore:
+            try:
+                logger.info(f"RAG 파이프라인으로 질문 비동기 처리 중: {question}")
+
+                question_embedding, retrieved_docs = await self._aretrieve(question)
+
+                # 대화 기록이 다르면 같은 질문이라도 답변이 달라지므로 캐시 키에 포함
+                chat_history = self._build_chat_history(history, history_summary)
+                context_key = make_context_key(retrieved_docs, chat_history)
+                cached_answer = self._lookup_cached_answer(question_embedding, context_key)
+                if cached_answer is not None:
+                    return cached_answer
+
+                generation_started = time.perf_counter()
+                answer = await self._build_chain().ainvoke({
+                    "chat_history": chat_history,
+                    "context": self._build_context(retrieved_docs),
+                    "question": question
+                })
+                self._store_answer(question, question_embedding, context_key, answer,
+                                   time.perf_counter() - generation_started)
+
+                logger.info(f"RAG 파이프라인 답변 생성 완료.")
+                return answer
+
+            except Exception as e:
+                logger.error(f"질문 처리 중 오류 발생: {e}", exc_info=True)
+                return "답변 생성 중 오류가 발생했습니다."
+
+    # 질문 임베딩과 벡터 검색(CPU 작업)을 질의용 스레드 풀에서 실행
+    async def _aretrieve(self, question: str) -> Tuple[List[float], List[Document]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._query_executor, self._retrieve, question
+        )
+
+    # aquery의 스트리밍 버전
+    # 검색이 끝나면 LLM이 생성하는 토큰(문자열 조각)을 도착하는 즉시 순서대로 yield
+    # query/aquery와 달리 오류를 문자열로 바꾸지 않고 그대로 발생시켜,
+    # 호출 측(/ask/stream)이 실패한 답변을 대화 기록에 저장하지 않도록 함
+    async def astream_query(self, question: str,
+                            history: Optional[List[BaseMessage]] = None,
+                            history_summary: Optional[str] = None) -> AsyncIterator[str]:
+
+        if not self._is_ready():
+            logger.error("RAG 파이프라인의 일부 구성요소가 초기화되지 않았습니다.")
+            raise RuntimeError("RAG 시스템이 준비되지 않았습니다.")
+
+        async with self._query_semaphore:
+            try:
+                logger.info(f"RAG 파이프라인으로 질문 스트리밍 처리 중: {question}")
+
+                question_embedding, retrieved_docs = await self._aretrieve(question)
+
+                # 캐시에 적중하면 저장된 답변을 한 번에 전송 (대화 기록이 같은 답변만)
+                chat_history = self._build_chat_history(history, history_summary)
+                context_key = make_context_key(retrieved_docs, chat_history)
+                cached_answer = self._lookup_cached_answer(question_embedding, context_key)
+                if cached_answer is not None:
+                    yield cached_answer
+                    return
+
+                generation_started = time.perf_counter()
+                answer_parts: List[str] = []
+                async for chunk in self._build_chain().astream({
+                    "chat_history": chat_history,
+                    "context": self._build_context(retrieved_docs),
+                    "question": question
+                }):
+                    if chunk:
+                        answer_parts.append(chunk)
+                        yield chunk
+                self._store_answer(question, question_embedding, context_key, "".join(answer_parts),
+                                   time.perf_counter() - generation_started)
+
+                logger.info(f"RAG 파이프라인 스트리밍 답변 생성 완료.")
+
+            except Exception as e:
+                logger.error(f"질문 스트리밍 처리 중 오류 발생: {e}", exc_info=True)
+                raise
+
+    # 애플리케이션 종료 시 질의용 스레드 풀과 질문 임베딩 배치 처리 스레드 정리
+    def close(self):
+        self._query_executor.shutdown(wait=False, cancel_futures=True)
+        if self.embedding_batcher is not None:
+            self.embedding_batcher.close()
+        logger.info("RAG 파이프라인 질의 스레드 풀 종료.")
+
 
     # def query(self, question: str) -> str:
         # if not self.rag_chain:
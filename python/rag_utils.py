@@ -18,6 +18,12 @@ from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
 # 한국어 형태소 분할기 import
 from langchain_text_splitters import KonlpyTextSplitter
+# JVM 없이 동작하는 규칙 기반 한국어 문장 분할기
+from korean_splitter import KoreanSentenceTextSplitter
+# 벡터 색인 인터페이스와 저장소별 구현
+from vector_index import VectorIndex, open_vector_index
+# PyTorch float32 이외의 임베딩 추론 엔진 (동적 int8 양자화, ONNX Runtime)
+from embedding_engines import load_embedding_engine
 # 프롬프트 템플릿 import
 from langchain_core.prompts import ChatPromptTemplate
 # 사용자의 질문을 어떤 변환이나 처리 과정을 거치지 않고 RAG 체인에 그대로 전달하기 위해 import
@@ -35,9 +41,19 @@ import logging
 logger = logging.getLogger(__name__)
 
 # 텍스트 분할기
+# settings.TEXT_SPLITTER_ENGINE에 따라 Konlpy(Kkma) 분할기 또는 규칙 기반 분할기를 반환
 def get_text_splitter(chunk_size: int = settings.CHUNK_SIZE,
-                      chunk_overlap: int = settings.CHUNK_OVERLAP):
-    logger.info(f"텍스트 분할기 초기화 (chunk_size: {chunk_size}, chunk_overlap: {chunk_overlap})")
+                      chunk_overlap: int = settings.CHUNK_OVERLAP,
+                      engine: str | None = None):
+    engine = (engine or settings.TEXT_SPLITTER_ENGINE).lower()
+    logger.info(f"텍스트 분할기 초기화 (engine: {engine}, chunk_size: {chunk_size}, chunk_overlap: {chunk_overlap})")
+    if engine == "rule":
+        return KoreanSentenceTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+    if engine != "konlpy":
+        raise ValueError(f"지원하지 않는 텍스트 분할기입니다: '{engine}' (가능한 값: konlpy, rule)")
     return KonlpyTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap
@@ -50,7 +66,23 @@ def split_documents(text_splitter, docs: list[Document]):
     return split_docs
 
 # 임베딩 모델 호출
-def get_embedding_model(model_name: str = settings.EMBEDDING_MODEL_NAME):
+# settings.EMBEDDING_ENGINE이 "torch"가 아니면 embedding_engines.py의 엔진으로 로드 (CPU 전용)
+def get_embedding_model(model_name: str = settings.EMBEDDING_MODEL_NAME, engine: str | None = None):
+    engine = (engine or settings.EMBEDDING_ENGINE).lower()
+    if engine != "torch":
+        try:
+            embeddings = load_embedding_engine(
+                engine, model_name,
+                onnx_dir=settings.EMBEDDING_ONNX_DIR,
+                quantization=settings.EMBEDDING_ONNX_QUANTIZATION,
+                batch_size=settings.EMBEDDING_BATCH_SIZE,
+                min_cosine=settings.EMBEDDING_PARITY_MIN_COSINE
+            )
+            logger.info(f"임베딩 모델 '{model_name}' 로드 완료 (engine: {engine}, device: cpu)")
+            return embeddings
+        except Exception as e:
+            logger.error(f"임베딩 엔진 '{engine}' ({model_name}) 초기화 중 오류: {e}", exc_info=True)
+            raise
     try:
         # CUDA를 지원하는 NVIDIA GPU가 사용 가능하면 'cuda' (GPU 사용), 그렇지 않으면 'cpu' (CPU 사용)
         device = 'cuda' if torch.cuda.is_available() else 'cpu'
@@ -69,6 +101,21 @@ def get_embedding_model(model_name: str = settings.EMBEDDING_MODEL_NAME):
         logger.error(f"HuggingFaceEmbeddings ({model_name}) 초기화 중 오류: {e}", exc_info=True)
         raise
 
+# 재순위화용 크로스 인코더 호출 (reranker.py)
+# sentence-transformers는 langchain-huggingface와 함께 설치되며, 재순위화를 사용할 때만 import
+def get_cross_encoder(model_name: str = settings.RERANK_MODEL_NAME,
+                      max_length: int = settings.RERANK_MAX_LENGTH):
+    try:
+        from sentence_transformers import CrossEncoder
+        # 질문 처리 중 짧은 배치만 계산하므로 GPU가 있어도 CPU에서 실행 (임베딩 모델과 GPU 메모리를 나누지 않음)
+        cross_encoder = CrossEncoder(model_name, max_length=max_length, device='cpu')
+        logger.info(f"크로스 인코더 '{model_name}' 로드 완료 (device: cpu, 최대 길이: {max_length})")
+        return cross_encoder
+
+    except Exception as e:
+        logger.error(f"CrossEncoder ({model_name}) 초기화 중 오류: {e}", exc_info=True)
+        raise
+
 # LLM 모델 호출
 def get_llm(model_name: str = settings.LLM_MODEL_NAME,
             temperature: float = 0.3):
@@ -123,9 +170,24 @@ def create_or_load_vectorstore(
         logger.info(f"벡터 저장소 로드 완료. 총 {vectorstore._collection.count()}개의 벡터 확인됨.")
     return vectorstore
 
-# 문서 검색기
+# 벡터 색인 생성 또는 기존 색인 로드 (저장소 종류: settings.VECTOR_INDEX_BACKEND)
+def get_vector_index(persist_directory: str, embeddings, backend: str | None = None) -> VectorIndex:
+    backend = backend or settings.VECTOR_INDEX_BACKEND
+    vector_index = open_vector_index(
+        backend, persist_directory, embeddings,
+        compression=settings.NUMPY_INDEX_COMPRESSION,
+        pca_dims=settings.NUMPY_INDEX_PCA_DIMS,
+        rescore_multiplier=settings.NUMPY_INDEX_RESCORE_MULTIPLIER
+    )
+    logger.info(f"벡터 색인 준비 완료 (저장소: {backend}, 경로: '{persist_directory}', 벡터 수: {vector_index.count()})")
+    return vector_index
+
+# 문서 검색기 (VectorIndex 또는 langchain 벡터 저장소)
 def get_retriever(vectorstore, k: int = settings.SEARCH_K):
-    retriever = vectorstore.as_retriever(search_kwargs={"k": k})
+    if isinstance(vectorstore, VectorIndex):
+        retriever = vectorstore.as_retriever(k)
+    else:
+        retriever = vectorstore.as_retriever(search_kwargs={"k": k})
     logger.info(f"Retriever 생성 완료 (검색 결과 수: {k})")
     return retriever
 
@@ -0,0 +1,201 @@
+# reindex_jobs.py
+"""
+벡터DB 재색인(reindex)을 백그라운드 작업으로 실행하고 진행 상황을 추적합니다.
+- ReindexJob : 한 번의 재색인 작업 상태 (단계, 처리한 파일/청크 수, 예상 남은 시간, 취소 요청)
+- ReindexJobManager : 작업을 전용 스레드에서 실행하고, 한 번에 하나의 작업만 실행되도록 관리
+재색인은 RAGPipeline.reindex()가 수행하며, 진행 중에도 질문 처리는 재색인을 시작하기 전의 색인으로 계속됩니다.
+"""
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+# 로거 객체 생성
+logger = logging.getLogger(__name__)
+
+# 재색인 방식
+REINDEX_MODES = ("incremental", "full")
+
+
+# 취소 요청을 받은 작업이 다음 확인 지점에서 발생시키는 예외
+class ReindexCancelled(Exception):
+    pass
+
+
+class ReindexJob:
+    """
+    재색인 작업 하나의 진행 상황. 작업 스레드가 갱신하고, API 스레드가 to_dict()로 조회.
+    status : "pending" | "running" | "completed" | "cancelled" | "failed"
+    """
+
+    def __init__(self, mode: str = "incremental"):
+        self.job_id = uuid.uuid4().hex
+        self.mode = mode
+        self.status = "pending"
+        # 현재 단계 : "scanning" | "splitting" | "embedding"(읽기/분할/임베딩/추가를 파일 단위로 진행) | "saving"
+        self.stage: Optional[str] = None
+        self.error: Optional[str] = None
+        self.files_total = 0 # 데이터 디렉토리의 전체 파일 수
+        self.files_scanned = 0 # 스캔(해시 확인)을 마친 파일 수
+        self.files_to_process = 0 # 다시 읽고 분할해야 하는 파일 수
+        self.files_processed = 0 # 벡터DB 반영(추가/삭제)까지 마친 파일 수
+        self.chunks_split = 0 # 분할된 청크 수
+        self.chunks_to_embed = 0 # 임베딩해서 추가해야 하는 청크 수 (파일이 분할될 때마다 증가)
+        self.chunks_embedded = 0 # 임베딩을 마친 청크 수
+        self.vectors_written = 0 # 벡터DB에 추가/삭제한 벡터 수
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._embedding_started_at: Optional[float] = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    # 진행 상황 갱신 (지정한 항목만 덮어씀)
+    def update(self, stage: Optional[str] = None, **fields: Any):
+        with self._lock:
+            if stage is not None:
+                self.stage = stage
+                if stage == "embedding" and self._embedding_started_at is None:
+                    self._embedding_started_at = time.monotonic()
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+    # 카운터 증가
+    def advance(self, **counters: int):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_event.is_set()
+
+    # 취소 요청이 있으면 ReindexCancelled 발생 (작업의 각 단계 사이에서 호출)
+    def raise_if_cancelled(self):
+        if self._cancel_event.is_set():
+            raise ReindexCancelled(f"재색인 작업 '{self.job_id}'이(가) 취소되었습니다.")
+
+    # 파일 단위 처리 속도로 남은 시간(초) 추정. 추정할 수 없으면 None
+    # 파일을 분할하면서 바로 임베딩하므로 전체 청크 수는 끝까지 알 수 없어, 파일 수를 기준으로 계산
+    def _eta_seconds(self) -> Optional[float]:
+        if self.status != "running" or self._embedding_started_at is None:
+            return None
+        remaining = self.files_to_process - self.files_processed
+        if remaining <= 0:
+            return 0.0
+        if self.files_processed == 0:
+            return None
+        elapsed = time.monotonic() - self._embedding_started_at
+        return round(elapsed / self.files_processed * remaining, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            finished_or_now = self.finished_at or time.time()
+            return {
+                "job_id": self.job_id,
+                "mode": self.mode,
+                "status": self.status,
+                "stage": self.stage,
+                "cancel_requested": self.cancel_requested,
+                "error": self.error,
+                "files_total": self.files_total,
+                "files_scanned": self.files_scanned,
+                "files_to_process": self.files_to_process,
+                "files_processed": self.files_processed,
+                "chunks_split": self.chunks_split,
+                "chunks_to_embed": self.chunks_to_embed,
+                "chunks_embedded": self.chunks_embedded,
+                "vectors_written": self.vectors_written,
+                "eta_seconds": self._eta_seconds(),
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "elapsed_seconds": round(finished_or_now - self.started_at, 1) if self.started_at else None,
+            }
+
+
+class ReindexJobManager:
+    """
+    재색인 작업을 전용 스레드에서 실행.
+    run_reindex(mode, job) : 실제 재색인 함수 (RAGPipeline.reindex)
+    max_history : 조회용으로 보관할 최근 작업 수
+    """
+
+    def __init__(self, run_reindex: Callable[[str, ReindexJob], Any], max_history: int = 20):
+        self._run_reindex = run_reindex
+        self._max_history = max_history
+        self._jobs: "OrderedDict[str, ReindexJob]" = OrderedDict()
+        self._active_job: Optional[ReindexJob] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # 새 재색인 작업 시작. 이미 실행 중인 작업이 있으면 RuntimeError
+    def start(self, mode: str = "incremental") -> ReindexJob:
+        if mode not in REINDEX_MODES:
+            raise ValueError(f"지원하지 않는 재색인 방식입니다: '{mode}' (가능한 값: {', '.join(REINDEX_MODES)})")
+        with self._lock:
+            if self._active_job is not None:
+                raise RuntimeError(f"이미 실행 중인 재색인 작업이 있습니다: '{self._active_job.job_id}'")
+            job = ReindexJob(mode)
+            self._active_job = job
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self._max_history:
+                self._jobs.popitem(last=False)
+            self._thread = threading.Thread(target=self._run, args=(job,), name="reindex-job", daemon=True)
+            self._thread.start()
+        logger.info(f"재색인 작업 시작: '{job.job_id}' (방식: {mode})")
+        return job
+
+    def get(self, job_id: str) -> Optional[ReindexJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    # 최근 작업부터 반환
+    def list_jobs(self) -> List[ReindexJob]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    @property
+    def active_job(self) -> Optional[ReindexJob]:
+        return self._active_job
+
+    # 작업 취소 요청. 작업이 없으면 None, 이미 끝난 작업은 그대로 반환
+    def cancel(self, job_id: str) -> Optional[ReindexJob]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job.status in ("pending", "running"):
+            job.cancel()
+            logger.info(f"재색인 작업 취소 요청: '{job_id}'")
+        return job
+
+    # 애플리케이션 종료 시 실행 중인 작업을 취소하고 끝날 때까지 대기
+    def shutdown(self, timeout: Optional[float] = None):
+        job, thread = self._active_job, self._thread
+        if job is not None:
+            job.cancel()
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self, job: ReindexJob):
+        job.update(status="running", started_at=time.time())
+        try:
+            job.raise_if_cancelled()
+            self._run_reindex(job.mode, job)
+            job.update(status="completed")
+            logger.info(f"재색인 작업 완료: '{job.job_id}'")
+        except ReindexCancelled:
+            job.update(status="cancelled")
+            logger.info(f"재색인 작업 취소됨: '{job.job_id}'")
+        except Exception as e:
+            job.update(status="failed", error=str(e))
+            logger.error(f"재색인 작업 '{job.job_id}' 실패: {e}", exc_info=True)
+        finally:
+            job.update(finished_at=time.time())
+            with self._lock:
+                self._active_job = None
@@ -0,0 +1,133 @@
+# reranker.py
+"""
+검색된 후보 청크를 크로스 인코더로 다시 정렬(rerank)하는 단계입니다.
+
+임베딩 검색은 질문과 청크를 따로 벡터화해 비교하지만, 크로스 인코더는 (질문, 청크) 쌍을 함께 읽고 관련도를 매기므로
+순위가 더 정확합니다. 대신 후보 수만큼 모델을 실행해야 하므로 다음과 같이 비용을 제한합니다.
+- 점수 캐시 : (질문 해시, 청크 ID)별 점수를 LRU로 보관. 데이터가 다시 반영되어 검색 결과 캐시가 비워져도
+  바뀌지 않은 청크의 점수는 그대로 재사용되며, 캐시에 없는 쌍만 모델로 계산
+- 배치 추론 : 캐시에 없는 쌍을 batch_size개씩 묶어 CPU에서 한 번에 계산
+- 지연 시간 한도 : 배치를 실행하기 전에, 지금까지 측정한 쌍당 계산 시간으로 예상한 누적 시간이 latency_budget_seconds를
+  넘으면 중단하고 원래 검색 순서의 상위 결과를 반환 (그때까지 계산한 점수는 캐시에 남아 다음 요청에서 재사용됨)
+  예상치로 판단하는 느슨한(soft) 한도이므로, 실제 배치가 예상보다 오래 걸리면 한도를 넘을 수 있고
+  아직 측정값이 없는 첫 배치는 항상 실행됨
+"""
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from query_cache import LRUCache, normalize_question
+
+# 로거
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# 점수 캐시 키의 청크 부분 (청크 ID가 없는 이전 형식의 청크는 내용 해시)
+def _chunk_key(doc: Document) -> Hashable:
+    chunk_id = doc.metadata.get("chunk_id")
+    if chunk_id:
+        return chunk_id
+    return hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+
+
+class CrossEncoderReranker:
+    """
+    model : (질문, 청크) 쌍 리스트를 받아 점수 리스트를 반환하는 predict(pairs, batch_size=..., show_progress_bar=...)를 가진 객체
+            (sentence_transformers.CrossEncoder, rag_utils.get_cross_encoder 참고)
+    """
+
+    def __init__(self, model: Any, batch_size: int = 16, cache_max_entries: int = 10000,
+                 latency_budget_seconds: float = 1.0):
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.latency_budget_seconds = latency_budget_seconds
+        # (질문 해시, 청크 키) -> 점수
+        self._scores: LRUCache[float] = LRUCache(cache_max_entries)
+        self._stats_lock = threading.Lock()
+        self.reranked = 0 # 재정렬을 마친 요청 수
+        self.fallbacks = 0 # 지연 시간 한도 초과/오류로 원래 순서를 반환한 요청 수
+        self.pairs_scored = 0 # 모델로 계산한 쌍의 수
+        # 쌍 하나의 계산 시간(초) 이동 평균. 배치를 실행하기 전에 지연 시간 한도를 넘는지 예상하는 데 사용
+        self._seconds_per_pair: Optional[float] = None
+
+    # 후보를 관련도 순으로 정렬해 상위 top_n개 반환
+    # 지연 시간 한도를 넘기거나 모델 오류가 발생하면 원래 순서의 상위 top_n개 반환
+    def rerank(self, question: str, candidates: Sequence[Document], top_n: int) -> List[Document]:
+        candidates = list(candidates)
+        if len(candidates) <= 1:
+            return candidates[:top_n]
+
+        question_hash = hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+        keys = [(question_hash, _chunk_key(doc)) for doc in candidates]
+        scores: List[Optional[float]] = [self._scores.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+
+        if missing and not self._score_missing(question, candidates, keys, scores, missing):
+            with self._stats_lock:
+                self.fallbacks += 1
+            return candidates[:top_n]
+
+        with self._stats_lock:
+            self.reranked += 1
+        # 점수가 같으면 원래 검색 순서 유지 (sorted는 안정 정렬)
+        order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+        reranked = [candidates[i] for i in order[:top_n]]
+        # 문맥 조립의 관련도 컷오프는 벡터 검색 점수 대신 크로스 인코더 점수를 사용
+        for i, doc in zip(order, reranked):
+            doc.metadata["relevance_score"] = round(scores[i], 4)
+        return reranked
+
+    # 캐시에 없는 쌍을 배치로 계산해 scores에 채움. 끝까지 계산했으면 True
+    # 배치마다 실행 전에 (경과 시간 + 쌍당 계산 시간 이동 평균 x 배치 크기)가 한도를 넘는지 확인하므로
+    # 측정값이 쌓인 뒤에는 첫 배치도 한도를 넘을 것으로 보이면 실행하지 않음 (한도는 예상치 기준의 느슨한 한도)
+    def _score_missing(self, question: str, candidates: List[Document], keys: List[Tuple[str, Hashable]],
+                       scores: List[Optional[float]], missing: List[int]) -> bool:
+        started = time.perf_counter()
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            batch_started = time.perf_counter()
+            with self._stats_lock:
+                seconds_per_pair = self._seconds_per_pair
+            if seconds_per_pair is not None:
+                expected = (batch_started - started) + seconds_per_pair * len(batch)
+                if expected > self.latency_budget_seconds:
+                    logger.warning(f"재순위화 지연 시간 한도({self.latency_budget_seconds}초) 초과 예상 "
+                                   f"({expected:.3f}초), 원래 검색 순서를 사용합니다.")
+                    return False
+            try:
+                batch_scores = self.model.predict(
+                    [(question, candidates[i].page_content) for i in batch],
+                    batch_size=len(batch),
+                    show_progress_bar=False
+                )
+            except Exception as e:
+                logger.error(f"재순위화 점수 계산 중 오류 발생, 원래 검색 순서를 사용합니다: {e}", exc_info=True)
+                return False
+            for i, score in zip(batch, batch_scores):
+                scores[i] = float(score)
+                self._scores.put(keys[i], scores[i])
+            batch_seconds_per_pair = (time.perf_counter() - batch_started) / len(batch)
+            with self._stats_lock:
+                self.pairs_scored += len(batch)
+                if self._seconds_per_pair is None:
+                    self._seconds_per_pair = batch_seconds_per_pair
+                else:
+                    self._seconds_per_pair = 0.8 * self._seconds_per_pair + 0.2 * batch_seconds_per_pair
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            requests = self.reranked + self.fallbacks
+            return {
+                "reranked": self.reranked,
+                "fallbacks": self.fallbacks,
+                "fallback_rate": self.fallbacks / requests if requests else 0.0,
+                "pairs_scored": self.pairs_scored,
+                "seconds_per_pair": self._seconds_per_pair,
+                "score_cache": self._scores.stats(),
+            }
@@ -0,0 +1,64 @@
+# test_answer_cache.py
+import unittest
+from unittest import mock
+
+from langchain_core.documents import Document
+
+from answer_cache import SemanticAnswerCache, make_context_key
+
+
+class TestSemanticAnswerCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = SemanticAnswerCache(similarity_threshold=0.9, max_entries=2, ttl_seconds=60)
+        self.context_key = make_context_key([Document(page_content="a", metadata={"relative_path": "x.txt"})])
+
+    def test_hit_on_similar_question_same_context(self):
+        """유사한 질문 + 같은 문맥이면 답변을 재사용하고 통계에 반영되는지 테스트"""
+        self.cache.store("질문", [1.0, 0.0], self.context_key, "답변", generation_seconds=2.0)
+
+        self.assertEqual(self.cache.lookup([0.99, 0.05], self.context_key), "답변")
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["saved_seconds"], 2.0)
+
+    def test_miss_on_different_context_or_dissimilar_question(self):
+        """문맥이 다르거나 유사도가 임계값 미만이면 재사용하지 않는지 테스트"""
+        self.cache.store("질문", [1.0, 0.0], self.context_key, "답변", generation_seconds=1.0)
+
+        self.assertIsNone(self.cache.lookup([1.0, 0.0], "other-context"))
+        self.assertIsNone(self.cache.lookup([0.0, 1.0], self.context_key))
+        self.assertEqual(self.cache.stats()["misses"], 2)
+
+    def test_context_key_ignores_order(self):
+        """검색 순서가 달라도 같은 청크 구성이면 같은 문맥 키인지 테스트"""
+        docs = [Document(page_content="a", metadata={"relative_path": "x.txt"}),
+                Document(page_content="b", metadata={"relative_path": "y.txt"})]
+        self.assertEqual(make_context_key(docs), make_context_key(list(reversed(docs))))
+
+    def test_different_chat_history_does_not_share_answer(self):
+        """같은 질문, 같은 검색 결과라도 대화 기록이 다르면 다른 사용자의 답변을 재사용하지 않는지 테스트"""
+        docs = [Document(page_content="신청 방법 안내", metadata={"relative_path": "apply.txt"})]
+        history_a = "사용자: 청년 월세 지원 알려줘\nAI: 청년 월세 지원은 ..."
+        history_b = "사용자: 청년도약계좌 알려줘\nAI: 청년도약계좌는 ..."
+        key_a = make_context_key(docs, history_a)
+        self.cache.store("그거 신청 방법은?", [1.0, 0.0], key_a, "월세 지원 신청 방법", generation_seconds=1.0)
+
+        self.assertIsNone(self.cache.lookup([1.0, 0.0], make_context_key(docs, history_b)))
+        self.assertIsNone(self.cache.lookup([1.0, 0.0], make_context_key(docs)))
+        self.assertEqual(self.cache.lookup([1.0, 0.0], make_context_key(docs, history_a)), "월세 지원 신청 방법")
+
+    def test_ttl_size_limit_and_clear(self):
+        """TTL 만료, 최대 개수 초과 시 LRU 제거, clear 동작 테스트"""
+        with mock.patch("answer_cache.time.monotonic", return_value=0):
+            self.cache.store("q1", [1.0, 0.0], "k1", "a1", 1.0)
+            self.cache.store("q2", [1.0, 0.0], "k2", "a2", 1.0)
+            self.cache.store("q3", [1.0, 0.0], "k3", "a3", 1.0)
+            self.assertIsNone(self.cache.lookup([1.0, 0.0], "k1"))
+            self.assertEqual(self.cache.lookup([1.0, 0.0], "k2"), "a2")
+
+        with mock.patch("answer_cache.time.monotonic", return_value=61):
+            self.assertIsNone(self.cache.lookup([1.0, 0.0], "k2"))
+
+        self.cache.clear()
+        self.assertEqual(self.cache.stats()["entries"], 0)
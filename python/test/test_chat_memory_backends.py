@@ -0,0 +1,223 @@
+# test_chat_memory_backends.py
+import unittest
+import json
+import shutil
+import sqlite3
+from pathlib import Path
+from unittest import mock
+
+from langchain_core.messages import HumanMessage, AIMessage, message_to_dict
+
+from chat_memory import (
+    SQLiteChatMessageHistory,
+    CustomChatMessageHistory,
+    UserChatMemory,
+    ChatMemoryManager,
+    migrate_json_history_to_sqlite,
+    select_history_window,
+)
+
+TEST_BASE_DIR = Path(__file__).resolve().parent
+TEST_HISTORY_DIR = TEST_BASE_DIR / "temp_test_history"
+TEST_DB_FILE = TEST_HISTORY_DIR / "chat_history.db"
+TEST_JSON_FILE = TEST_HISTORY_DIR / "chat_history.json"
+
+
+class TestChatMemoryBackends(unittest.TestCase):
+
+    def setUp(self):
+        TEST_HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(TEST_HISTORY_DIR)
+
+    def test_sqlite_add_messages_and_read_back(self):
+        """SQLite 저장소에 질문/답변을 한 번에 추가하고 순서대로 읽어오는지 테스트"""
+        history = SQLiteChatMessageHistory("user1", db_path=str(TEST_DB_FILE))
+        history.add_messages([HumanMessage(content="질문1"), AIMessage(content="답변1")])
+        history.add_message(HumanMessage(content="질문2"))
+
+        messages = SQLiteChatMessageHistory("user1", db_path=str(TEST_DB_FILE)).messages
+        self.assertEqual([m.content for m in messages], ["질문1", "답변1", "질문2"])
+        self.assertIsInstance(messages[0], HumanMessage)
+        self.assertIsInstance(messages[1], AIMessage)
+
+    def test_sqlite_members_are_isolated_and_clear(self):
+        """사용자별 기록 분리 및 clear 동작 테스트"""
+        history_a = SQLiteChatMessageHistory("a", db_path=str(TEST_DB_FILE))
+        history_b = SQLiteChatMessageHistory("b", db_path=str(TEST_DB_FILE))
+        history_a.add_messages([HumanMessage(content="a-q")])
+        history_b.add_messages([HumanMessage(content="b-q")])
+
+        history_a.clear()
+
+        self.assertEqual(history_a.messages, [])
+        self.assertEqual([m.content for m in history_b.messages], ["b-q"])
+
+    def test_json_add_messages_single_write(self):
+        """JSON 저장소의 add_messages가 한 번에 두 메시지를 저장하는지 테스트"""
+        history = CustomChatMessageHistory("user1", file_path=str(TEST_JSON_FILE))
+        history.add_messages([HumanMessage(content="q"), AIMessage(content="a")])
+
+        with open(TEST_JSON_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.assertEqual(len(data["user1"]), 2)
+
+    def test_migrate_json_history_to_sqlite(self):
+        """기존 chat_history.json의 기록이 SQLite로 옮겨지고 JSON 파일이 보관되는지 테스트"""
+        legacy = {
+            "user1": [message_to_dict(HumanMessage(content="q1")), message_to_dict(AIMessage(content="a1"))],
+            "user2": [message_to_dict(HumanMessage(content="q2"))],
+        }
+        with open(TEST_JSON_FILE, "w", encoding="utf-8") as f:
+            json.dump(legacy, f, ensure_ascii=False)
+
+        migrated = migrate_json_history_to_sqlite(str(TEST_JSON_FILE), str(TEST_DB_FILE))
+
+        self.assertEqual(migrated, 3)
+        self.assertFalse(TEST_JSON_FILE.exists())
+        self.assertTrue(Path(f"{TEST_JSON_FILE}.migrated").exists())
+        memory = UserChatMemory("user1", history_file_path=str(TEST_DB_FILE), backend="sqlite")
+        self.assertEqual([m.content for m in memory.get_chat_messages()], ["q1", "a1"])
+        # 두 번째 실행에서는 옮길 파일이 없음
+        self.assertEqual(migrate_json_history_to_sqlite(str(TEST_JSON_FILE), str(TEST_DB_FILE)), 0)
+
+    def test_migration_is_not_repeated_after_crash_before_rename(self):
+        """기록을 커밋한 뒤 JSON 파일 이름을 바꾸기 전에 종료되어도, 다시 실행할 때 기록이 중복되지 않는지 테스트"""
+        legacy = {"user1": [message_to_dict(HumanMessage(content="q1")), message_to_dict(AIMessage(content="a1"))]}
+        with open(TEST_JSON_FILE, "w", encoding="utf-8") as f:
+            json.dump(legacy, f, ensure_ascii=False)
+
+        with mock.patch("chat_memory.os.replace", side_effect=SystemExit("프로세스 종료")):
+            with self.assertRaises(SystemExit):
+                migrate_json_history_to_sqlite(str(TEST_JSON_FILE), str(TEST_DB_FILE))
+        self.assertTrue(TEST_JSON_FILE.exists())
+
+        self.assertEqual(migrate_json_history_to_sqlite(str(TEST_JSON_FILE), str(TEST_DB_FILE)), 0)
+        self.assertFalse(TEST_JSON_FILE.exists())
+        self.assertTrue(Path(f"{TEST_JSON_FILE}.migrated").exists())
+        messages = SQLiteChatMessageHistory("user1", db_path=str(TEST_DB_FILE)).messages
+        self.assertEqual([m.content for m in messages], ["q1", "a1"])
+
+    def test_summary_round_trip_and_clear(self):
+        """SQLite/JSON 저장소의 요약 저장/조회 및 clear 시 요약 삭제 테스트"""
+        for history in (SQLiteChatMessageHistory("user1", db_path=str(TEST_DB_FILE)),
+                        CustomChatMessageHistory("user1", file_path=str(TEST_JSON_FILE))):
+            self.assertEqual(history.load_summary(), ("", 0))
+            history.save_summary("요약", 4)
+            self.assertEqual(history.load_summary(), ("요약", 4))
+            history.clear()
+            self.assertEqual(history.load_summary(), ("", 0))
+
+    def test_select_history_window(self):
+        """토큰 예산 안의 최근 메시지만 선택하고 요약된 메시지는 제외하는지 테스트"""
+        messages = [HumanMessage(content="가" * 10) for _ in range(6)]
+        self.assertEqual(select_history_window(messages, 0, 25), 4)
+        self.assertEqual(select_history_window(messages, 5, 25), 5)
+        # 가장 최근 메시지는 예산을 넘어도 포함
+        self.assertEqual(select_history_window(messages, 0, 1), 5)
+
+    def test_user_chat_memory_add_exchange(self):
+        """UserChatMemory.add_exchange가 질문/답변 한 쌍을 저장하는지 테스트"""
+        memory = UserChatMemory("user1", history_file_path=str(TEST_DB_FILE), backend="sqlite")
+        memory.add_exchange("질문", "답변")
+
+        self.assertEqual(memory.get_history_for_api(), [
+            {"role": "human", "content": "질문"},
+            {"role": "ai", "content": "답변"},
+        ])
+
+
+class TestChatMemoryManager(unittest.TestCase):
+
+    def setUp(self):
+        TEST_HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+        self.manager = ChatMemoryManager(max_members=2, flush_interval_seconds=60,
+                                         backend="sqlite", file_path=str(TEST_DB_FILE))
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(TEST_HISTORY_DIR)
+
+    def _stored_contents(self, member_id):
+        return [m.content for m in SQLiteChatMessageHistory(member_id, db_path=str(TEST_DB_FILE)).messages]
+
+    def test_add_exchange_is_write_behind(self):
+        """add_exchange는 메모리에만 반영되고 flush 시점에 저장소에 기록되는지 테스트"""
+        self.manager.add_exchange("user1", "q", "a")
+
+        self.assertEqual([m.content for m in self.manager.get_cached_messages("user1")], ["q", "a"])
+        self.assertEqual(self._stored_contents("user1"), [])
+
+        self.manager.flush()
+        self.assertEqual(self._stored_contents("user1"), ["q", "a"])
+
+    def test_failed_flush_keeps_messages_pending(self):
+        """저장소 기록이 실패하면 메시지가 대기열에 남고 다음 flush에서 기록되는지 테스트"""
+        self.manager.add_exchange("user1", "q1", "a1")
+
+        with mock.patch("chat_memory.sqlite3.connect", side_effect=sqlite3.OperationalError("database is locked")):
+            self.manager.flush()
+
+        self.assertEqual([m.content for m in self.manager._pending["user1"]], ["q1", "a1"])
+        self.assertEqual(self._stored_contents("user1"), [])
+
+        self.manager.add_exchange("user1", "q2", "a2")
+        self.manager.flush()
+        self.assertEqual(self.manager._pending, {})
+        self.assertEqual(self._stored_contents("user1"), ["q1", "a1", "q2", "a2"])
+
+    def test_json_backend_failed_flush_keeps_messages_pending(self):
+        """JSON 저장소의 파일 쓰기가 실패해도 메시지가 대기열에 남는지 테스트"""
+        manager = ChatMemoryManager(max_members=2, flush_interval_seconds=60,
+                                    backend="json", file_path=str(TEST_JSON_FILE))
+        manager.add_exchange("user1", "q", "a")
+
+        with mock.patch("chat_memory.json.dump", side_effect=IOError("No space left on device")):
+            manager.flush()
+        self.assertEqual([m.content for m in manager._pending["user1"]], ["q", "a"])
+
+        manager.flush()
+        self.assertEqual(manager._pending, {})
+        self.assertEqual([m.content for m in CustomChatMessageHistory("user1", file_path=str(TEST_JSON_FILE)).messages],
+                         ["q", "a"])
+
+    def test_lru_eviction_keeps_unflushed_members(self):
+        """최대 사용자 수 초과 시 저장된 사용자만 캐시에서 제거되는지 테스트"""
+        self.manager.get_messages("clean")
+        self.manager.add_exchange("dirty1", "q", "a")
+        self.manager.add_exchange("dirty2", "q", "a")
+
+        self.assertIsNone(self.manager.get_cached_messages("clean"))
+        self.assertIsNotNone(self.manager.get_cached_messages("dirty1"))
+        self.assertIsNotNone(self.manager.get_cached_messages("dirty2"))
+
+    def test_clear_drops_pending_and_stored_messages(self):
+        """clear가 저장 대기 중인 메시지와 저장소 기록을 모두 삭제하는지 테스트"""
+        self.manager.add_exchange("user1", "q1", "a1")
+        self.manager.flush()
+        self.manager.add_exchange("user1", "q2", "a2")
+
+        self.manager.clear("user1")
+        self.manager.flush()
+
+        self.assertEqual(self.manager.get_messages("user1"), [])
+        self.assertEqual(self._stored_contents("user1"), [])
+
+    def test_prompt_history_uses_summary_for_old_messages(self):
+        """예산을 넘은 메시지는 요약 대상으로, 요약 후에는 최근 메시지만 프롬프트에 포함되는지 테스트"""
+        for i in range(3):
+            self.manager.add_exchange("user1", "질" * 10 + str(i), "답" * 10 + str(i))
+
+        work = self.manager.get_messages_to_summarize("user1", token_budget=25)
+        self.assertIsNotNone(work)
+        previous_summary, to_summarize, covered_count = work
+        self.assertEqual(previous_summary, "")
+        self.assertEqual(covered_count, 4)
+        self.assertEqual(len(to_summarize), 4)
+
+        self.manager.set_summary("user1", "요약", covered_count)
+        summary, recent = self.manager.get_prompt_history("user1", token_budget=25)
+        self.assertEqual(summary, "요약")
+        self.assertEqual([m.content for m in recent], ["질" * 10 + "2", "답" * 10 + "2"])
+        self.assertIsNone(self.manager.get_messages_to_summarize("user1", token_budget=25))
@@ -0,0 +1,57 @@
+# test_context_packer.py
+import unittest
+
+from langchain_core.documents import Document
+
+from context_packer import merge_adjacent_chunks, pack_context
+from token_utils import estimate_tokens
+
+
+def _doc(content: str, relative_path: str = "policy.txt", score=None) -> Document:
+    metadata = {"relative_path": relative_path}
+    if score is not None:
+        metadata["relevance_score"] = score
+    return Document(page_content=content, metadata=metadata)
+
+
+# 같은 파일에서 문장 하나씩 겹치도록 분할된 청크 (KonlpyTextSplitter와 같은 "\n\n" 구분)
+SENTENCES = [f"{i}번째 문장은 청년 지원 내용을 설명합니다." for i in range(6)]
+CHUNK_A = "\n\n".join(SENTENCES[0:3])
+CHUNK_B = "\n\n".join(SENTENCES[2:5])
+CHUNK_C = "\n\n".join(SENTENCES[4:6])
+
+
+class TestContextPacker(unittest.TestCase):
+
+    def test_merge_adjacent_chunks_strips_overlap(self):
+        """관련도 순서와 관계없이 겹치는 청크를 원문 순서로 합치고 겹침은 한 번만 남기는지 테스트"""
+        self.assertEqual(merge_adjacent_chunks([CHUNK_C, CHUNK_A, CHUNK_B]), ["\n\n".join(SENTENCES)])
+        # 겹치지 않는 청크는 그대로, 포함된 청크는 제외
+        self.assertEqual(merge_adjacent_chunks([CHUNK_A, CHUNK_C, SENTENCES[1]]), [CHUNK_A, CHUNK_C])
+
+    def test_pack_context_groups_by_file(self):
+        """파일별로 병합하고, 다른 파일의 같은 문장은 합치지 않는지 테스트"""
+        context = pack_context([_doc(CHUNK_A), _doc(CHUNK_B, "other.txt"), _doc(CHUNK_B)])
+
+        self.assertEqual(context, "\n\n".join(SENTENCES[0:5]) + "\n\n" + CHUNK_B)
+
+    def test_relevance_cutoff(self):
+        """점수가 기준 미만인 청크는 제외하되, 첫 청크와 점수가 없는 청크는 유지하는지 테스트"""
+        docs = [_doc(CHUNK_A, score=0.1), _doc(CHUNK_C, "b.txt", score=0.2), _doc("점수 없음", "c.txt")]
+
+        self.assertEqual(pack_context(docs, min_relevance_score=0.3), CHUNK_A + "\n\n점수 없음")
+
+    def test_token_budget(self):
+        """예산을 넘는 구간은 건너뛰고, 첫 구간이 예산보다 크면 잘라서 사용하는지 테스트"""
+        short = _doc("짧은 문장", "short.txt")
+        context = pack_context([_doc(CHUNK_A), _doc(CHUNK_C, "b.txt"), short],
+                               token_budget=estimate_tokens(CHUNK_A) + 5)
+        self.assertEqual(context, CHUNK_A + "\n\n짧은 문장")
+
+        truncated = pack_context([_doc(CHUNK_A)], token_budget=10)
+        self.assertLessEqual(estimate_tokens(truncated), 10)
+        self.assertTrue(CHUNK_A.startswith(truncated))
+
+
+if __name__ == "__main__":
+    unittest.main()
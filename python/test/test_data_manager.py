@@ -9,9 +9,14 @@ from data_manager import ( # data_manager.py가 같은 디렉토리에 있거나
     load_metadata,
     save_metadata,
     scan_data_directory,
+    scan_data_directory_with_stats,
     get_changed_files,
     update_metadata_after_processing,
     remove_metadata_for_deleted_files,
+    build_chunk_records,
+    diff_chunk_records,
+    get_chunk_ids,
+    get_files_split_with_other_engine,
     METADATA_FILE_PATH as ACTUAL_METADATA_FILE_PATH # 실제 메타데이터 파일 경로 백업
 )
 
@@ -175,6 +180,113 @@ class TestDataManagerSimplified(unittest.TestCase):
         })
         self.assertNotIn("file_to_delete.txt", reloaded_meta)
 
+    def test_chunk_ids_are_stable_when_chunks_shift(self):
+        """앞쪽에 청크가 추가되어 순서가 밀려도 기존 청크의 ID가 유지되는지 테스트"""
+        print("\n--- test_chunk_ids_are_stable_when_chunks_shift ---")
+        old_records = build_chunk_records("policy.txt", ["A", "B", "C"])
+        new_records = build_chunk_records("policy.txt", ["NEW", "A", "B", "C"])
+
+        self.assertEqual([r["id"] for r in new_records[1:]], [r["id"] for r in old_records])
+        # 같은 내용이라도 파일이 다르면 다른 ID
+        self.assertNotEqual(build_chunk_records("other.txt", ["A"])[0]["id"], old_records[0]["id"])
+        # 같은 파일 안에서 내용이 같은 청크는 순번으로 구분
+        duplicated = build_chunk_records("policy.txt", ["A", "A"])
+        self.assertNotEqual(duplicated[0]["id"], duplicated[1]["id"])
+
+    def test_chunk_ids_are_deterministic(self):
+        """같은 파일/내용이면 실행할 때마다 같은 청크 ID가 만들어지는지 테스트 (재실행 시 upsert로 중복 없음)"""
+        print("\n--- test_chunk_ids_are_deterministic ---")
+        first_run = build_chunk_records("sub/policy.txt", ["A", "B", "A"])
+        second_run = build_chunk_records("sub/policy.txt", ["A", "B", "A"])
+
+        self.assertEqual(first_run, second_run)
+        self.assertEqual(len({record["id"] for record in first_run}), 3)
+
+    def test_diff_chunk_records_only_changed_chunks(self):
+        """수정된 파일에서 바뀐 청크만 삭제/추가 대상으로 나오는지 테스트"""
+        print("\n--- test_diff_chunk_records_only_changed_chunks ---")
+        old_records = build_chunk_records("policy.txt", ["A", "B", "C"])
+        new_records = build_chunk_records("policy.txt", ["A", "B2", "C", "D"])
+
+        ids_to_delete, indices_to_add = diff_chunk_records(old_records, new_records)
+
+        self.assertEqual(ids_to_delete, [old_records[1]["id"]])
+        self.assertEqual(indices_to_add, [1, 3])
+
+    def test_metadata_records_chunks(self):
+        """메타데이터에 파일별 청크 목록이 저장되고, 이전 형식은 None을 반환하는지 테스트"""
+        print("\n--- test_metadata_records_chunks ---")
+        self._create_file("policy.txt", "content")
+        current_hashes = scan_data_directory(TEST_DATA_DIR)
+        records = build_chunk_records("policy.txt", ["content"])
+
+        save_metadata(update_metadata_after_processing(
+            ["policy.txt"], current_hashes, {}, {"policy.txt": records}
+        ))
+
+        reloaded_meta = load_metadata()
+        self.assertEqual(get_chunk_ids(reloaded_meta["policy.txt"]), [records[0]["id"]])
+        self.assertEqual(reloaded_meta["policy.txt"]["chunk_count"], 1)
+        self.assertIsNone(get_chunk_ids({"hash": "legacy"}))
+
+    def test_files_split_with_other_engine(self):
+        """분할기 종류를 기록하고, 내용이 같은데 다른(또는 기록되지 않은) 분할기로 나뉜 파일만 반환하는지 테스트"""
+        print("\n--- test_files_split_with_other_engine ---")
+        current_hashes = {"rule.txt": "h1", "konlpy.txt": "h2", "unknown.txt": "h3", "modified.txt": "new"}
+        metadata = update_metadata_after_processing(["rule.txt"], current_hashes, {}, None, None, "rule")
+        metadata = update_metadata_after_processing(["konlpy.txt"], current_hashes, metadata, None, None, "konlpy")
+        metadata["unknown.txt"] = {"hash": "h3"}
+        metadata["modified.txt"] = {"hash": "old", "splitter": "konlpy"}
+
+        self.assertEqual(metadata["rule.txt"]["splitter"], "rule")
+        self.assertEqual(get_files_split_with_other_engine(current_hashes, metadata, "rule"),
+                         ["konlpy.txt", "unknown.txt"])
+
+    def test_save_metadata_is_atomic(self):
+        """저장에 실패해도 기존 메타데이터 파일이 유지되고 임시 파일이 남지 않는지 테스트"""
+        print("\n--- test_save_metadata_is_atomic ---")
+        save_metadata({"a.txt": {"hash": "h1"}})
+        # JSON으로 직렬화할 수 없는 값을 넣어 저장 도중 실패시킴
+        save_metadata({"a.txt": {"hash": "h2"}, "b.txt": {"hash": object()}})
+
+        self.assertEqual(load_metadata(), {"a.txt": {"hash": "h1"}})
+        self.assertEqual(
+            [path.name for path in TEST_METADATA_FILE.parent.iterdir() if path.name.endswith(".tmp")], []
+        )
+
+    def test_scan_includes_subdirectories(self):
+        """하위 디렉토리의 파일까지 모두 스캔하는지 테스트"""
+        print("\n--- test_scan_includes_subdirectories ---")
+        self._create_file("a.txt", "A")
+        self._create_file(os.path.join("sub", "b.txt"), "B")
+        self._create_file(os.path.join("sub", "deep", "c.txt"), "C")
+        self._create_file("ignored.md", "not allowed")
+        current_hashes = scan_data_directory(TEST_DATA_DIR, max_workers=2)
+
+        self.assertEqual(
+            set(current_hashes),
+            {"a.txt", os.path.join("sub", "b.txt"), os.path.join("sub", "deep", "c.txt")}
+        )
+
+    def test_scan_reuses_hash_when_stat_unchanged(self):
+        """크기/수정 시각이 같으면 이전 해시를 재사용하고, 바뀌면 다시 계산하는지 테스트"""
+        print("\n--- test_scan_reuses_hash_when_stat_unchanged ---")
+        file_path = self._create_file("stat.txt", "original")
+        current_stats = scan_data_directory_with_stats(TEST_DATA_DIR)
+        metadata = update_metadata_after_processing(
+            ["stat.txt"], {"stat.txt": current_stats["stat.txt"]["hash"]}, {}, None, current_stats
+        )
+        self.assertEqual(metadata["stat.txt"]["mtime_ns"], os.stat(file_path).st_mtime_ns)
+
+        # 크기/수정 시각이 그대로이면 기록된 해시를 그대로 사용 (파일을 읽지 않음)
+        metadata["stat.txt"]["hash"] = "recorded-hash"
+        self.assertEqual(scan_data_directory(TEST_DATA_DIR, metadata)["stat.txt"], "recorded-hash")
+
+        # 수정 시각이 바뀌면 해시를 다시 계산
+        stat_result = os.stat(file_path)
+        os.utime(file_path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000_000))
+        self.assertEqual(scan_data_directory(TEST_DATA_DIR, metadata)["stat.txt"], calculate_file_hash(file_path))
+
 # ... (if __name__ == "__main__": 부분은 기존과 유사하게 사용하되, TestDataManagerSimplified 클래스를 사용) ...
 # 예: unittest.main(verbosity=2, defaultTest='TestDataManagerSimplified')
 # 또는 그냥 unittest.main() 호출 시 해당 파일 내 모든 Test* 클래스 실행
\ No newline at end of file
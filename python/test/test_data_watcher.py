@@ -0,0 +1,62 @@
+# test_data_watcher.py
+import unittest
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from data_watcher import DataDirectoryWatcher
+
+TEST_BASE_DIR = Path(__file__).resolve().parent
+TEST_DATA_DIR = TEST_BASE_DIR / "temp_test_watch_data"
+
+
+class TestDataDirectoryWatcher(unittest.TestCase):
+
+    def setUp(self):
+        TEST_DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self.call_count = 0
+        self.called = threading.Event()
+
+    def tearDown(self):
+        shutil.rmtree(TEST_DATA_DIR, ignore_errors=True)
+
+    def _on_change(self):
+        self.call_count += 1
+        self.called.set()
+
+    def _start_watcher(self) -> DataDirectoryWatcher:
+        watcher = DataDirectoryWatcher(
+            TEST_DATA_DIR, self._on_change,
+            debounce_seconds=0.3, poll_interval_seconds=0.05, backend="polling"
+        )
+        watcher.start()
+        self.addCleanup(watcher.stop, 5)
+        return watcher
+
+    def test_polling_debounces_burst_of_changes(self):
+        """연속된 여러 변경이 한 번의 on_change 호출로 묶이는지 테스트"""
+        print("\n--- test_polling_debounces_burst_of_changes ---")
+        self._start_watcher()
+        for i in range(3):
+            (TEST_DATA_DIR / f"policy_{i}.txt").write_text(f"정책 {i}", encoding="utf-8")
+            time.sleep(0.06)
+
+        self.assertTrue(self.called.wait(5))
+        time.sleep(0.5)
+        self.assertEqual(self.call_count, 1)
+
+    def test_polling_ignores_other_extensions(self):
+        """허용되지 않은 확장자 파일의 변경은 무시하는지 테스트"""
+        print("\n--- test_polling_ignores_other_extensions ---")
+        self._start_watcher()
+        (TEST_DATA_DIR / "notes.md").write_text("무시", encoding="utf-8")
+
+        self.assertFalse(self.called.wait(0.6))
+        (TEST_DATA_DIR / "sub").mkdir()
+        (TEST_DATA_DIR / "sub" / "policy.txt").write_text("정책", encoding="utf-8")
+        self.assertTrue(self.called.wait(5))
+
+
+if __name__ == "__main__":
+    unittest.main()
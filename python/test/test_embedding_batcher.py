@@ -0,0 +1,105 @@
+# test_embedding_batcher.py
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+from embedding_batcher import MicroBatchingEmbeddings
+
+
+# 호출된 배치를 기록하고, gate가 열릴 때까지 계산을 멈출 수 있는 가짜 임베딩 모델
+class RecordingEmbeddings(Embeddings):
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.query_calls = 0
+        self.gate = threading.Event()
+        self.gate.set()
+        self.entered = threading.Event() # 계산을 시작하면 설정
+        self.fail = fail
+
+    def embed_documents(self, texts):
+        self.entered.set()
+        self.gate.wait()
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("모델 오류")
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        self.query_calls += 1
+        return [float(len(text)), 1.0]
+
+
+class TestMicroBatchingEmbeddings(unittest.TestCase):
+
+    def _wait_for_queue(self, batcher: MicroBatchingEmbeddings, size: int):
+        deadline = time.time() + 5
+        while batcher._queue.qsize() < size and time.time() < deadline:
+            time.sleep(0.001)
+        self.assertEqual(batcher._queue.qsize(), size)
+
+    def test_concurrent_queries_are_batched(self):
+        """계산 중에 들어온 질문들을 최대 배치 크기까지 모아 한 번에 계산하고, 각 요청에 자기 결과를 돌려주는지 테스트"""
+        base = RecordingEmbeddings()
+        batcher = MicroBatchingEmbeddings(base, max_batch_size=4, max_wait_seconds=0.0)
+        batcher.start()
+        texts = ["가", "나나", "다다다", "라라라라", "마마마마마", "바바바바바바", "사사사사사사사"]
+        with ThreadPoolExecutor(max_workers=len(texts)) as executor:
+            # 첫 질문의 계산을 멈춘 동안 나머지 질문이 대기열에 쌓이도록 함
+            base.gate.clear()
+            futures = [executor.submit(batcher.embed_query, texts[0])]
+            self.assertTrue(base.entered.wait(5))
+            futures += [executor.submit(batcher.embed_query, text) for text in texts[1:]]
+            self._wait_for_queue(batcher, len(texts) - 1)
+            base.gate.set()
+            results = [future.result(timeout=5) for future in futures]
+        batcher.close()
+
+        self.assertEqual(results, [[float(len(text)), 1.0] for text in texts])
+        self.assertEqual([len(batch) for batch in base.batches], [1, 4, 2])
+        stats = batcher.stats()
+        self.assertEqual((stats["requests"], stats["batches"]), (7, 3))
+        self.assertEqual(stats["batch_sizes"], {1: 1, 2: 1, 4: 1})
+        self.assertGreater(stats["queue_delay_ms"]["max"], 0.0)
+
+    def test_wait_window_and_duplicates(self):
+        """대기 시간 안에 도착한 질문을 모으고, 같은 질문은 한 번만 계산하는지 테스트"""
+        base = RecordingEmbeddings()
+        batcher = MicroBatchingEmbeddings(base, max_batch_size=8, max_wait_seconds=0.5)
+        batcher.start()
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            results = list(executor.map(batcher.embed_query, ["같은 질문", "같은 질문", "다른"]))
+        batcher.close()
+
+        self.assertEqual(results, [[5.0, 1.0], [5.0, 1.0], [2.0, 1.0]])
+        self.assertEqual(base.batches, [["같은 질문", "다른"]])
+
+    def test_error_is_raised_to_every_waiter(self):
+        """배치 계산 오류가 배치에 포함된 모든 요청에 전달되는지 테스트"""
+        batcher = MicroBatchingEmbeddings(RecordingEmbeddings(fail=True), max_wait_seconds=0.2)
+        batcher.start()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(batcher.embed_query, text) for text in ["가", "나"]]
+            for future in futures:
+                with self.assertRaises(RuntimeError):
+                    future.result(timeout=5)
+        batcher.close()
+        self.assertEqual(batcher.stats()["errors"], 1)
+
+    def test_direct_call_when_not_running(self):
+        """시작 전/종료 후에는 모델을 직접 호출하고, 문서 임베딩은 그대로 전달하는지 테스트"""
+        base = RecordingEmbeddings()
+        batcher = MicroBatchingEmbeddings(base)
+        self.assertEqual(batcher.embed_query("가나"), [2.0, 1.0])
+        batcher.start()
+        batcher.close()
+        self.assertEqual(batcher.embed_query("가"), [1.0, 1.0])
+        self.assertEqual(base.query_calls, 2)
+        self.assertEqual(batcher.embed_documents(["가", "나나"]), [[1.0, 1.0], [2.0, 1.0]])
+        self.assertEqual(batcher.stats()["requests"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+# test_embedding_cache.py
+import unittest
+import shutil
+from pathlib import Path
+from typing import List
+from unittest import mock
+
+from langchain_core.embeddings import Embeddings
+
+import embedding_cache
+from embedding_cache import CachedEmbeddings
+
+TEST_BASE_DIR = Path(__file__).resolve().parent
+TEST_CACHE_DIR = TEST_BASE_DIR / "temp_test_embedding_cache"
+
+
+class CountingEmbeddings(Embeddings):
+    """텍스트 길이로 벡터를 만들고, 임베딩한 텍스트를 기록하는 테스트용 임베딩"""
+
+    def __init__(self):
+        self.embedded_texts: List[str] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded_texts.extend(texts)
+        return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return [0.0, 0.0, 0.0]
+
+
+class TestCachedEmbeddings(unittest.TestCase):
+
+    def tearDown(self):
+        shutil.rmtree(TEST_CACHE_DIR, ignore_errors=True)
+
+    def test_only_new_texts_are_embedded_across_restarts(self):
+        """이미 계산한 청크는 재시작 후에도 모델을 호출하지 않는지 테스트"""
+        base = CountingEmbeddings()
+        cached = CachedEmbeddings(base, "org/model", TEST_CACHE_DIR)
+        first = cached.embed_documents(["가", "나나", "가"])
+        self.assertEqual(base.embedded_texts, ["가", "나나"])
+
+        base_after_restart = CountingEmbeddings()
+        reopened = CachedEmbeddings(base_after_restart, "org/model", TEST_CACHE_DIR)
+        second = reopened.embed_documents(["나나", "다다다", "가"])
+
+        self.assertEqual(base_after_restart.embedded_texts, ["다다다"])
+        self.assertEqual(second, [first[1], [3.0, 1.0, 0.5], first[0]])
+
+    def test_partial_write_is_truncated_on_load(self):
+        """해시 기록 전에 종료되어 남은 벡터는 로드 시 잘려나가는지 테스트"""
+        cached = CachedEmbeddings(CountingEmbeddings(), "org/model", TEST_CACHE_DIR)
+        cached.embed_documents(["가"])
+        with open(cached.vectors_path, "ab") as f:
+            f.write(b"\x00" * 12)
+
+        base = CountingEmbeddings()
+        reopened = CachedEmbeddings(base, "org/model", TEST_CACHE_DIR)
+        self.assertEqual(reopened.embed_documents(["나나", "가"]), [[2.0, 1.0, 0.5], [1.0, 1.0, 0.5]])
+        self.assertEqual(base.embedded_texts, ["나나"])
+
+    def test_failed_hashes_write_is_rolled_back(self):
+        """해시 기록에 실패하면 먼저 기록한 벡터를 잘라내, 이후 덧붙인 행의 순서가 어긋나지 않는지 테스트"""
+        cached = CachedEmbeddings(CountingEmbeddings(), "org/model", TEST_CACHE_DIR)
+        cached.embed_documents(["가"])
+        original_open = open
+
+        def failing_open(file, mode="r", *args, **kwargs):
+            if Path(file) == cached.hashes_path and mode == "a":
+                raise OSError("디스크 공간 부족")
+            return original_open(file, mode, *args, **kwargs)
+
+        with mock.patch.object(embedding_cache, "open", failing_open, create=True):
+            # 저장에 실패해도 계산한 벡터는 그대로 반환
+            self.assertEqual(cached.embed_documents(["나나", "가"]), [[2.0, 1.0, 0.5], [1.0, 1.0, 0.5]])
+        self.assertEqual(cached.vectors_path.stat().st_size, 1 * 3 * 4)
+
+        cached.embed_documents(["다다다"])
+        base = CountingEmbeddings()
+        reopened = CachedEmbeddings(base, "org/model", TEST_CACHE_DIR)
+        self.assertEqual(reopened.embed_documents(["다다다", "가", "나나"]),
+                         [[3.0, 1.0, 0.5], [1.0, 1.0, 0.5], [2.0, 1.0, 0.5]])
+        self.assertEqual(base.embedded_texts, ["나나"])
+
+    def test_rows_appended_by_another_instance(self):
+        """같은 캐시 디렉토리를 사용하는 다른 인스턴스(다른 프로세스)가 덧붙인 행을 읽어 들인 뒤 덧붙이는지 테스트"""
+        first = CachedEmbeddings(CountingEmbeddings(), "org/model", TEST_CACHE_DIR)
+        second = CachedEmbeddings(CountingEmbeddings(), "org/model", TEST_CACHE_DIR)
+        first.embed_documents(["가"])
+        second.embed_documents(["나나", "가"])
+        first.embed_documents(["다다다"])
+
+        self.assertEqual(second.embed_documents(["다다다"]), [[3.0, 1.0, 0.5]])
+        self.assertEqual(first.embed_documents(["나나"]), [[2.0, 1.0, 0.5]])
+        base = CountingEmbeddings()
+        reopened = CachedEmbeddings(base, "org/model", TEST_CACHE_DIR)
+        self.assertEqual(reopened.embed_documents(["가", "나나", "다다다"]),
+                         [[1.0, 1.0, 0.5], [2.0, 1.0, 0.5], [3.0, 1.0, 0.5]])
+        self.assertEqual(base.embedded_texts, [])
+
+    def test_orphan_vectors_from_another_instance_are_truncated_before_append(self):
+        """다른 인스턴스가 벡터만 기록하고 종료한 경우, 남은 벡터를 잘라낸 뒤 덧붙여 행 번호가 어긋나지 않는지 테스트"""
+        first = CachedEmbeddings(CountingEmbeddings(), "org/model", TEST_CACHE_DIR)
+        second = CachedEmbeddings(CountingEmbeddings(), "org/model", TEST_CACHE_DIR)
+        first.embed_documents(["가"])
+        # second가 벡터 한 행을 기록한 직후, 해시를 쓰기 전에 종료된 상황
+        with open(second.vectors_path, "ab") as f:
+            f.write(b"\x00" * 12)
+
+        self.assertEqual(first.embed_documents(["나나"]), [[2.0, 1.0, 0.5]])
+        self.assertEqual(first.vectors_path.stat().st_size, 2 * 3 * 4)
+        self.assertEqual(second.embed_documents(["다다다", "나나"]), [[3.0, 1.0, 0.5], [2.0, 1.0, 0.5]])
+
+        base = CountingEmbeddings()
+        reopened = CachedEmbeddings(base, "org/model", TEST_CACHE_DIR)
+        self.assertEqual(reopened.embed_documents(["가", "나나", "다다다"]),
+                         [[1.0, 1.0, 0.5], [2.0, 1.0, 0.5], [3.0, 1.0, 0.5]])
+        self.assertEqual(base.embedded_texts, [])
@@ -0,0 +1,70 @@
+# test_embedding_engines.py
+import unittest
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from embedding_engines import (
+    SentenceTransformerEmbeddings, check_embedding_parity, embedding_cache_model_key, load_embedding_engine
+)
+
+
+# 문장 길이로 만든 고정 벡터 (noise만큼 값을 흔든 "양자화된" 모델 흉내)
+class FakeEmbeddings(Embeddings):
+    def __init__(self, noise: float = 0.0):
+        self.noise = noise
+
+    def embed_documents(self, texts):
+        vectors = []
+        for text in texts:
+            vector = np.random.default_rng(len(text)).standard_normal(8)
+            vector += self.noise * np.random.default_rng(len(text) + 1000).standard_normal(8)
+            vectors.append(vector.tolist())
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+# SentenceTransformer.encode와 같은 형태로 호출을 기록하는 가짜 모델
+class FakeSentenceTransformer:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size, normalize_embeddings, convert_to_numpy, show_progress_bar):
+        self.calls.append((list(texts), batch_size, normalize_embeddings))
+        return np.array([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+
+
+class TestEmbeddingEngines(unittest.TestCase):
+
+    def test_parity(self):
+        """원본과 같으면 코사인 유사도 1, 값이 흔들리면 1보다 작아지는지 테스트"""
+        identical = check_embedding_parity(FakeEmbeddings(), FakeEmbeddings())
+        self.assertAlmostEqual(identical["min_cosine"], 1.0, places=5)
+
+        perturbed = check_embedding_parity(FakeEmbeddings(), FakeEmbeddings(noise=0.3))
+        self.assertLess(perturbed["min_cosine"], 0.999)
+        self.assertLessEqual(perturbed["min_cosine"], perturbed["mean_cosine"])
+        self.assertGreater(perturbed["samples"], 0)
+
+    def test_sentence_transformer_embeddings(self):
+        """정규화 옵션과 배치 크기를 전달하고, 질문 임베딩은 문서 하나로 계산하는지 테스트"""
+        model = FakeSentenceTransformer()
+        embeddings = SentenceTransformerEmbeddings(model, batch_size=4)
+
+        self.assertEqual(embeddings.embed_documents(["가나", "다"]), [[2.0, 1.0], [1.0, 1.0]])
+        self.assertEqual(embeddings.embed_query("라마바"), [3.0, 1.0])
+        self.assertEqual(embeddings.embed_documents([]), [])
+        self.assertEqual(model.calls, [(["가나", "다"], 4, True), (["라마바"], 4, True)])
+
+    def test_cache_key_and_unknown_engine(self):
+        """원본 엔진이 아니면 임베딩 캐시 키에 엔진 이름을 붙이고, 알 수 없는 엔진은 오류인지 테스트"""
+        self.assertEqual(embedding_cache_model_key("nlpai-lab/KURE-v1", "torch"), "nlpai-lab/KURE-v1")
+        self.assertEqual(embedding_cache_model_key("nlpai-lab/KURE-v1", "onnx-int8"), "nlpai-lab/KURE-v1@onnx-int8")
+        with self.assertRaises(ValueError):
+            load_embedding_engine("tensorrt", "nlpai-lab/KURE-v1", onnx_dir=".")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+# test_korean_splitter.py
+import unittest
+
+from korean_splitter import KoreanSentenceTextSplitter, split_korean_sentences
+
+
+class TestKoreanSentenceSplitter(unittest.TestCase):
+
+    def test_split_sentences(self):
+        """종결 어미+문장 부호, 줄바꿈, 따옴표, 소수점, 항목 번호 처리 테스트"""
+        text = ("본 정책은 청년을 지원합니다. 금리는 연 1.5%입니다!\n"
+                "1. 신청은 온라인으로 가능해요. \"기대합니다.\" 마지막 문장\n\n"
+                "가. 서류 제출")
+
+        self.assertEqual(split_korean_sentences(text), [
+            "본 정책은 청년을 지원합니다.",
+            "금리는 연 1.5%입니다!",
+            "1. 신청은 온라인으로 가능해요.",
+            "\"기대합니다.\"",
+            "마지막 문장",
+            "가. 서류 제출",
+        ])
+
+    def test_one_syllable_sentences_are_not_list_markers(self):
+        """'네.', '예.' 같은 한 음절 문장과 줄 중간의 '가.'는 항목 번호로 합치지 않는지 테스트"""
+        text = "네. 신청할 수 있습니다.\n예.\n다음 중 답은 가. 나는 아닙니다.\n(1). 가. 세부 항목"
+
+        self.assertEqual(split_korean_sentences(text), [
+            "네.",
+            "신청할 수 있습니다.",
+            "예.",
+            "다음 중 답은 가.",
+            "나는 아닙니다.",
+            "(1). 가. 세부 항목",
+        ])
+
+    def test_chunks_respect_size_and_overlap(self):
+        """문장 단위로 chunk_size 안에 묶고, 인접 청크가 문장 단위로 겹치는지 테스트"""
+        text = " ".join(f"{i}번째 문장은 지원 내용을 설명합니다." for i in range(20))
+        splitter = KoreanSentenceTextSplitter(chunk_size=100, chunk_overlap=30)
+        chunks = splitter.split_text(text)
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk), 100)
+        self.assertEqual(chunks[0].split("\n\n")[-1], chunks[1].split("\n\n")[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
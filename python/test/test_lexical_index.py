@@ -0,0 +1,98 @@
+# test_lexical_index.py
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize_korean
+
+
+def _doc(chunk_id: str, content: str, relative_path: str = "policy.txt") -> Document:
+    return Document(page_content=content, metadata={"relative_path": relative_path, "chunk_id": chunk_id})
+
+
+class TestLexicalIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = LexicalIndex()
+        docs = [
+            _doc("c1", "청년월세 지원은 월 최대 20만원을 12개월 동안 지급합니다."),
+            _doc("c2", "청년도약계좌는 월 70만원 한도로 납입하며 2025년 3월 1일부터 신청할 수 있습니다."),
+            _doc("c3", "구직활동지원금은 월 30만원을 6개월간 지원합니다.", relative_path="job.txt"),
+        ]
+        self.index.upsert([doc.metadata["chunk_id"] for doc in docs], docs)
+
+    def test_tokenize(self):
+        """한글 2-gram, 숫자(천 단위 구분 제거), 숫자+단위 토큰 테스트"""
+        self.assertEqual(tokenize_korean("월 30만원"), ["월", "30", "30만", "만원"])
+        self.assertEqual(tokenize_korean("300,000원 KURE"), ["300000", "300000원", "원", "kure"])
+
+    def test_exact_amount_and_date_match(self):
+        """금액/날짜를 그대로 입력하면 해당 청크가 1위로 검색되는지 테스트"""
+        self.assertEqual(self.index.search("월 30만원 주는 거", k=3)[0][0].metadata["chunk_id"], "c3")
+        self.assertEqual(self.index.search("2025년 3월 1일", k=3)[0][0].metadata["chunk_id"], "c2")
+        self.assertEqual(self.index.search("xyz", k=3), [])
+
+    def test_incremental_upsert_and_delete(self):
+        """같은 ID 추가는 교체, 삭제/경로 삭제 후 검색 결과에서 빠지는지 테스트"""
+        self.index.upsert(["c1"], [_doc("c1", "청년 주거 급여 안내")])
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.search("20만", k=3), [])
+
+        self.assertEqual(self.index.delete_by_relative_paths(["job.txt"]), 1)
+        self.assertEqual(self.index.search("30만", k=3), [])
+        self.assertEqual(self.index.retain(["c2"]), 1)
+        self.assertEqual(self.index.ids(), {"c2"})
+
+    def test_staged_updates_are_published_at_once(self):
+        """stage_updates 이후의 추가/삭제는 publish_updates 전까지 검색에 보이지 않는지 테스트"""
+        self.index.stage_updates()
+        self.index.upsert(["c1"], [_doc("c1", "청년월세 지원은 월 최대 30만원을 지급합니다.")])
+        self.index.delete(["c3"])
+        self.assertEqual(self.index.ids(), {"c1", "c2"})
+        self.assertEqual(self.index.search("30만원", k=3)[0][0].metadata["chunk_id"], "c3")
+        self.assertEqual(self.index.search("20만", k=3)[0][0].metadata["chunk_id"], "c1")
+
+        self.index.publish_updates()
+        results = self.index.search("30만원", k=3)
+        self.assertEqual(results[0][0].metadata["chunk_id"], "c1")
+        self.assertNotIn("c3", [doc.metadata["chunk_id"] for doc, _ in results])
+        self.assertEqual(self.index.search("20만", k=3), [])
+
+    def test_save_and_load(self):
+        """저장 후 다시 로드하면 같은 검색 결과를 반환하는지 테스트"""
+        temp_dir = Path(tempfile.mkdtemp())
+        try:
+            file_path = temp_dir / "lexical_index.json"
+            self.index.save(file_path)
+            self.assertFalse(self.index.dirty)
+
+            loaded = LexicalIndex.load(file_path)
+            self.assertEqual(loaded.ids(), self.index.ids())
+            self.assertEqual(
+                [(doc.metadata, score) for doc, score in loaded.search("월 30만원", k=3)],
+                [(doc.metadata, score) for doc, score in self.index.search("월 30만원", k=3)]
+            )
+            # 손상된 파일은 빈 색인으로 로드
+            file_path.write_text("{", encoding="utf-8")
+            self.assertEqual(len(LexicalIndex.load(file_path)), 0)
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class TestReciprocalRankFusion(unittest.TestCase):
+
+    def test_fusion_prefers_documents_in_both_lists(self):
+        """두 목록 모두에 나온 청크가 위로 올라오고, 동점이면 앞 목록 순서를 유지하는지 테스트"""
+        dense = [_doc("a", "A"), _doc("b", "B"), _doc("c", "C")]
+        lexical = [_doc("c", "C"), _doc("d", "D")]
+
+        fused = reciprocal_rank_fusion([dense, lexical], top_n=3)
+
+        self.assertEqual([doc.metadata["chunk_id"] for doc in fused], ["c", "a", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
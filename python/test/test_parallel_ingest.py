@@ -0,0 +1,62 @@
+# test_parallel_ingest.py
+import unittest
+import shutil
+from pathlib import Path
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from parallel_ingest import load_and_split_documents, iter_load_and_split
+
+TEST_BASE_DIR = Path(__file__).resolve().parent
+TEST_DATA_DIR = TEST_BASE_DIR / "temp_test_ingest_data"
+
+
+class TestParallelIngest(unittest.TestCase):
+
+    def setUp(self):
+        TEST_DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self.relative_paths = []
+        for i in range(6):
+            rel_path = f"sub_{i % 2}/policy_{i}.txt"
+            (TEST_DATA_DIR / rel_path).parent.mkdir(parents=True, exist_ok=True)
+            sentences = " ".join(f"정책{i}의 {j}번째 문장입니다." for j in range(30))
+            (TEST_DATA_DIR / rel_path).write_text(sentences, encoding="utf-8")
+            self.relative_paths.append(rel_path)
+
+    def tearDown(self):
+        shutil.rmtree(TEST_DATA_DIR, ignore_errors=True)
+
+    def _split(self, workers: int):
+        return load_and_split_documents(
+            TEST_DATA_DIR, self.relative_paths + ["missing.txt"],
+            chunk_size=100, chunk_overlap=10,
+            workers=workers, min_parallel_files=2,
+            splitter_factory=RecursiveCharacterTextSplitter
+        )
+
+    def test_parallel_matches_serial(self):
+        """프로세스 풀 결과가 순차 처리와 같은 순서/내용/메타데이터인지 테스트"""
+        print("\n--- test_parallel_matches_serial ---")
+        serial = self._split(workers=1)
+        parallel = self._split(workers=2)
+
+        self.assertEqual(list(serial), self.relative_paths)
+        self.assertEqual(list(parallel), self.relative_paths)
+        for rel_path in self.relative_paths:
+            self.assertGreater(len(serial[rel_path]), 1)
+            self.assertEqual([c.page_content for c in parallel[rel_path]], [c.page_content for c in serial[rel_path]])
+            self.assertEqual([c.metadata for c in parallel[rel_path]], [c.metadata for c in serial[rel_path]])
+            self.assertEqual(parallel[rel_path][0].metadata["relative_path"], rel_path)
+
+    def test_streaming_keeps_order_with_bounded_in_flight(self):
+        """동시에 맡기는 파일 수를 제한해도 파일 순서대로 하나씩 반환되는지 테스트"""
+        print("\n--- test_streaming_keeps_order_with_bounded_in_flight ---")
+        results = iter_load_and_split(
+            TEST_DATA_DIR, self.relative_paths, chunk_size=100, chunk_overlap=10,
+            workers=2, min_parallel_files=2, splitter_factory=RecursiveCharacterTextSplitter, max_in_flight=2
+        )
+        self.assertEqual([rel_path for rel_path, _ in results], self.relative_paths)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+# test_query_cache.py
+import unittest
+
+from langchain_core.documents import Document
+
+from query_cache import QueryResultCache, normalize_question
+
+
+class TestQueryResultCache(unittest.TestCase):
+
+    def test_normalize_question(self):
+        """공백/대소문자/전각 문자 차이를 무시하는지 테스트"""
+        self.assertEqual(normalize_question("  청년   월세 지원 AI？ "), normalize_question("청년 월세 지원 ai?"))
+
+    def test_results_dropped_on_index_version_change(self):
+        """인덱스 버전이 바뀌면 검색 결과는 버려지고 임베딩은 유지되는지 테스트"""
+        cache = QueryResultCache(max_entries=10)
+        cache.put_embedding("q", [0.1, 0.2])
+        cache.put_results("q", 3, 0, [Document(page_content="chunk")])
+
+        self.assertEqual(len(cache.get_results("q", 3, 0)), 1)
+        self.assertIsNone(cache.get_results("q", 3, 1))
+        self.assertIsNone(cache.get_results("q", 3, 0))
+        self.assertEqual(cache.get_embedding("q"), [0.1, 0.2])
+
+    def test_late_put_at_stale_version_is_ignored(self):
+        """재색인 전에 시작한 검색이 이전 버전으로 늦게 저장해도 현재 버전의 결과가 유지되는지 테스트"""
+        cache = QueryResultCache(max_entries=10)
+        cache.put_results("q", 3, 1, [Document(page_content="new chunk")])
+
+        cache.put_results("other", 3, 0, [Document(page_content="old chunk")])
+
+        self.assertIsNone(cache.get_results("other", 3, 0))
+        self.assertEqual([doc.page_content for doc in cache.get_results("q", 3, 1)], ["new chunk"])
+        self.assertIsNone(cache.get_results("other", 3, 1))
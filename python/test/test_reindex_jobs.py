@@ -0,0 +1,62 @@
+# test_reindex_jobs.py
+import unittest
+import threading
+
+from reindex_jobs import ReindexJobManager
+
+
+class TestReindexJobManager(unittest.TestCase):
+
+    def test_job_completes_with_progress(self):
+        """작업이 완료되고 진행 상황이 기록되는지 테스트"""
+        def run_reindex(mode, job):
+            job.update(stage="embedding", files_total=2, chunks_to_embed=4)
+            job.advance(chunks_embedded=4, vectors_written=4)
+
+        manager = ReindexJobManager(run_reindex)
+        job = manager.start("full")
+        manager.shutdown(5)
+
+        status = job.to_dict()
+        self.assertEqual(status["status"], "completed")
+        self.assertEqual(status["mode"], "full")
+        self.assertEqual(status["chunks_embedded"], 4)
+        self.assertIsNone(manager.active_job)
+
+    def test_only_one_job_runs_and_cancel(self):
+        """실행 중에는 새 작업을 거부하고, 취소 요청 시 cancelled 상태가 되는지 테스트"""
+        started = threading.Event()
+
+        def run_reindex(mode, job):
+            started.set()
+            while True:
+                job.raise_if_cancelled()
+                threading.Event().wait(0.01)
+
+        manager = ReindexJobManager(run_reindex)
+        job = manager.start()
+        self.assertTrue(started.wait(5))
+        with self.assertRaises(RuntimeError):
+            manager.start()
+
+        manager.cancel(job.job_id)
+        manager.shutdown(5)
+        self.assertEqual(job.to_dict()["status"], "cancelled")
+
+    def test_invalid_mode_and_failure(self):
+        """지원하지 않는 방식은 거부하고, 실패한 작업은 오류 메시지를 기록하는지 테스트"""
+        def run_reindex(mode, job):
+            raise ValueError("boom")
+
+        manager = ReindexJobManager(run_reindex)
+        with self.assertRaises(ValueError):
+            manager.start("partial")
+        job = manager.start()
+        manager.shutdown(5)
+        self.assertEqual(job.to_dict()["status"], "failed")
+        self.assertEqual(job.to_dict()["error"], "boom")
+        self.assertIs(manager.get(job.job_id), job)
+
+
+if __name__ == "__main__":
+    unittest.main()
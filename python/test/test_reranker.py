@@ -0,0 +1,78 @@
+# test_reranker.py
+import time
+import unittest
+
+from langchain_core.documents import Document
+
+from reranker import CrossEncoderReranker
+
+
+# 청크 내용의 숫자를 점수로 반환하는 가짜 크로스 인코더
+class FakeCrossEncoder:
+    def __init__(self, delay_seconds: float = 0.0):
+        self.delay_seconds = delay_seconds
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.batches.append(len(pairs))
+        time.sleep(self.delay_seconds)
+        return [float(content.split()[-1]) for _, content in pairs]
+
+
+def _candidates(scores):
+    return [Document(page_content=f"청크 {score}", metadata={"chunk_id": f"id_{i}"}) for i, score in enumerate(scores)]
+
+
+class TestCrossEncoderReranker(unittest.TestCase):
+
+    def test_rerank_in_batches(self):
+        """점수 순으로 상위 top_n개를 반환하고, 후보를 batch_size개씩 나누어 계산하는지 테스트"""
+        model = FakeCrossEncoder()
+        reranker = CrossEncoderReranker(model, batch_size=2)
+
+        reranked = reranker.rerank("질문", _candidates([1, 5, 3, 4, 2]), top_n=3)
+
+        self.assertEqual([doc.page_content for doc in reranked], ["청크 5", "청크 4", "청크 3"])
+        self.assertEqual(model.batches, [2, 2, 1])
+
+    def test_score_cache(self):
+        """같은 질문(정규화 기준)과 청크 쌍은 다시 계산하지 않는지 테스트"""
+        model = FakeCrossEncoder()
+        reranker = CrossEncoderReranker(model, batch_size=8)
+        reranker.rerank("청년 월세 지원", _candidates([1, 2, 3]), top_n=2)
+        reranker.rerank("  청년   월세 지원 ", _candidates([1, 2, 3, 4]), top_n=2)
+
+        self.assertEqual(model.batches, [3, 1])
+        self.assertEqual(reranker.stats()["pairs_scored"], 4)
+
+    def test_fallback_when_over_latency_budget(self):
+        """다음 배치까지 계산하면 지연 시간 한도를 넘는 경우 원래 순서를 반환하는지 테스트"""
+        model = FakeCrossEncoder(delay_seconds=0.05)
+        reranker = CrossEncoderReranker(model, batch_size=1, latency_budget_seconds=0.01)
+        candidates = _candidates([1, 5, 3])
+
+        reranked = reranker.rerank("질문", candidates, top_n=2)
+
+        self.assertEqual(reranked, candidates[:2])
+        self.assertEqual(model.batches, [1])
+        self.assertEqual(reranker.stats()["fallbacks"], 1)
+
+    def test_budget_checked_before_first_batch(self):
+        """쌍당 계산 시간을 측정한 뒤에는 첫 배치도 한도를 넘을 것으로 보이면 실행하지 않는지 테스트"""
+        model = FakeCrossEncoder(delay_seconds=0.05)
+        reranker = CrossEncoderReranker(model, batch_size=4, latency_budget_seconds=0.08)
+        # 측정값이 없는 첫 요청은 배치 하나(쌍 2개)를 계산
+        reranker.rerank("질문", _candidates([1, 2]), top_n=2)
+        self.assertEqual(model.batches, [2])
+
+        # 쌍당 약 0.025초이므로 새 쌍 4개(약 0.1초)는 한도를 넘을 것으로 보고 계산하지 않고 원래 순서를 반환
+        candidates = _candidates([3, 4, 5, 6])
+        reranked = reranker.rerank("다른 질문", candidates, top_n=2)
+
+        self.assertEqual(reranked, candidates[:2])
+        self.assertEqual(model.batches, [2])
+        self.assertEqual(reranker.stats()["fallbacks"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
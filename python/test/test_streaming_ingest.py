@@ -0,0 +1,218 @@
+# test_streaming_ingest.py
+import hashlib
+import importlib
+import json
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+import data_manager
+from config import settings
+from reindex_jobs import ReindexCancelled, ReindexJob
+from vector_index import NumpyVectorIndex
+
+
+# LLM/임베딩 모델 패키지(제미나이, HuggingFace, torch, Chroma)가 설치되지 않은 환경에서도 rag_main_runner를 import할 수 있도록
+# 설치되지 않은 패키지만 빈 모듈로 대신함 (모델은 테스트에서 가짜 객체로 교체하므로 사용되지 않음)
+def _import_rag_main_runner():
+    placeholders = {
+        "torch": {},
+        "langchain_google_genai": {"ChatGoogleGenerativeAI": object},
+        "langchain_huggingface": {"HuggingFaceEmbeddings": object},
+        "langchain_community": {},
+        "langchain_community.vectorstores": {"Chroma": object},
+    }
+    stubs = {}
+    for name, attributes in placeholders.items():
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            module = types.ModuleType(name)
+            for attribute, value in attributes.items():
+                setattr(module, attribute, value)
+            stubs[name] = module
+    with mock.patch.dict(sys.modules, stubs):
+        module = importlib.import_module("rag_main_runner")
+        project_modules = {name: sys.modules[name] for name in ("rag_utils", "rag_main_runner")}
+    # 빈 모듈은 이 import에만 사용하고, 분할 단계에서 다시 import하는 rag_utils는 남겨 둠
+    sys.modules.update(project_modules)
+    return module
+
+
+rag_main_runner = _import_rag_main_runner()
+
+
+# 텍스트 해시로 만든 고정 벡터
+class FakeEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).standard_normal(8).tolist()
+
+
+class TestStreamingIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.data_path = self.temp_dir / "data"
+        self.data_path.mkdir()
+        self.vectorstore_path = self.temp_dir / "vectorstore"
+        self.metadata_path = self.temp_dir / "manifest.json"
+        self.patches = [
+            mock.patch.multiple(
+                settings,
+                VECTOR_INDEX_BACKEND="numpy",
+                TEXT_SPLITTER_ENGINE="rule",
+                CHUNK_SIZE=60,
+                CHUNK_OVERLAP=0,
+                INDEX_ADD_BATCH_SIZE=4,
+                # 파일 하나가 끝날 때마다 메타데이터 중간 저장
+                INGEST_CHECKPOINT_SECONDS=0.0,
+                INGEST_WORKERS=1,
+                HYBRID_SEARCH_ENABLED=True,
+                LEXICAL_INDEX_PATH=self.temp_dir / "lexical_index.json",
+                RERANK_ENABLED=False,
+                EMBEDDING_ENGINE="torch",
+                EMBEDDING_CACHE_ENABLED=False,
+                EMBEDDING_BATCHING_ENABLED=False,
+            ),
+            mock.patch.object(data_manager, "METADATA_FILE_PATH", self.metadata_path),
+            mock.patch.object(rag_main_runner, "get_embedding_model",
+                              lambda model_name=None, engine=None: FakeEmbeddings()),
+            mock.patch.object(rag_main_runner, "get_llm", lambda model_name=None: object()),
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.pipelines = []
+
+    def tearDown(self):
+        for pipeline in self.pipelines:
+            pipeline.close()
+        for patch in reversed(self.patches):
+            patch.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, name: str, sentences: int, tag: str = "v1"):
+        (self.data_path / name).write_text(
+            "\n".join(f"{name} {tag} {i}번째 문장은 청년 지원 내용을 설명합니다." for i in range(sentences)),
+            encoding="utf-8"
+        )
+
+    def _open_pipeline(self):
+        pipeline = rag_main_runner.RAGPipeline(data_path=str(self.data_path),
+                                               vectorstore_path=str(self.vectorstore_path))
+        self.pipelines.append(pipeline)
+        return pipeline
+
+    def _manifest_ids(self) -> set:
+        with open(self.metadata_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        return {record["id"] for file_metadata in manifest.values() for record in file_metadata["chunks"]}
+
+    # 실행 중인 색인, 디스크에 저장된 색인, 메타데이터, 어휘 색인의 청크 ID가 모두 같은지 확인
+    def _assert_consistent(self, pipeline):
+        store_ids = set(pipeline.vectorstore.get_ids())
+        self.assertEqual(store_ids, self._manifest_ids())
+        self.assertEqual(store_ids, set(pipeline.lexical_index.ids()))
+        self.assertEqual(set(NumpyVectorIndex(self.vectorstore_path, FakeEmbeddings()).get_ids()), store_ids)
+
+    # batches번째 배치를 추가한 뒤 on_batch를 호출하도록 벡터 색인의 add_documents를 감쌈
+    @staticmethod
+    def _hook_add_documents(pipeline, batches: int, on_batch):
+        vectorstore = pipeline.vectorstore
+        original = vectorstore.add_documents
+        added = []
+
+        def add_documents(documents, ids):
+            original(documents, ids)
+            added.append(len(ids))
+            if len(added) == batches:
+                on_batch()
+
+        return mock.patch.object(vectorstore, "add_documents", add_documents)
+
+    def test_resume_after_cancel(self):
+        """배치 몇 개를 추가한 뒤 취소하면 완료된 파일만 메타데이터에 남고, 다음 갱신에서 나머지를 이어서 반영하는지 테스트"""
+        pipeline = self._open_pipeline()
+        for i in range(6):
+            self._write(f"f{i}.txt", 5)
+
+        job = ReindexJob("incremental")
+        with self._hook_add_documents(pipeline, 2, job.cancel):
+            with self.assertRaises(ReindexCancelled):
+                pipeline.reindex("incremental", job)
+
+        with open(self.metadata_path, "r", encoding="utf-8") as f:
+            checkpointed_files = set(json.load(f))
+        self.assertTrue(0 < len(checkpointed_files) < 6)
+        # 중간 저장된 파일의 청크는 모두 색인에 있음 (완료되지 않은 파일의 청크는 다음 갱신에서 같은 ID로 다시 추가)
+        self.assertLessEqual(self._manifest_ids(), set(pipeline.vectorstore.get_ids()))
+
+        self.assertTrue(pipeline.refresh_index())
+        with open(self.metadata_path, "r", encoding="utf-8") as f:
+            self.assertEqual(set(json.load(f)), {f"f{i}.txt" for i in range(6)})
+        self._assert_consistent(pipeline)
+
+    def test_queries_see_index_from_before_sync_until_it_finishes(self):
+        """동기화 도중의 검색은 시작 전의 색인만 보고, 끝나면 수정된 파일의 새 청크만 보이는지 테스트"""
+        for i in range(3):
+            self._write(f"f{i}.txt", 5)
+        pipeline = self._open_pipeline()
+        self._write("f0.txt", 6, tag="v2")
+        self._write("f3.txt", 5)
+        query = "f0.txt v2 0번째 문장은 청년 지원 내용을 설명합니다."
+        seen_during_sync = []
+
+        def search():
+            docs = pipeline._search(pipeline.vectorstore, query, FakeEmbeddings().embed_query(query))
+            seen_during_sync.extend(doc.page_content for doc in docs)
+            seen_during_sync.extend(doc.page_content for doc, _ in pipeline.lexical_index.search(query, 100))
+
+        with self._hook_add_documents(pipeline, 2, search):
+            self.assertTrue(pipeline.refresh_index())
+
+        self.assertTrue(seen_during_sync)
+        self.assertFalse(any(" v2 " in content or content.startswith("f3.txt") for content in seen_during_sync))
+        contents = [doc.page_content for doc, _ in pipeline.lexical_index.search(query, 100)]
+        self.assertTrue(any("f0.txt v2" in content for content in contents))
+        self.assertFalse(any("f0.txt v1" in content for content in contents))
+        self._assert_consistent(pipeline)
+
+    def test_restart_after_failure_during_modification(self):
+        """수정/추가 반영 도중 오류로 중단된 뒤 다시 시작하면 이전 청크가 정리되고 모든 ID가 일치하는지 테스트"""
+        for i in range(3):
+            self._write(f"f{i}.txt", 5)
+        pipeline = self._open_pipeline()
+        self._assert_consistent(pipeline)
+
+        self._write("f0.txt", 6, tag="v2")
+        for i in range(3, 6):
+            self._write(f"f{i}.txt", 5)
+
+        def fail():
+            raise RuntimeError("임베딩 중 오류")
+
+        with self._hook_add_documents(pipeline, 2, fail):
+            with self.assertRaises(RuntimeError):
+                pipeline.refresh_index()
+        pipeline.close()
+        self.pipelines.remove(pipeline)
+
+        restarted = self._open_pipeline()
+        self._assert_consistent(restarted)
+        contents = [doc.page_content for _, doc in restarted.vectorstore.get_documents(restarted.vectorstore.get_ids())]
+        self.assertTrue(any("f0.txt v2" in content for content in contents))
+        self.assertFalse(any("f0.txt v1" in content for content in contents))
+
+
+if __name__ == "__main__":
+    unittest.main()
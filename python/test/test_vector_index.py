@@ -0,0 +1,264 @@
+# test_vector_index.py
+import hashlib
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from vector_compression import VectorCompressor
+from vector_index import NumpyVectorIndex, open_vector_index, vector_index_exists
+
+
+# 텍스트 해시로 고정된 무작위 벡터를 만드는 가짜 임베딩 모델
+class FakeEmbeddings(Embeddings):
+    def __init__(self, dim: int = 16):
+        self.dim = dim
+
+    def _vector(self, text: str):
+        seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).standard_normal(self.dim).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def _docs(count: int, prefix: str = "청크", relative_path: str = "a.txt"):
+    return [Document(page_content=f"{prefix} {i}", metadata={"relative_path": relative_path}) for i in range(count)]
+
+
+class TestNumpyVectorIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.embeddings = FakeEmbeddings()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _open(self) -> NumpyVectorIndex:
+        return open_vector_index("numpy", self.temp_dir, self.embeddings)
+
+    def test_search_matches_brute_force(self):
+        """행렬-벡터 곱 검색 결과가 직접 계산한 코사인 유사도 순위와 같은지 테스트"""
+        index = self._open()
+        docs = _docs(50)
+        index.add_documents(docs, [f"id_{i}" for i in range(50)])
+
+        query = self.embeddings.embed_query("질문")
+        results = index.similarity_search_with_scores(query, k=5)
+
+        vectors = np.asarray(self.embeddings.embed_documents([doc.page_content for doc in docs]))
+        cosine = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+        expected = np.argsort(-cosine)[:5]
+        self.assertEqual([doc.page_content for doc, _ in results], [docs[i].page_content for i in expected])
+        np.testing.assert_allclose([score for _, score in results], cosine[expected], rtol=1e-5)
+
+    def test_upsert_delete_and_lookup(self):
+        """같은 ID 교체, 삭제, 경로/ID 조회 테스트"""
+        index = self._open()
+        index.add_documents(_docs(3), ["id_0", "id_1", "id_2"])
+        index.add_documents(_docs(1, prefix="새 내용", relative_path="b.txt"), ["id_1"])
+        index.delete(["id_2"])
+
+        self.assertEqual(sorted(index.get_ids()), ["id_0", "id_1"])
+        self.assertEqual(index.get_ids_by_relative_paths(["b.txt"]), ["id_1"])
+        self.assertEqual([(chunk_id, doc.page_content) for chunk_id, doc in index.get_documents(["id_1", "missing"])],
+                         [("id_1", "새 내용 0")])
+        results = index.similarity_search_with_scores(self.embeddings.embed_query("새 내용 0"), k=10)
+        self.assertEqual([doc.page_content for doc, _ in results][0], "새 내용 0")
+        self.assertEqual(len(results), 2)
+
+    def test_persist_and_reload(self):
+        """저장 후 다시 열면 같은 내용이고, 저장하지 않은 추가분은 버려지는지 테스트"""
+        index = self._open()
+        index.add_documents(_docs(10), [f"id_{i}" for i in range(10)])
+        index.persist()
+        # 저장하지 않은 추가 (종료 전 중단 상황)
+        index.add_documents(_docs(1, prefix="저장 안 됨"), ["unsaved"])
+
+        self.assertTrue(vector_index_exists("numpy", self.temp_dir))
+        reloaded = self._open()
+        self.assertEqual(sorted(reloaded.get_ids()), sorted(f"id_{i}" for i in range(10)))
+        query = self.embeddings.embed_query("질문")
+        self.assertEqual(
+            [doc.page_content for doc, _ in reloaded.similarity_search_with_scores(query, k=3)],
+            [doc.page_content for doc, _ in index.similarity_search_with_scores(query, k=4)
+             if doc.page_content != "저장 안 됨 0"][:3]
+        )
+
+    def test_compaction(self):
+        """삭제된 행이 많으면 저장 시 새 파일로 압축하고 이전 파일을 정리하는지 테스트"""
+        index = self._open()
+        index.add_documents(_docs(10), [f"id_{i}" for i in range(10)])
+        index.persist()
+        index.delete([f"id_{i}" for i in range(8)])
+        index.persist()
+
+        self.assertEqual([path.name for path in self.temp_dir.glob("numpy_vectors.*.f32")], ["numpy_vectors.1.f32"])
+        reloaded = self._open()
+        results = reloaded.similarity_search_with_scores(self.embeddings.embed_query("질문"), k=10)
+        self.assertEqual(sorted(doc.page_content for doc, _ in results), ["청크 8", "청크 9"])
+
+    def test_staged_updates_are_published_at_once(self):
+        """stage_updates 이후의 추가/삭제/저장(압축 포함)은 publish_updates 전까지 검색에 보이지 않는지 테스트"""
+        index = self._open()
+        index.add_documents(_docs(4), [f"id_{i}" for i in range(4)])
+        index.persist()
+
+        index.stage_updates()
+        index.add_documents(_docs(1, prefix="새 내용"), ["id_0"])
+        index.delete(["id_1", "id_2", "id_3"])
+        index.persist()
+        query = self.embeddings.embed_query("새 내용 0")
+        self.assertEqual(sorted(doc.page_content for doc, _ in index.similarity_search_with_scores(query, k=10)),
+                         ["청크 0", "청크 1", "청크 2", "청크 3"])
+        # 동기화 쪽의 조회는 반영 중인 상태를 사용
+        self.assertEqual(index.get_ids(), ["id_0"])
+
+        index.publish_updates()
+        self.assertEqual([doc.page_content for doc, _ in index.similarity_search_with_scores(query, k=10)],
+                         ["새 내용 0"])
+
+    def test_other_instance_keeps_unsaved_rows_and_reloads(self):
+        """다른 프로세스가 쓰는 중에 연 색인은 저장되지 않은 행을 잘라내지 않고, 저장되면 다시 로드하는지 테스트"""
+        writer = self._open()
+        writer.add_documents(_docs(10), [f"id_{i}" for i in range(10)])
+        writer.persist()
+        writer.add_documents(_docs(1, prefix="새 청크"), ["new"])
+        size_before = writer.vectors_path.stat().st_size
+
+        reader = self._open()
+        self.assertEqual(writer.vectors_path.stat().st_size, size_before)
+        self.assertNotIn("new", reader.get_ids())
+        query = self.embeddings.embed_query("새 청크 0")
+        self.assertEqual(writer.similarity_search_with_scores(query, k=1)[0][0].page_content, "새 청크 0")
+
+        writer.persist()
+        self.assertEqual(reader.similarity_search_with_scores(query, k=1)[0][0].page_content, "새 청크 0")
+        self.assertEqual(sorted(reader.get_ids()), sorted(writer.get_ids()))
+
+    def test_writers_take_turns(self):
+        """쓰기는 파일 잠금으로 한 번에 하나씩 수행되고, 잠금을 얻은 쪽은 먼저 다른 쪽의 저장 내용을 다시 읽는지 테스트"""
+        first, second = self._open(), self._open()
+        first.add_documents(_docs(3), ["a_0", "a_1", "a_2"])
+        thread = threading.Thread(target=second.add_documents,
+                                  args=(_docs(2, prefix="두 번째"), ["b_0", "a_2"]))
+        thread.start()
+        thread.join(0.3)
+        # first가 저장할 때까지 second의 추가는 대기
+        self.assertTrue(thread.is_alive())
+        first.persist()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        second.persist()
+
+        reloaded = self._open()
+        self.assertEqual(sorted(reloaded.get_ids()), ["a_0", "a_1", "a_2", "b_0"])
+        self.assertEqual([doc.page_content for _, doc in reloaded.get_documents(["a_2"])], ["두 번째 1"])
+        self.assertEqual(sorted(first.get_ids()), ["a_0", "a_1", "a_2", "b_0"])
+
+    def test_reader_reloads_after_compaction(self):
+        """다른 프로세스가 압축해 벡터 파일 세대가 바뀌어도 새 세대로 다시 로드하는지 테스트"""
+        writer = self._open()
+        writer.add_documents(_docs(10), [f"id_{i}" for i in range(10)])
+        writer.persist()
+        reader = self._open()
+        writer.delete([f"id_{i}" for i in range(8)])
+        writer.persist()
+
+        results = reader.similarity_search_with_scores(self.embeddings.embed_query("질문"), k=10)
+        self.assertEqual(sorted(doc.page_content for doc, _ in results), ["청크 8", "청크 9"])
+        self.assertEqual(reader.vectors_path.name, "numpy_vectors.1.f32")
+
+
+class TestCompressedNumpyVectorIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.embeddings = FakeEmbeddings(dim=32)
+        self.docs = _docs(300)
+        vectors = np.asarray(self.embeddings.embed_documents([doc.page_content for doc in self.docs]))
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _open(self, **options) -> NumpyVectorIndex:
+        return open_vector_index("numpy", self.temp_dir, self.embeddings, **options)
+
+    def _exact_top(self, query, k: int):
+        cosine = self.vectors @ (query / np.linalg.norm(query))
+        top = np.argsort(-cosine)[:k]
+        return [self.docs[i].page_content for i in top], cosine[top]
+
+    def test_compressor_scores_approximate_inner_product(self):
+        """float16/int8/PCA 근사 점수가 실제 내적과 가까운지 테스트"""
+        query = self.vectors[0]
+        exact = self.vectors @ query
+        for method, pca_dims, tolerance in (("float16", 0, 1e-3), ("int8", 0, 0.05), ("none", 32, 1e-4)):
+            compressor = VectorCompressor.fit(method, self.vectors, pca_dims)
+            codes = compressor.encode(self.vectors)
+            approximate = compressor.scores(codes, query, len(codes))
+            self.assertLess(np.abs(approximate - exact).max(), tolerance, (method, pca_dims))
+        self.assertEqual(VectorCompressor.fit("int8", self.vectors, 8).bytes_per_row, 8)
+
+    def test_rescoring_returns_exact_scores(self):
+        """후보를 float32 원본으로 다시 계산하므로, 후보가 정답을 포함하면 결과와 점수가 정확 검색과 같은지 테스트"""
+        for compression, pca_dims in (("float16", 0), ("int8", 0), ("int8", 16)):
+            index = NumpyVectorIndex(self.temp_dir / f"{compression}_{pca_dims}", self.embeddings,
+                                     compression=compression, pca_dims=pca_dims, rescore_multiplier=10)
+            index.add_documents(self.docs, [f"id_{i}" for i in range(300)])
+            self.assertNotIn("학습 전", index.stats()["compression"])
+
+            query = self.embeddings.embed_query("질문")
+            results = index.similarity_search_with_scores(query, k=5)
+            expected_contents, expected_scores = self._exact_top(np.asarray(query), 5)
+            self.assertEqual([doc.page_content for doc, _ in results], expected_contents, (compression, pca_dims))
+            np.testing.assert_allclose([score for _, score in results], expected_scores, rtol=1e-5)
+
+    def test_fit_after_enough_rows_and_append(self):
+        """학습 행 수가 부족하면 정확 검색을 사용하고, 학습 후 추가한 행도 압축 코드로 검색되는지 테스트"""
+        index = self._open(compression="int8")
+        index.add_documents(self.docs[:10], [f"id_{i}" for i in range(10)])
+        self.assertIn("학습 전", index.stats()["compression"])
+        self.assertEqual(len(index.similarity_search_with_scores(self.embeddings.embed_query("질문"), k=3)), 3)
+
+        index.add_documents(self.docs[10:], [f"id_{i}" for i in range(10, 300)])
+        self.assertNotIn("학습 전", index.stats()["compression"])
+        index.add_documents(_docs(3, prefix="추가"), ["new_0", "new_1", "new_2"])
+        self.assertEqual(index._encoded[2], 303)
+        results = index.similarity_search_with_scores(self.embeddings.embed_query("추가 1"), k=1)
+        self.assertEqual(results[0][0].page_content, "추가 1")
+        self.assertAlmostEqual(results[0][1], 1.0, places=5)
+
+    def test_compressor_persisted_and_reused(self):
+        """학습한 압축기를 저장하고, 같은 설정으로 다시 열면 재사용하며 설정이 다르면 다시 학습하는지 테스트"""
+        index = self._open(compression="int8", pca_dims=16)
+        index.add_documents(self.docs, [f"id_{i}" for i in range(300)])
+        index.persist()
+        scales = index._encoded[0].scales
+
+        reloaded = self._open(compression="int8", pca_dims=16)
+        np.testing.assert_array_equal(reloaded._encoded[0].scales, scales)
+        self.assertEqual(reloaded.stats()["scan_bytes"], 300 * 16)
+        query = self.embeddings.embed_query("질문")
+        self.assertEqual(
+            [doc.page_content for doc, _ in reloaded.similarity_search_with_scores(query, k=5)],
+            [doc.page_content for doc, _ in index.similarity_search_with_scores(query, k=5)]
+        )
+
+        changed = self._open(compression="float16")
+        self.assertEqual(changed._encoded[0].method, "float16")
+        self.assertEqual(changed.stats()["scan_bytes"], 300 * 32 * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+# test_vectorstore_delete.py
+import unittest
+
+from rag_main_runner import RAGPipeline
+
+
+# 호출 횟수를 기록하는 가짜 벡터 저장소
+class CountingVectorStore:
+    def __init__(self, ids_by_path):
+        self.ids_by_path = ids_by_path
+        self.calls = []
+
+    def get_ids_by_relative_paths(self, relative_paths):
+        self.calls.append(("get", list(relative_paths)))
+        return [chunk_id for path in relative_paths for chunk_id in self.ids_by_path.get(path, [])]
+
+    def get_ids(self):
+        self.calls.append(("get", None))
+        return [chunk_id for chunk_ids in self.ids_by_path.values() for chunk_id in chunk_ids]
+
+    def delete(self, ids=None):
+        self.calls.append(("delete", list(ids)))
+
+    def persist(self):
+        self.calls.append(("persist",))
+
+
+class TestDeleteDocsByRelativePaths(unittest.TestCase):
+
+    def _pipeline(self, vectorstore):
+        # 모델 로드 없이 삭제 함수만 테스트
+        pipeline = RAGPipeline.__new__(RAGPipeline)
+        pipeline.vectorstore = vectorstore
+        return pipeline
+
+    def test_single_get_and_delete_for_many_paths(self):
+        """경로 수와 관계없이 get 1회, delete 1회만 호출하고 persist는 호출하지 않는지 테스트"""
+        ids_by_path = {f"doc_{i}.txt": [f"id_{i}_a", f"id_{i}_b"] for i in range(200)}
+        store = CountingVectorStore(ids_by_path)
+
+        deleted = self._pipeline(store)._delete_docs_by_relative_paths(list(ids_by_path) + ["doc_0.txt"])
+
+        self.assertEqual(deleted, 400)
+        self.assertEqual([call[0] for call in store.calls], ["get", "delete"])
+        self.assertEqual(len(store.calls[0][1]), 200)
+
+    def test_no_delete_when_nothing_found(self):
+        """조회 결과가 없으면 delete를 호출하지 않는지 테스트"""
+        store = CountingVectorStore({})
+        self.assertEqual(self._pipeline(store)._delete_docs_by_relative_paths(["missing.txt"]), 0)
+        self.assertEqual([call[0] for call in store.calls], ["get"])
+
+
+class TestDeleteOrphanVectors(unittest.TestCase):
+
+    def test_deletes_vectors_missing_from_metadata(self):
+        """메타데이터에 없는 벡터(중단된 실행의 잔여 청크, 임의 ID 청크)만 삭제하는지 테스트"""
+        store = CountingVectorStore({"a.txt": ["id_a"], "b.txt": ["id_b", "random-uuid"], "gone.txt": ["id_gone"]})
+        pipeline = RAGPipeline.__new__(RAGPipeline)
+        pipeline.vectorstore = store
+
+        deleted = pipeline._delete_orphan_vectors({
+            "a.txt": {"hash": "h1", "chunks": [{"id": "id_a", "hash": "c1"}]},
+            "b.txt": {"hash": "h2", "chunks": [{"id": "id_b", "hash": "c2"}]},
+        })
+
+        self.assertEqual(deleted, 2)
+        self.assertEqual(store.calls[-1], ("delete", ["random-uuid", "id_gone"]))
+
+    def test_skips_when_legacy_metadata_present(self):
+        """청크 목록이 없는 이전 형식 메타데이터가 있으면 아무것도 삭제하지 않는지 테스트"""
+        store = CountingVectorStore({"a.txt": ["id_a"]})
+        pipeline = RAGPipeline.__new__(RAGPipeline)
+        pipeline.vectorstore = store
+
+        self.assertEqual(pipeline._delete_orphan_vectors({"a.txt": {"hash": "h1"}}), 0)
+        self.assertEqual(store.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
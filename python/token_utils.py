@@ -0,0 +1,44 @@
+# token_utils.py
+"""
+프롬프트에 들어갈 텍스트의 토큰 수를 추정합니다.
+
+Gemini 토크나이저는 로컬에서 사용할 수 없고, 토큰 수를 API로 세면
+요청마다 네트워크 왕복이 추가되므로 문자 종류별 평균값으로 근사합니다.
+- 한글/한자 등 CJK 문자 : 문자 1개당 약 1토큰
+- 그 외(영문, 숫자, 기호) : 약 4문자당 1토큰
+대화 기록 길이 제한, 문맥 길이 제한 등 '예산' 계산 용도로만 사용합니다.
+"""
+import math
+
+# CJK 문자 판별 범위 (한글 음절/자모, 한중일 통합 한자)
+_CJK_RANGES = (
+    (0xAC00, 0xD7A3), # 한글 음절
+    (0x1100, 0x11FF), # 한글 자모
+    (0x3130, 0x318F), # 한글 호환 자모
+    (0x4E00, 0x9FFF), # 한중일 통합 한자
+)
+# CJK 외 문자의 평균 토큰당 문자 수
+_CHARS_PER_TOKEN_OTHER = 4
+
+
+def _is_cjk(char: str) -> bool:
+    code = ord(char)
+    for start, end in _CJK_RANGES:
+        if start <= code <= end:
+            return True
+    return False
+
+# 텍스트의 토큰 수 추정값 반환 (공백은 세지 않음)
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    cjk_count = 0
+    other_count = 0
+    for char in text:
+        if char.isspace():
+            continue
+        if _is_cjk(char):
+            cjk_count += 1
+        else:
+            other_count += 1
+    return cjk_count + math.ceil(other_count / _CHARS_PER_TOKEN_OTHER)
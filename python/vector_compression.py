@@ -0,0 +1,144 @@
+# vector_compression.py
+"""
+numpy 벡터 색인(vector_index.NumpyVectorIndex)의 검색용 압축 표현입니다.
+
+KURE-v1 임베딩은 1024차원 float32(행당 4KB)라서 청크 수에 비례해 메모리와 전체 스캔 시간이 늘어납니다.
+압축 표현으로 모든 행의 근사 점수를 계산해 후보를 고른 뒤, 후보만 원본 float32 벡터(메모리 맵)로 다시 계산(rescoring)하므로
+최종 순위와 점수는 압축하지 않았을 때와 같은 코사인 유사도입니다.
+- "float16" : 반정밀도 (차원당 2바이트). numpy의 float16 -> float32 변환이 느려서 메모리는 줄지만 검색은 느려질 수 있음
+- "int8" : 차원별 배율(scale)로 나눠 -127~127 정수로 양자화 (차원당 1바이트). 배율은 색인 시 데이터로 학습
+- pca_dims > 0 : 색인 시 학습한 PCA로 차원을 줄인 뒤 위 방식으로 저장 (compression="none"이면 float32로 저장)
+학습한 값(평균, 주성분, 배율)은 npz 파일로 저장하여 재시작 후에도 같은 표현을 사용합니다.
+"""
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+COMPRESSION_METHODS = ("none", "float16", "int8")
+# 학습이 필요한 표현(int8, PCA)의 최소 학습 행 수 (이보다 적으면 압축하지 않고 float32로 검색)
+MIN_FIT_ROWS = 256
+# 학습에 사용할 최대 행 수 (초과하면 무작위 표본 사용)
+FIT_SAMPLE_ROWS = 20000
+# 근사 점수를 계산할 때 한 번에 float32로 변환하는 행 수
+# (변환한 블록이 CPU 캐시에 남아있을 때 곱하도록 작게 유지. 1024차원 기준 1MB)
+SCORE_BLOCK_ROWS = 256
+
+
+class VectorCompressor:
+    """
+    정규화된 float32 벡터를 압축 코드로 변환하고, 코드와 질문 벡터의 근사 내적을 계산합니다.
+    PCA를 사용하면 x ≈ mean + components.T @ z 이므로 x·q ≈ mean·q + z·(components @ q)로 계산합니다.
+    """
+
+    def __init__(self, method: str, dim: int, mean: Optional[np.ndarray] = None,
+                 components: Optional[np.ndarray] = None, scales: Optional[np.ndarray] = None,
+                 fitted_rows: int = 0):
+        if method not in COMPRESSION_METHODS:
+            raise ValueError(f"지원하지 않는 벡터 압축 방식입니다: '{method}' (가능한 값: {', '.join(COMPRESSION_METHODS)})")
+        self.method = method
+        self.dim = dim
+        self.mean = mean # PCA 평균 (dim,)
+        self.components = components # PCA 주성분 (pca_dims, dim)
+        self.scales = scales # int8 차원별 배율 (code_dim,)
+        self.fitted_rows = fitted_rows # 학습에 사용한 행 수
+
+    @staticmethod
+    def min_fit_rows(method: str, pca_dims: int) -> int:
+        if method == "int8" or pca_dims > 0:
+            return max(MIN_FIT_ROWS, pca_dims)
+        return 0
+
+    @property
+    def pca_dims(self) -> int:
+        return 0 if self.components is None else int(self.components.shape[0])
+
+    # 데이터로 학습하는 값이 있는지 (있으면 데이터가 늘어날 때 다시 학습)
+    @property
+    def requires_fit(self) -> bool:
+        return self.method == "int8" or self.components is not None
+
+    @property
+    def code_dim(self) -> int:
+        return self.pca_dims or self.dim
+
+    @property
+    def code_dtype(self) -> np.dtype:
+        return np.dtype({"none": np.float32, "float16": np.float16, "int8": np.int8}[self.method])
+
+    @property
+    def bytes_per_row(self) -> int:
+        return self.code_dim * self.code_dtype.itemsize
+
+    # 설정과 같은 표현인지 확인 (다르면 다시 학습)
+    def matches(self, method: str, dim: int, pca_dims: int) -> bool:
+        return self.method == method and self.dim == dim and self.pca_dims == min(pca_dims, dim)
+
+    @classmethod
+    def fit(cls, method: str, vectors: np.ndarray, pca_dims: int = 0) -> "VectorCompressor":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dim = int(vectors.shape[1])
+        mean = components = scales = None
+        data = vectors
+        if pca_dims > 0:
+            pca_dims = min(pca_dims, dim)
+            mean = vectors.mean(axis=0)
+            centered = vectors - mean
+            # 공분산 행렬의 고유벡터 중 고유값이 큰 순서로 pca_dims개 (eigh는 오름차순으로 반환)
+            _, eigenvectors = np.linalg.eigh(centered.T.astype(np.float64) @ centered)
+            components = np.ascontiguousarray(eigenvectors[:, ::-1][:, :pca_dims].T, dtype=np.float32)
+            data = centered @ components.T
+        if method == "int8":
+            # 학습 데이터의 차원별 최대 절댓값이 127이 되도록 (범위를 넘는 값은 인코딩 시 잘림)
+            scales = (np.abs(data).max(axis=0) / 127.0).astype(np.float32)
+            scales[scales == 0] = 1.0
+        return cls(method, dim, mean=mean, components=components, scales=scales, fitted_rows=len(vectors))
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        data = np.asarray(vectors, dtype=np.float32)
+        if self.components is not None:
+            data = (data - self.mean) @ self.components.T
+        if self.method == "int8":
+            return np.clip(np.rint(data / self.scales), -127, 127).astype(np.int8)
+        return data.astype(self.code_dtype)
+
+    # codes 앞쪽 row_count개 행과 정규화된 질문 벡터의 근사 내적(코사인 유사도)
+    def scores(self, codes: np.ndarray, query: np.ndarray, row_count: int) -> np.ndarray:
+        query = np.asarray(query, dtype=np.float32)
+        offset = 0.0
+        if self.components is not None:
+            offset = float(self.mean @ query)
+            query = self.components @ query
+        if self.scales is not None:
+            query = query * self.scales
+        scores = np.empty(row_count, dtype=np.float32)
+        # float16/int8 행렬 곱은 BLAS를 쓰지 못하므로 블록 단위로 float32로 변환해 계산
+        for start in range(0, row_count, SCORE_BLOCK_ROWS):
+            end = min(start + SCORE_BLOCK_ROWS, row_count)
+            scores[start:end] = codes[start:end].astype(np.float32, copy=False) @ query
+        return scores + offset
+
+    # 학습한 값을 npz 파일로 원자적으로 저장 (임시 파일에 쓴 뒤 교체)
+    def save(self, file_path: Path) -> None:
+        arrays = {"method": np.array(self.method), "dim": np.array(self.dim), "fitted_rows": np.array(self.fitted_rows)}
+        for name in ("mean", "components", "scales"):
+            if getattr(self, name) is not None:
+                arrays[name] = getattr(self, name)
+        temp_path = Path(f"{file_path}.tmp")
+        with open(temp_path, "wb") as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path: Path) -> "VectorCompressor":
+        with np.load(file_path, allow_pickle=False) as data:
+            return cls(
+                str(data["method"]), int(data["dim"]),
+                mean=data["mean"] if "mean" in data.files else None,
+                components=data["components"] if "components" in data.files else None,
+                scales=data["scales"] if "scales" in data.files else None,
+                fitted_rows=int(data["fitted_rows"])
+            )
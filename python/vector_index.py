@@ -0,0 +1,670 @@
+# vector_index.py
+"""
+청크 벡터를 저장하고 검색하는 벡터 색인(VectorIndex)의 공통 인터페이스와 구현체입니다.
+RAGPipeline은 이 인터페이스만 사용하므로, settings.VECTOR_INDEX_BACKEND로 저장소를 바꿀 수 있습니다.
+
+- "chroma" : 기존 langchain Chroma (SQLite 기반) 저장소를 감싼 구현
+- "numpy" : 정규화된 임베딩을 float32 행렬 파일 하나에 이어 붙이고 메모리 맵으로 읽는 정확(exact) 검색 구현
+    - 상위 k개 검색은 행렬-벡터 곱 한 번과 argpartition으로 처리 (SQLite/클라이언트 오버헤드 없음)
+    - 시작 시 파일을 메모리 맵으로 열기만 하므로 로드가 빠르고, 여러 워커 프로세스가 같은 페이지 캐시를 공유함
+    - 청크 ID, 내용, 메타데이터는 별도의 JSON 파일(sidecar)에 행 순서대로 저장
+    - 벡터 파일은 뒤에 덧붙이기만 하고, 삭제는 sidecar에서 행을 비우는 방식(tombstone)으로 처리.
+      비워진 행이 많아지면 저장 시 살아있는 행만 새 파일(세대 번호가 붙은 파일)로 옮겨 압축
+    - sidecar에 기록된 행 수까지만 유효하므로, 덧붙이는 도중 종료되어도 이전 저장 시점의 상태로 로드됨
+    - 여러 워커 프로세스가 같은 디렉토리를 사용할 수 있음. 쓰기(추가/삭제부터 저장까지)는 파일 잠금(numpy_index.lock)을
+      가진 프로세스 하나만 수행하고, 잠금을 얻으면 먼저 다른 프로세스가 저장한 sidecar를 다시 읽음.
+      저장되지 않은 행을 잘라내는 복구도 잠금을 가진 경우에만 수행하며, sidecar에 기록된 행은 자르지 않으므로
+      다른 프로세스의 메모리 맵은 항상 유효함. 다른 프로세스는 sidecar가 바뀐 것을 보면 다시 로드함
+    - compression/pca_dims를 설정하면 압축 표현(vector_compression.py)으로 후보를 고른 뒤
+      후보만 float32 원본으로 다시 계산 (스캔 메모리/시간 감소, 최종 점수는 같은 코사인 유사도)
+
+검색 점수는 두 구현 모두 질문 임베딩과의 코사인 유사도로 반환합니다.
+저장소를 바꾸면 기존 저장소의 내용은 옮겨지지 않으므로 전체 재색인(/admin/reindex, mode="full")이 필요합니다.
+(새 저장소가 비어있으면 시작 시 동기화에서 모든 파일을 다시 반영)
+"""
+import os
+import json
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from filelock import FileLock, Timeout
+
+from data_manager import write_json_atomic
+from vector_compression import COMPRESSION_METHODS, FIT_SAMPLE_ROWS, SCORE_BLOCK_ROWS, VectorCompressor
+
+# 로거
+import logging
+
+logger = logging.getLogger(__name__)
+
+VECTOR_INDEX_BACKENDS = ("chroma", "numpy")
+
+
+class VectorIndex(ABC):
+    """
+    청크 ID를 키로 하는 벡터 색인.
+    add_documents는 같은 ID가 이미 있으면 교체(upsert)하며, 검색 점수는 코사인 유사도(클수록 관련도 높음).
+    """
+
+    # 청크를 임베딩하여 추가 (같은 ID는 교체)
+    @abstractmethod
+    def add_documents(self, documents: Sequence[Document], ids: Sequence[str]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, ids: Iterable[str]) -> None:
+        ...
+
+    # 저장된 모든 청크 ID
+    @abstractmethod
+    def get_ids(self) -> List[str]:
+        ...
+
+    # metadata["relative_path"]가 relative_paths 중 하나인 청크 ID (청크 목록이 없는 이전 형식의 파일 삭제용)
+    @abstractmethod
+    def get_ids_by_relative_paths(self, relative_paths: Sequence[str]) -> List[str]:
+        ...
+
+    # ID로 청크 조회. 없는 ID는 제외하고 [(ID, Document)] 반환
+    @abstractmethod
+    def get_documents(self, ids: Sequence[str]) -> List[Tuple[str, Document]]:
+        ...
+
+    # 질문 임베딩과 코사인 유사도가 높은 순서로 최대 k개의 (Document, 유사도) 반환
+    @abstractmethod
+    def similarity_search_with_scores(self, embedding: Sequence[float], k: int) -> List[Tuple[Document, float]]:
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    # 변경 사항을 디스크에 저장
+    def persist(self) -> None:
+        pass
+
+    # 이후의 추가/삭제를 검색에 바로 반영하지 않고, publish_updates()에서 한 번에 반영
+    # (동기화 도중의 질문이 일부만 반영된 색인을 보지 않도록). 기본 구현은 변경을 바로 반영
+    def stage_updates(self) -> None:
+        pass
+
+    # stage_updates() 이후의 변경을 검색에 한 번에 반영
+    def publish_updates(self) -> None:
+        pass
+
+    # langchain 검색기(retriever)로 사용
+    @abstractmethod
+    def as_retriever(self, k: int) -> BaseRetriever:
+        ...
+
+
+class VectorIndexRetriever(BaseRetriever):
+    """VectorIndex를 langchain 검색기로 감싼 클래스 (질문 임베딩 후 상위 k개 검색)"""
+    vector_index: Any
+    embeddings: Any
+    k: int = 3
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        embedding = self.embeddings.embed_query(query)
+        return [doc for doc, _ in self.vector_index.similarity_search_with_scores(embedding, self.k)]
+
+
+class ChromaVectorIndex(VectorIndex):
+    """
+    기존 langchain Chroma 저장소를 VectorIndex 인터페이스로 감싼 구현.
+    stage_updates()를 지원하지 않으므로 동기화 도중의 검색은 반영 중간 상태를 볼 수 있음
+    (미해결: 별도 컬렉션에 반영한 뒤 교체하는 방식이 필요)
+    """
+
+    def __init__(self, persist_directory: Path, embedding_function: Embeddings):
+        # chromadb는 이 저장소를 사용할 때만 import
+        from langchain_community.vectorstores import Chroma
+        self.store = Chroma(persist_directory=str(persist_directory), embedding_function=embedding_function)
+
+    # 디렉토리에 저장된 내용이 있는지 확인
+    @staticmethod
+    def exists(persist_directory: Path) -> bool:
+        return os.path.exists(persist_directory) and any(Path(persist_directory).iterdir())
+
+    def add_documents(self, documents: Sequence[Document], ids: Sequence[str]) -> None:
+        self.store.add_documents(documents=list(documents), ids=list(ids))
+
+    def delete(self, ids: Iterable[str]) -> None:
+        self.store.delete(ids=list(ids))
+
+    def get_ids(self) -> List[str]:
+        # 문서 내용/메타데이터 없이 ID만 조회
+        return self.store.get(include=[]).get("ids") or []
+
+    def get_ids_by_relative_paths(self, relative_paths: Sequence[str]) -> List[str]:
+        # where문의 $in 조건으로 모든 경로의 ID를 한 번에 조회
+        retrieved = self.store.get(where={"relative_path": {"$in": list(relative_paths)}}, include=[])
+        return (retrieved.get("ids") or []) if retrieved else []
+
+    def get_documents(self, ids: Sequence[str]) -> List[Tuple[str, Document]]:
+        if not ids:
+            return []
+        retrieved = self.store.get(ids=list(ids), include=["documents", "metadatas"])
+        return [
+            (chunk_id, Document(page_content=content or "", metadata=metadata or {}))
+            for chunk_id, content, metadata in zip(retrieved["ids"], retrieved["documents"], retrieved["metadatas"])
+        ]
+
+    # Chroma의 기본 거리(제곱 유클리드)는 정규화된 임베딩에서 2 - 2 * 코사인 유사도와 같음
+    def similarity_search_with_scores(self, embedding: Sequence[float], k: int) -> List[Tuple[Document, float]]:
+        docs_and_distances = self.store.similarity_search_by_vector_with_relevance_scores(list(embedding), k=k)
+        return [(doc, 1.0 - distance / 2.0) for doc, distance in docs_and_distances]
+
+    def count(self) -> int:
+        return self.store._collection.count()
+
+    def persist(self) -> None:
+        self.store.persist()
+
+    def as_retriever(self, k: int) -> BaseRetriever:
+        return self.store.as_retriever(search_kwargs={"k": k})
+
+
+class NumpyVectorIndex(VectorIndex):
+    """
+    메모리 맵 float32 행렬 + JSON sidecar로 구성된 정확 검색 색인 (스레드 안전, 여러 프로세스에서 사용 가능).
+    검색은 잠금 없이 시작 시점의 행렬/목록(_view)을 사용하고, 추가/삭제/저장만 잠금으로 직렬화.
+    stage_updates() 이후에는 _view를 교체하지 않고, publish_updates()에서 그때까지의 변경을 한 번에 교체.
+    추가/삭제를 시작하면 파일 잠금을 얻고, 저장(persist)에 성공할 때 놓음 (그동안 다른 프로세스의 쓰기는 대기)
+    """
+    SIDECAR_FILE_NAME = "numpy_index.json"
+    COMPRESSOR_FILE_NAME = "numpy_compressor.npz"
+    LOCK_FILE_NAME = "numpy_index.lock"
+    # 다른 프로세스의 압축으로 벡터 파일 세대가 바뀌는 중에 sidecar를 읽은 경우 다시 읽는 횟수
+    RELOAD_ATTEMPTS = 3
+    FORMAT_VERSION = 1
+    # 비워진 행이 전체 행의 이 비율 이상이면 저장 시 압축
+    COMPACT_DEAD_RATIO = 0.5
+
+    def __init__(self, directory: Path, embedding_function: Embeddings, compression: str = "none",
+                 pca_dims: int = 0, rescore_multiplier: int = 4):
+        if compression not in COMPRESSION_METHODS:
+            raise ValueError(f"지원하지 않는 벡터 압축 방식입니다: '{compression}' (가능한 값: {', '.join(COMPRESSION_METHODS)})")
+        self.directory = Path(directory)
+        self.embedding_function = embedding_function
+        self.compression = compression
+        self.pca_dims = max(0, pca_dims)
+        # 압축 표현으로 고른 후보 수 = k * rescore_multiplier
+        self.rescore_multiplier = max(1, rescore_multiplier)
+        self.sidecar_path = self.directory / self.SIDECAR_FILE_NAME
+        self.compressor_path = self.directory / self.COMPRESSOR_FILE_NAME
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # 프로세스 사이 쓰기 잠금. 추가한 스레드와 저장하는 스레드가 다를 수 있으므로 스레드별이 아닌 객체 단위로 사용
+        self._file_lock = FileLock(str(self.directory / self.LOCK_FILE_NAME), thread_local=False)
+        self._writing = False # 파일 잠금을 가지고 있는지 (추가/삭제 후 저장 전까지)
+        # 마지막으로 읽거나 저장한 sidecar의 (inode, 크기, 수정 시각). 다르면 다른 프로세스가 저장한 것
+        self._sidecar_stamp: Optional[Tuple[int, int, int]] = None
+        self._dim: Optional[int] = None
+        self._generation = 0
+        # 행 번호별 청크 ID/내용/메타데이터 (삭제된 행의 ID는 None)
+        self._ids: List[Optional[str]] = []
+        self._contents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._row_by_id: Dict[str, int] = {}
+        # 읽기 전용 메모리 맵 (행 수만큼), 행별 유효 여부
+        self._matrix: Optional[np.ndarray] = None
+        self._alive = np.zeros(0, dtype=bool)
+        # 압축 표현 (압축기, 행별 코드 배열(여유 용량 포함), 인코딩된 행 수). 압축하지 않거나 학습 전이면 None
+        self._encoded: Optional[Tuple[VectorCompressor, np.ndarray, int]] = None
+        self._compressor_dirty = False
+        self._dirty = False
+        # True이면 추가/삭제가 _view에 반영되지 않음 (publish_updates()에서 반영)
+        self._staging = False
+        # 검색이 사용하는 (행렬, 유효 여부, 내용, 메타데이터, 압축 표현). 다시 로드할 때도 한 번에 교체되도록 묶어서 보관
+        self._view: Tuple[Optional[np.ndarray], np.ndarray, List[str], List[Dict[str, Any]], Optional[tuple]] = (
+            None, self._alive, self._contents, self._metadatas, None
+        )
+        self._load()
+
+    @classmethod
+    def exists(cls, directory: Path) -> bool:
+        return (Path(directory) / cls.SIDECAR_FILE_NAME).exists()
+
+    @property
+    def compressed(self) -> bool:
+        return self.compression != "none" or self.pca_dims > 0
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.directory / f"numpy_vectors.{self._generation}.f32"
+
+    def _load(self):
+        # 다른 프로세스가 쓰는 중이면(잠금을 바로 얻지 못하면) 파일을 고치지 않고 저장된 상태만 읽음
+        # (그 프로세스가 덧붙인, 아직 저장되지 않은 행을 잘라내지 않도록)
+        try:
+            self._file_lock.acquire(timeout=0)
+        except Timeout:
+            repair = False
+        else:
+            repair = True
+        try:
+            if not self.sidecar_path.exists():
+                if repair:
+                    # 처음 저장하기 전에 종료되어 남은 벡터 파일은 sidecar가 없으므로 사용하지 않음
+                    for path in self.directory.glob("numpy_vectors.*.f32"):
+                        path.unlink()
+                    self.compressor_path.unlink(missing_ok=True)
+                return
+            if repair:
+                self._read_sidecar()
+                # sidecar를 저장한 뒤 덧붙인(저장되지 않은) 행은 잘라냄
+                self._truncate_unsaved_rows()
+                self._remove_stale_vector_files()
+                if not self.compressed:
+                    self.compressor_path.unlink(missing_ok=True)
+                self._remap()
+            else:
+                self._read_sidecar_and_remap()
+        finally:
+            if repair:
+                self._file_lock.release()
+        self._load_compressor()
+        self._publish()
+        logger.info(f"numpy 벡터 색인 로드 완료: {self.directory} (청크 {len(self._row_by_id)}개, 차원 {self._dim}, "
+                    f"압축: {self._describe_compression()})")
+
+    def _read_sidecar(self):
+        with open(self.sidecar_path, "r", encoding="utf-8") as f:
+            stat_result = os.fstat(f.fileno())
+            sidecar = json.load(f)
+        if sidecar.get("version") != self.FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 numpy 벡터 색인 형식입니다: {sidecar.get('version')}")
+        self._dim = sidecar["dim"]
+        self._generation = sidecar["generation"]
+        self._ids = sidecar["ids"]
+        self._contents = sidecar["documents"]
+        self._metadatas = sidecar["metadatas"]
+        self._row_by_id = {chunk_id: row for row, chunk_id in enumerate(self._ids) if chunk_id is not None}
+        self._alive = np.array([chunk_id is not None for chunk_id in self._ids], dtype=bool)
+        self._sidecar_stamp = (stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+
+    # 잠금 없이 sidecar를 읽고 벡터 파일을 연결
+    # 다른 프로세스가 압축한 직후라 sidecar가 가리키는 이전 세대 파일이 이미 지워졌으면 sidecar를 다시 읽음
+    def _read_sidecar_and_remap(self):
+        for attempt in range(self.RELOAD_ATTEMPTS):
+            self._read_sidecar()
+            try:
+                self._remap()
+                return
+            except FileNotFoundError:
+                if attempt == self.RELOAD_ATTEMPTS - 1:
+                    raise
+
+    def _current_sidecar_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat_result = os.stat(self.sidecar_path)
+        except FileNotFoundError:
+            return None
+        return stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns
+
+    # 다른 프로세스가 sidecar를 저장했으면 다시 로드 (이 프로세스가 쓰는 중이면 다른 프로세스는 저장할 수 없음)
+    def _refresh_if_changed(self):
+        if self._writing or self._current_sidecar_stamp() in (None, self._sidecar_stamp):
+            return
+        with self._lock:
+            if self._writing or self._current_sidecar_stamp() in (None, self._sidecar_stamp):
+                return
+            self._reload_locked()
+
+    def _reload_locked(self):
+        self._read_sidecar_and_remap()
+        self._encoded = None
+        self._compressor_dirty = False
+        self._load_compressor()
+        self._publish()
+        logger.info(f"다른 프로세스가 저장한 numpy 벡터 색인을 다시 로드했습니다: {self.directory} "
+                    f"(청크 {len(self._row_by_id)}개)")
+
+    # 추가/삭제 전에 파일 잠금을 얻음 (잠금 안에서 호출). 그 사이 다른 프로세스가 저장했으면 먼저 다시 로드하고,
+    # 이전 쓰기 프로세스가 저장하지 못하고 종료하며 남긴 행을 잘라냄
+    def _begin_write_locked(self):
+        if self._writing:
+            return
+        self._file_lock.acquire()
+        self._writing = True
+        try:
+            if self._current_sidecar_stamp() not in (None, self._sidecar_stamp):
+                self._reload_locked()
+            self._truncate_unsaved_rows()
+        except BaseException:
+            self._end_write_locked()
+            raise
+
+    def _end_write_locked(self):
+        if self._writing:
+            self._writing = False
+            self._file_lock.release()
+
+    # 벡터 파일을 현재 행 수(저장된 sidecar의 행 수)에 맞춰 잘라냄. 파일 잠금을 가진 경우에만 호출
+    def _truncate_unsaved_rows(self):
+        expected_bytes = len(self._ids) * (self._dim or 0) * np.dtype(np.float32).itemsize
+        if self.vectors_path.exists() and self.vectors_path.stat().st_size > expected_bytes:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(expected_bytes)
+
+    # 검색이 사용할 상태를 한 번에 교체 (잠금 안에서 또는 로드 시 호출). 변경을 모으는 중이면 교체하지 않음
+    # 이전 _view가 읽는 행은 이후의 추가/삭제/압축에서 바뀌지 않으므로(뒤에 덧붙이거나 새 객체로 교체) 계속 유효함
+    def _publish(self):
+        if self._staging:
+            return
+        self._view = (self._matrix, self._alive, self._contents, self._metadatas, self._encoded)
+
+    def stage_updates(self) -> None:
+        with self._lock:
+            self._staging = True
+
+    def publish_updates(self) -> None:
+        with self._lock:
+            self._staging = False
+            self._publish()
+
+    # 저장된 압축기가 설정과 같으면 모든 행을 다시 인코딩해 사용하고, 다르면 새로 학습
+    # (코드는 저장하지 않고 float32 원본에서 만들므로, 압축기와 벡터 파일의 저장 시점이 달라도 항상 일치함)
+    def _load_compressor(self):
+        if not self.compressed:
+            return
+        if self.compressor_path.exists() and self._dim is not None:
+            try:
+                compressor = VectorCompressor.load(self.compressor_path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"저장된 벡터 압축기를 읽지 못해 다시 학습합니다: {e}")
+            else:
+                if compressor.matches(self.compression, self._dim, self.pca_dims):
+                    self._encode_all(compressor)
+                else:
+                    logger.info("벡터 압축 설정이 바뀌어 압축기를 다시 학습합니다.")
+        self._maybe_fit_compressor()
+
+    def _describe_compression(self) -> str:
+        if not self.compressed:
+            return "없음"
+        description = self.compression + (f" + PCA {self.pca_dims}차원" if self.pca_dims else "")
+        return description if self._encoded is not None else f"{description} (학습 전)"
+
+    # 벡터 파일을 읽기 전용 메모리 맵으로 다시 연결 (덧붙인 뒤 크기가 바뀌므로)
+    # 이전 메모리 맵 객체는 그대로 유효하므로, 진행 중인 검색은 영향을 받지 않음
+    def _remap(self):
+        if not self._ids or self._dim is None:
+            self._matrix = None
+            return
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(self._ids), self._dim))
+
+    # 압축 이전 세대의 벡터 파일 정리 (파일 잠금을 가진 경우에만 호출)
+    # 이미 메모리 맵으로 연 프로세스는 계속 읽을 수 있고, 지울 수 없는 환경이면 다음 기회에 정리
+    def _remove_stale_vector_files(self):
+        for path in self.directory.glob("numpy_vectors.*.f32"):
+            if path != self.vectors_path:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def add_documents(self, documents: Sequence[Document], ids: Sequence[str]) -> None:
+        if not documents:
+            return
+        # 임베딩은 잠금 밖에서 계산 (검색/다른 작업을 막지 않음)
+        vectors = self._normalize(np.asarray(
+            self.embedding_function.embed_documents([doc.page_content for doc in documents]), dtype=np.float32
+        ))
+        with self._lock:
+            self._begin_write_locked()
+            if self._dim is None:
+                self._dim = int(vectors.shape[1])
+            elif vectors.shape[1] != self._dim:
+                if not self._dirty:
+                    self._end_write_locked()
+                raise ValueError(f"임베딩 차원이 색인과 다릅니다: {vectors.shape[1]} != {self._dim}")
+            # 벡터를 먼저 파일 끝에 덧붙이고, 목록과 유효 여부를 갱신한 뒤 이전 행을 비움
+            # (같은 ID를 교체할 때 검색 결과에서 청크가 잠시 사라지지 않도록)
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            start_row = len(self._ids)
+            # 압축 코드도 행 목록보다 먼저 기록 (검색은 행렬의 행 수만큼만 코드를 읽음)
+            if self._encoded is not None:
+                self._append_codes(start_row, self._encoded[0].encode(vectors))
+            replaced_rows = [self._row_by_id[chunk_id] for chunk_id in ids if chunk_id in self._row_by_id]
+            for offset, (chunk_id, doc) in enumerate(zip(ids, documents)):
+                self._ids.append(chunk_id)
+                self._contents.append(doc.page_content)
+                self._metadatas.append(dict(doc.metadata))
+                self._row_by_id[chunk_id] = start_row + offset
+            alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+            alive[replaced_rows] = False
+            for row in replaced_rows:
+                self._ids[row] = None
+            self._remap()
+            self._alive = alive
+            self._dirty = True
+            self._maybe_fit_compressor()
+            self._publish()
+
+    # 압축 코드 배열의 start_row부터 codes를 기록 (용량이 부족하면 두 배 크기의 새 배열로 교체)
+    # 기존 배열에는 검색이 읽지 않는 뒤쪽 행에만 쓰므로 진행 중인 검색에 영향이 없음 (잠금 안에서 호출)
+    def _append_codes(self, start_row: int, codes: np.ndarray):
+        compressor, buffer, _ = self._encoded
+        end_row = start_row + len(codes)
+        if end_row > len(buffer):
+            grown = np.empty((max(end_row, 2 * len(buffer)), compressor.code_dim), dtype=compressor.code_dtype)
+            grown[:start_row] = buffer[:start_row]
+            buffer = grown
+        buffer[start_row:end_row] = codes
+        self._encoded = (compressor, buffer, end_row)
+
+    # 모든 행을 compressor로 인코딩한 새 코드 배열로 교체 (잠금 안에서 또는 로드 시 호출)
+    def _encode_all(self, compressor: VectorCompressor):
+        row_count = len(self._ids) if self._matrix is not None else 0
+        buffer = np.empty((row_count, compressor.code_dim), dtype=compressor.code_dtype)
+        for start in range(0, row_count, SCORE_BLOCK_ROWS):
+            end = min(start + SCORE_BLOCK_ROWS, row_count)
+            buffer[start:end] = compressor.encode(self._matrix[start:end])
+        self._encoded = (compressor, buffer, row_count)
+
+    # 압축기가 없거나, 학습한 뒤 유효한 행이 두 배 이상 늘었으면 (표본 최대 수에 이를 때까지) 다시 학습
+    # 다시 학습할 때마다 모든 행을 인코딩하지만 행 수가 두 배가 될 때만 하므로 추가 비용은 행 수에 비례
+    def _maybe_fit_compressor(self):
+        if not self.compressed or self._matrix is None:
+            return
+        live_count = len(self._row_by_id)
+        if self._encoded is not None:
+            current = self._encoded[0]
+            if (not current.requires_fit or current.fitted_rows >= FIT_SAMPLE_ROWS
+                    or live_count < 2 * current.fitted_rows):
+                return
+        if live_count < VectorCompressor.min_fit_rows(self.compression, self.pca_dims):
+            return
+        live_rows = np.flatnonzero(self._alive)
+        if len(live_rows) > FIT_SAMPLE_ROWS:
+            live_rows = np.sort(np.random.default_rng(0).choice(live_rows, FIT_SAMPLE_ROWS, replace=False))
+        compressor = VectorCompressor.fit(self.compression, self._matrix[live_rows], self.pca_dims)
+        self._encode_all(compressor)
+        self._compressor_dirty = True
+        logger.info(f"벡터 압축기 학습 완료: {self._describe_compression()} (학습 행 {len(live_rows)}개, "
+                    f"행당 {compressor.bytes_per_row}바이트)")
+
+    def delete(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            self._begin_write_locked()
+            rows = [self._row_by_id.pop(chunk_id) for chunk_id in ids if chunk_id in self._row_by_id]
+            if not rows:
+                if not self._dirty:
+                    self._end_write_locked()
+                return
+            alive = self._alive.copy()
+            alive[rows] = False
+            for row in rows:
+                self._ids[row] = None
+            self._alive = alive
+            self._dirty = True
+            self._publish()
+
+    def get_ids(self) -> List[str]:
+        self._refresh_if_changed()
+        with self._lock:
+            return list(self._row_by_id)
+
+    def get_ids_by_relative_paths(self, relative_paths: Sequence[str]) -> List[str]:
+        paths = set(relative_paths)
+        self._refresh_if_changed()
+        with self._lock:
+            return [chunk_id for chunk_id, row in self._row_by_id.items()
+                    if self._metadatas[row].get("relative_path") in paths]
+
+    def get_documents(self, ids: Sequence[str]) -> List[Tuple[str, Document]]:
+        self._refresh_if_changed()
+        with self._lock:
+            return [
+                (chunk_id, Document(page_content=self._contents[row], metadata=dict(self._metadatas[row])))
+                for chunk_id in ids
+                for row in [self._row_by_id.get(chunk_id)] if row is not None
+            ]
+
+    def similarity_search_with_scores(self, embedding: Sequence[float], k: int) -> List[Tuple[Document, float]]:
+        self._refresh_if_changed()
+        # 검색 시작 시점의 행렬/유효 여부/목록 (추가/삭제/압축/다시 로드는 새 객체로 교체하므로 잠금 없이 사용 가능)
+        matrix, alive, contents, metadatas, encoded = self._view
+        if matrix is None or k <= 0:
+            return []
+        row_count = min(len(matrix), len(alive))
+        query = self._normalize(np.asarray(embedding, dtype=np.float32))
+        alive = alive[:row_count]
+        live_count = int(alive.sum())
+        k = min(k, live_count)
+        if k == 0:
+            return []
+
+        if encoded is not None and encoded[2] >= row_count:
+            # 압축 표현으로 모든 행의 근사 점수를 계산해 후보를 고른 뒤, 후보만 float32 원본으로 다시 계산
+            compressor, codes, _ = encoded
+            approximate = np.where(alive, compressor.scores(codes, query, row_count), -np.inf)
+            candidate_count = min(k * self.rescore_multiplier, live_count)
+            # 메모리 맵을 파일 순서대로 읽도록 행 번호 정렬
+            candidates = np.sort(np.argpartition(-approximate, candidate_count - 1)[:candidate_count])
+            exact = np.asarray(matrix[candidates] @ query)
+            order = np.argsort(-exact, kind="stable")[:k]
+            top_rows, top_scores = candidates[order], exact[order]
+        else:
+            # 행렬-벡터 곱 한 번으로 모든 행의 코사인 유사도 계산
+            scores = np.where(alive, np.asarray(matrix[:row_count] @ query), -np.inf)
+            top_rows = np.argpartition(-scores, k - 1)[:k]
+            top_rows = top_rows[np.argsort(-scores[top_rows], kind="stable")]
+            top_scores = scores[top_rows]
+        return [
+            (Document(page_content=contents[row], metadata=dict(metadatas[row])), float(score))
+            for row, score in zip(top_rows, top_scores)
+        ]
+
+    def count(self) -> int:
+        return len(self._row_by_id)
+
+    # 검색 시 모든 행을 읽는 표현의 크기 (압축 표현이 있으면 압축 코드, 없으면 float32 행렬)
+    def stats(self) -> Dict[str, Any]:
+        row_count = len(self._ids)
+        encoded = self._encoded
+        if encoded is not None:
+            scan_bytes = encoded[2] * encoded[0].bytes_per_row
+        else:
+            scan_bytes = row_count * (self._dim or 0) * np.dtype(np.float32).itemsize
+        return {
+            "chunks": len(self._row_by_id),
+            "rows": row_count,
+            "dim": self._dim,
+            "compression": self._describe_compression(),
+            "scan_bytes": scan_bytes,
+            "float32_bytes": row_count * (self._dim or 0) * np.dtype(np.float32).itemsize,
+        }
+
+    # 벡터 파일을 디스크에 기록한 뒤 sidecar 저장. 비워진 행이 많으면 먼저 압축
+    # 저장에 성공하면 파일 잠금을 놓음 (실패하면 저장되지 않은 행을 다른 프로세스가 잘라내지 않도록 계속 유지)
+    def persist(self) -> None:
+        with self._lock:
+            if not self._dirty and not self._compressor_dirty:
+                self._end_write_locked()
+                return
+            # 압축기만 새로 학습한 경우(쓰기 전)에도 잠금을 얻고, 그 사이 바뀐 sidecar가 있으면 다시 로드
+            self._begin_write_locked()
+            if not self._dirty and not self._compressor_dirty:
+                self._end_write_locked()
+                return
+            dead_rows = len(self._ids) - len(self._row_by_id)
+            if self._ids and dead_rows / len(self._ids) >= self.COMPACT_DEAD_RATIO:
+                self._compact()
+            if self.vectors_path.exists():
+                with open(self.vectors_path, "rb+") as f:
+                    os.fsync(f.fileno())
+            write_json_atomic(self.sidecar_path, {
+                "version": self.FORMAT_VERSION,
+                "dim": self._dim,
+                "generation": self._generation,
+                "ids": self._ids,
+                "documents": self._contents,
+                "metadatas": self._metadatas,
+            }, indent=None)
+            self._sidecar_stamp = self._current_sidecar_stamp()
+            if self._compressor_dirty and self._encoded is not None:
+                self._encoded[0].save(self.compressor_path)
+            self._compressor_dirty = False
+            self._dirty = False
+            self._remove_stale_vector_files()
+            self._publish()
+            self._end_write_locked()
+        logger.info(f"numpy 벡터 색인 저장 완료: {self.directory} (청크 {len(self._row_by_id)}개)")
+
+    # 살아있는 행만 다음 세대의 벡터 파일로 옮기고 목록을 새로 구성 (잠금 안에서 호출)
+    def _compact(self):
+        live_rows = [row for row, chunk_id in enumerate(self._ids) if chunk_id is not None]
+        logger.info(f"numpy 벡터 색인 압축: {len(self._ids)}행 -> {len(live_rows)}행")
+        self._generation += 1
+        with open(self.vectors_path, "wb") as f:
+            if live_rows and self._matrix is not None:
+                f.write(np.ascontiguousarray(self._matrix[live_rows]).tobytes())
+        self._ids = [self._ids[row] for row in live_rows]
+        self._contents = [self._contents[row] for row in live_rows]
+        self._metadatas = [self._metadatas[row] for row in live_rows]
+        self._row_by_id = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+        self._remap()
+        self._alive = np.ones(len(self._ids), dtype=bool)
+        # 남은 행으로 압축기를 다시 학습 (삭제로 데이터 분포가 크게 바뀌었을 수 있음)
+        if self.compressed:
+            self._encoded = None
+            self._maybe_fit_compressor()
+
+    def as_retriever(self, k: int) -> BaseRetriever:
+        return VectorIndexRetriever(vector_index=self, embeddings=self.embedding_function, k=k)
+
+
+# 설정한 저장소의 색인이 디렉토리에 저장되어 있는지 확인
+def vector_index_exists(backend: str, directory: Path) -> bool:
+    if backend == "numpy":
+        return NumpyVectorIndex.exists(directory)
+    return ChromaVectorIndex.exists(directory)
+
+
+# 저장소 종류에 맞는 벡터 색인 생성 (디렉토리에 저장된 내용이 있으면 로드)
+# compression, pca_dims, rescore_multiplier는 numpy 저장소에만 적용
+def open_vector_index(backend: str, directory: Path, embedding_function: Embeddings, compression: str = "none",
+                      pca_dims: int = 0, rescore_multiplier: int = 4) -> VectorIndex:
+    if backend == "chroma":
+        return ChromaVectorIndex(directory, embedding_function)
+    if backend == "numpy":
+        return NumpyVectorIndex(directory, embedding_function, compression=compression, pca_dims=pca_dims,
+                                rescore_multiplier=rescore_multiplier)
+    raise ValueError(f"지원하지 않는 벡터 색인 저장소입니다: '{backend}' (가능한 값: {', '.join(VECTOR_INDEX_BACKENDS)})")